@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Script para aplicar a una base existente las tablas, columnas e índices del modelo
+
+Es idempotente: solo crea lo que falta, así que puede ejecutarse en cada
+despliegue. Las columnas nuevas se agregan como NULL y, cuando corresponde,
+se rellenan a partir de otra columna (ver RELLENOS). Sirve tanto para
+SQLite como para SQL Server (usa la base configurada en app/config.py o la
+URL indicada con --url).
+
+Uso:
+    python actualizar_esquema.py
+    python actualizar_esquema.py --url "mssql+pyodbc://..."
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text, update
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.busqueda import instalar_busqueda
+from app.models import db
+
+# Índices de un solo campo que quedan cubiertos por un índice compuesto
+REEMPLAZADOS = {
+    'ix_app_area_finca_id': 'IX_app_area_finca_activa',
+    'ix_app_codigo_finca_id': 'IX_app_codigo_finca_area_activo',
+}
+
+# Valor inicial de las columnas agregadas a tablas con datos
+RELLENOS = {
+    'fecha_modificacion': 'fecha_creacion',
+}
+
+
+def _agregar_columnas(engine, tabla, existentes):
+    preparador = engine.dialect.identifier_preparer
+    agregadas = []
+    for columna in tabla.columns:
+        if columna.name.lower() in existentes:
+            continue
+        tipo = columna.type.compile(dialect=engine.dialect)
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {preparador.format_table(tabla)} "
+                              f"ADD {preparador.format_column(columna)} {tipo} NULL"))
+            origen = RELLENOS.get(columna.name)
+            if origen is not None and origen in tabla.c:
+                conn.execute(update(tabla).values({columna: tabla.c[origen]}))
+        agregadas.append(f'{tabla.name}.{columna.name}')
+        print(f"   ✅ Columna {columna.name} agregada a {tabla.name}")
+    return agregadas
+
+
+def actualizar_esquema(engine):
+    """Crea las tablas, columnas, índices e índice de búsqueda que falten; devuelve los nombres creados"""
+    creados = []
+    existentes = set(inspect(engine).get_table_names())
+    for tabla in db.metadata.sorted_tables:
+        if tabla.name not in existentes:
+            tabla.create(engine)
+            creados.append(tabla.name)
+            print(f"   ✅ Tabla {tabla.name} creada")
+
+    inspector = inspect(engine)
+    for tabla in db.metadata.sorted_tables:
+        if tabla.name in creados:
+            continue  # create() ya incluyó sus columnas e índices
+        # Las columnas van antes que los índices que las usan
+        columnas = {columna['name'].lower() for columna in inspector.get_columns(tabla.name)}
+        creados.extend(_agregar_columnas(engine, tabla, columnas))
+        # SQL Server compara los nombres sin distinguir mayúsculas
+        indices = {indice['name'].lower() for indice in inspector.get_indexes(tabla.name) if indice['name']}
+        for indice in sorted(tabla.indexes, key=lambda i: i.name):
+            if indice.name.lower() in indices:
+                continue
+            indice.create(engine)
+            creados.append(indice.name)
+            print(f"   ✅ Índice {indice.name} creado en {tabla.name}")
+        for viejo, nuevo in REEMPLAZADOS.items():
+            if viejo in indices:
+                print(f"   ℹ️  {viejo} queda cubierto por {nuevo}; puede eliminarse")
+
+    if instalar_busqueda(engine):
+        creados.append('busqueda')
+        print("   ✅ Índice de búsqueda de códigos creado")
+    return creados
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Crea las tablas e índices que falten')
+    parser.add_argument('--url', help='URL de la base (por defecto la de app/config.py)')
+    args = parser.parse_args()
+
+    if args.url:
+        url = args.url
+    else:
+        from app.config import Config
+        url = Config.SQLALCHEMY_DATABASE_URI
+
+    print("🔧 Actualizando esquema...")
+    print("=" * 60)
+    engine = create_engine(url)
+    try:
+        creados = actualizar_esquema(engine)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    finally:
+        engine.dispose()
+
+    if creados:
+        print(f"\n🎉 {len(creados)} objetos creados")
+    else:
+        print("\n✅ El esquema ya estaba al día")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,31 @@
 from flask import Flask
 from app.config import config
 from app.models import db
+from app.eventos import registrar_eventos
+from app.auditoria import registrar_auditoria
+from app.motor import opciones_motor, timeout_sentencias, configurar_timeout_sentencias
 
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Pool, timeouts y fast_executemany desde variables de entorno (ver app/motor.py)
+    opciones = opciones_motor(app.config['SQLALCHEMY_DATABASE_URI'])
+    opciones.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones
+    
     # Inicializar extensiones
     db.init_app(app)
+    registrar_eventos(db.session)
+    registrar_auditoria(db.session)
+    if timeout_sentencias():
+        with app.app_context():
+            configurar_timeout_sentencias(db.engine, timeout_sentencias())
+    
+    # Latencia, SQL y plantillas por ruta para /metrics (ver app/metricas.py)
+    from app.metricas import registrar_metricas
+    with app.app_context():
+        registrar_metricas(app, db.engine)
     
     # Registrar blueprints
     from app.routes.auth import auth_bp
@@ -17,6 +35,11 @@ def create_app(config_name='default'):
     from app.routes.areas import areas_bp
     from app.routes.supervisores import supervisores_bp
     from app.routes.codigos import codigos_bp
+    from app.routes.sistema import sistema_bp
+    from app.routes.api import api_bp
+    from app.routes.rendimientos import rendimientos_bp
+    from app.routes.grid import grid_bp
+    from app.routes.trabajos import trabajos_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
@@ -25,5 +48,21 @@ def create_app(config_name='default'):
     app.register_blueprint(areas_bp)
     app.register_blueprint(supervisores_bp)
     app.register_blueprint(codigos_bp)
+    app.register_blueprint(sistema_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(rendimientos_bp)
+    app.register_blueprint(grid_bp)
+    app.register_blueprint(trabajos_bp)
+    
+    # Usuario actual disponible en las plantillas como `principal`
+    from app.principal import obtener_principal
+    
+    @app.context_processor
+    def inyectar_principal():
+        return {'principal': obtener_principal()}
+    
+    # Filas y tarjetas renderizadas en caché (ver app/fragmentos.py)
+    from app.fragmentos import registrar_fragmentos
+    registrar_fragmentos(app)
     
     return app
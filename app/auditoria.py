@@ -0,0 +1,238 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app, has_app_context, has_request_context, session as sesion_web
+from sqlalchemy import event, insert, inspect, select
+
+from app.models import Auditoria
+
+# Historial de cambios de los datos maestros: quién, qué, antes/después y
+# cuándo. Los eventos de la sesión anotan los cambios de cada flush (con el
+# historial de atributos del ORM) y de cada sentencia masiva; después del
+# commit se entregan a un hilo que los escribe en lotes en app_auditoria, así
+# la petición no espera la escritura. Un rollback los descarta.
+#
+# Un UPDATE masivo se registra registro por registro, igual que un cambio del
+# ORM: antes de ejecutarlo se leen con su mismo WHERE los ids y los valores
+# anteriores (una consulta más por sentencia). Los INSERT y DELETE masivos
+# dejan una sola fila 'masivo' con los valores y el filtro.
+#
+# Con AUDITORIA_ASINCRONA = False las filas se escriben en la misma
+# transacción que el cambio (útil en pruebas y scripts). Si el proceso muere
+# con filas en la cola, esas filas se pierden.
+
+logger = logging.getLogger(__name__)
+
+# Tablas auditadas y columnas que no se registran
+TABLAS = ('app_usuario', 'app_finca', 'app_area', 'app_supervisor', 'app_codigo')
+IGNORADAS = {'fecha_creacion', 'fecha_modificacion', 'fecha_ultimo_acceso'}
+SENSIBLES = {'password_hash', 'clave_acceso'}
+
+LOTE = 500
+INTERVALO = 1.0  # Segundos que se espera para juntar un lote
+
+_cola = queue.Queue()
+_hilo = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _valor(columna, valor):
+    if columna in SENSIBLES and valor is not None:
+        return '***'
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (list, tuple)):
+        return [_valor(columna, v) for v in valor]
+    return valor
+
+
+def _usuario_actual(session):
+    # Los trabajos en segundo plano anotan en la sesión quién los pidió
+    if has_request_context() and 'user_id' in sesion_web:
+        return sesion_web['user_id']
+    return session.info.get('usuario_id')
+
+
+def _fila(session, tabla, registro_id, accion, cambios):
+    return {'tabla': tabla, 'registro_id': registro_id, 'accion': accion,
+            'usuario_id': _usuario_actual(session), 'cambios': json.dumps(cambios),
+            'fecha': datetime.utcnow()}
+
+
+def _cambios_objeto(estado, accion):
+    cambios = {}
+    for atributo in estado.mapper.column_attrs:
+        columna = atributo.columns[0].name
+        if columna in IGNORADAS:
+            continue
+        if accion == 'actualizar':
+            historial = estado.attrs[atributo.key].history
+            if not historial.has_changes():
+                continue
+            antes = historial.deleted[0] if historial.deleted else None
+            despues = historial.added[0] if historial.added else None
+        else:
+            # state.dict no dispara cargas: solo lo que ya está en memoria
+            valor = estado.dict.get(atributo.key)
+            if valor is None:
+                continue
+            antes, despues = (None, valor) if accion == 'insertar' else (valor, None)
+        if antes != despues:
+            cambios[columna] = [_valor(columna, antes), _valor(columna, despues)]
+    return cambios
+
+
+def _despues_de_flush(session, flush_context):
+    filas = []
+    for accion, objetos in (('insertar', session.new), ('actualizar', session.dirty),
+                            ('eliminar', session.deleted)):
+        for objeto in objetos:
+            tabla = getattr(objeto, '__tablename__', None)
+            if tabla not in TABLAS:
+                continue
+            cambios = _cambios_objeto(inspect(objeto), accion)
+            if cambios or accion != 'actualizar':
+                filas.append(_fila(session, tabla, getattr(objeto, 'id', None), accion, cambios))
+    _anotar(session, filas)
+
+
+def _al_ejecutar(estado):
+    if not (estado.is_insert or estado.is_update or estado.is_delete):
+        return
+    tabla = getattr(estado.statement, 'table', None)
+    if tabla is None or tabla.name not in TABLAS:
+        return
+
+    parametros = estado.parameters
+    if isinstance(parametros, (list, tuple)):
+        # executemany: solo la cantidad de filas
+        cambios = {'filas': len(parametros)}
+    else:
+        enlazados = dict(estado.statement.compile().params)
+        enlazados.update(parametros or {})
+        valores = {k: v for k, v in enlazados.items()
+                   if k in tabla.c and k not in IGNORADAS and v is not None}
+        # Un UPDATE que solo toca columnas ignoradas (p. ej. el último acceso) no se registra
+        if estado.is_update and not valores:
+            return
+        if estado.is_update:
+            _anotar(estado.session, _filas_actualizadas(estado, tabla, valores, parametros))
+            return
+        filtro = {k: _valor(k, v) for k, v in enlazados.items() if k not in tabla.c}
+        cambios = {'valores': {k: _valor(k, v) for k, v in valores.items()}, 'filtro': filtro}
+    _anotar(estado.session, [_fila(estado.session, tabla.name, None, 'masivo', cambios)])
+
+
+def _filas_actualizadas(estado, tabla, valores, parametros):
+    """Una fila 'actualizar' por registro que toca un UPDATE masivo
+
+    Antes de ejecutarlo se leen los ids y los valores anteriores con el mismo
+    WHERE; quien hace UPDATE por lotes de ids (reasignar_codigos_area) lee
+    así un lote por sentencia.
+    """
+    columnas = [tabla.c[columna] for columna in valores]
+    consulta = select(tabla.c.id, *columnas)
+    if estado.statement.whereclause is not None:
+        consulta = consulta.where(estado.statement.whereclause)
+    filas = []
+    for registro_id, *anteriores in estado.session.execute(consulta, parametros or {}):
+        cambios = {columna.name: [_valor(columna.name, antes), _valor(columna.name, valores[columna.name])]
+                   for columna, antes in zip(columnas, anteriores) if antes != valores[columna.name]}
+        if cambios:
+            filas.append(_fila(estado.session, tabla.name, registro_id, 'actualizar', cambios))
+    return filas
+
+
+def _asincrona():
+    return current_app.config.get('AUDITORIA_ASINCRONA', True) if has_app_context() else True
+
+
+def _anotar(session, filas):
+    if not filas:
+        return
+    if _asincrona():
+        session.info.setdefault('auditoria_pendiente', []).extend(filas)
+    else:
+        session.connection().execute(insert(Auditoria.__table__), filas)
+
+
+def _despues_de_commit(session):
+    filas = session.info.pop('auditoria_pendiente', None)
+    if not filas:
+        return
+    _asegurar_escritor()
+    engine = session.get_bind()
+    for fila in filas:
+        _cola.put((engine, fila))
+
+
+def _despues_de_rollback(session):
+    session.info.pop('auditoria_pendiente', None)
+
+
+def registrar_auditoria(sesion):
+    """Conecta los eventos de auditoría a la sesión (una sola vez)"""
+    if event.contains(sesion, 'after_flush', _despues_de_flush):
+        return
+    event.listen(sesion, 'after_flush', _despues_de_flush)
+    event.listen(sesion, 'do_orm_execute', _al_ejecutar)
+    event.listen(sesion, 'after_commit', _despues_de_commit)
+    event.listen(sesion, 'after_rollback', _despues_de_rollback)
+
+
+def _asegurar_escritor():
+    global _hilo, _pid
+    with _lock:
+        # Tras un fork el hilo del proceso padre no existe en el hijo
+        if _hilo is None or not _hilo.is_alive() or _pid != os.getpid():
+            _hilo = threading.Thread(target=_escritor, name='auditoria', daemon=True)
+            _pid = os.getpid()
+            _hilo.start()
+
+
+def _escribir(pendientes):
+    por_engine = {}
+    for engine, fila in pendientes:
+        por_engine.setdefault(engine, []).append(fila)
+    for engine, filas in por_engine.items():
+        try:
+            with engine.begin() as conexion:
+                conexion.execute(insert(Auditoria.__table__), filas)
+        except Exception:
+            logger.exception('No se pudieron escribir %s filas de auditoría', len(filas))
+
+
+def _escritor():
+    while True:
+        pendientes = [_cola.get()]
+        limite = time.monotonic() + INTERVALO
+        while len(pendientes) < LOTE:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                pendientes.append(_cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        _escribir(pendientes)
+        for _ in pendientes:
+            _cola.task_done()
+
+
+def vaciar():
+    """Espera a que se escriban todas las filas encoladas"""
+    if _hilo is not None and _hilo.is_alive() and _pid == os.getpid():
+        _cola.join()
+
+
+atexit.register(vaciar)
@@ -0,0 +1,175 @@
+import re
+
+from sqlalchemy import DDL, and_, column, event, inspect, literal_column, select, table, text
+
+from app.models import db, Area, Codigo
+
+# Búsqueda de códigos por código, nombre, apellido o teléfono con un índice
+# por prefijo de cada palabra, mantenido por triggers en la propia base para
+# que también cubra las inserciones masivas (rangos, importación CSV).
+#
+#   SQLite      tabla virtual FTS5 con contenido externo (app_codigo_fts)
+#   SQL Server  tabla de términos app_codigo_termino con intercalación CI_AI,
+#               así 'jose' encuentra 'José' con un LIKE 'jose%' por índice
+#
+# Ambas se crean junto con app_codigo (create_all) o con instalar_busqueda
+# en una base existente.
+
+MIN_CARACTERES = 2
+MAX_TERMINOS = 5
+MAX_RESULTADOS = 10
+
+# Palabras sin signos: evita tener que escapar la sintaxis de FTS5 y los
+# comodines de LIKE
+_PALABRA = re.compile(r'[^\W_]+')
+
+FTS = 'app_codigo_fts'
+COLUMNAS_BUSQUEDA = ('codigo', 'nombre_persona', 'apellido_persona', 'telefono')
+
+_SQLITE_CREAR = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS} USING fts5(
+        codigo, nombre_persona, apellido_persona, telefono, finca_id,
+        content='app_codigo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS app_codigo_fts_insertar AFTER INSERT ON app_codigo BEGIN
+        INSERT INTO {FTS}(rowid, codigo, nombre_persona, apellido_persona, telefono, finca_id)
+        VALUES (new.id, new.codigo, new.nombre_persona, new.apellido_persona, new.telefono, new.finca_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS app_codigo_fts_eliminar AFTER DELETE ON app_codigo BEGIN
+        INSERT INTO {FTS}({FTS}, rowid, codigo, nombre_persona, apellido_persona, telefono, finca_id)
+        VALUES ('delete', old.id, old.codigo, old.nombre_persona, old.apellido_persona, old.telefono, old.finca_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS app_codigo_fts_actualizar
+        AFTER UPDATE OF codigo, nombre_persona, apellido_persona, telefono, finca_id ON app_codigo BEGIN
+        INSERT INTO {FTS}({FTS}, rowid, codigo, nombre_persona, apellido_persona, telefono, finca_id)
+        VALUES ('delete', old.id, old.codigo, old.nombre_persona, old.apellido_persona, old.telefono, old.finca_id);
+        INSERT INTO {FTS}(rowid, codigo, nombre_persona, apellido_persona, telefono, finca_id)
+        VALUES (new.id, new.codigo, new.nombre_persona, new.apellido_persona, new.telefono, new.finca_id);
+    END""",
+]
+# Los triggers se eliminan junto con app_codigo
+_SQLITE_ELIMINAR = [f'DROP TABLE IF EXISTS {FTS}']
+
+
+def _terminos_mssql(origen):
+    return f"""SELECT DISTINCT c.finca_id, LEFT(s.value, 100) COLLATE Latin1_General_CI_AI, c.id
+        FROM {origen} c
+        CROSS APPLY STRING_SPLIT(REPLACE(CONCAT(c.codigo, ' ', c.nombre_persona, ' ',
+                                                c.apellido_persona, ' ', c.telefono), '-', ' '), ' ') s
+        WHERE s.value <> ''"""
+
+
+_MSSQL_CREAR = [
+    """IF OBJECT_ID('dbo.app_codigo_termino', 'U') IS NULL
+    CREATE TABLE [dbo].[app_codigo_termino](
+        [finca_id] [int] NOT NULL,
+        [termino] [nvarchar](100) COLLATE Latin1_General_CI_AI NOT NULL,
+        [codigo_id] [int] NOT NULL,
+        CONSTRAINT [PK_app_codigo_termino] PRIMARY KEY CLUSTERED ([finca_id], [termino], [codigo_id])
+    )""",
+    """IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_codigo_termino_termino')
+    CREATE INDEX [IX_app_codigo_termino_termino] ON [dbo].[app_codigo_termino] ([termino]) INCLUDE ([codigo_id])""",
+    """IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_codigo_termino_codigo')
+    CREATE INDEX [IX_app_codigo_termino_codigo] ON [dbo].[app_codigo_termino] ([codigo_id])""",
+    f"""CREATE OR ALTER TRIGGER [dbo].[trg_app_codigo_termino] ON [dbo].[app_codigo]
+    AFTER INSERT, UPDATE, DELETE AS
+    BEGIN
+        SET NOCOUNT ON;
+        -- Las reasignaciones de área no cambian los términos
+        IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+           AND NOT (UPDATE(codigo) OR UPDATE(nombre_persona) OR UPDATE(apellido_persona)
+                    OR UPDATE(telefono) OR UPDATE(finca_id))
+            RETURN;
+        DELETE t FROM [dbo].[app_codigo_termino] t JOIN deleted d ON t.codigo_id = d.id;
+        INSERT INTO [dbo].[app_codigo_termino] (finca_id, termino, codigo_id)
+        {_terminos_mssql('inserted')};
+    END""",
+]
+_MSSQL_ELIMINAR = ["DROP TABLE IF EXISTS [dbo].[app_codigo_termino]"]
+
+for _sentencia in _SQLITE_CREAR:
+    event.listen(Codigo.__table__, 'after_create', DDL(_sentencia).execute_if(dialect='sqlite'))
+for _sentencia in _SQLITE_ELIMINAR:
+    event.listen(Codigo.__table__, 'before_drop', DDL(_sentencia).execute_if(dialect='sqlite'))
+for _sentencia in _MSSQL_CREAR:
+    event.listen(Codigo.__table__, 'after_create', DDL(_sentencia).execute_if(dialect='mssql'))
+for _sentencia in _MSSQL_ELIMINAR:
+    event.listen(Codigo.__table__, 'before_drop', DDL(_sentencia).execute_if(dialect='mssql'))
+
+_termino = table('app_codigo_termino', column('finca_id'), column('termino'), column('codigo_id'))
+
+
+def instalar_busqueda(engine):
+    """Crea el índice de búsqueda en una base existente; True si lo creó"""
+    nombre = engine.dialect.name
+    if nombre not in ('sqlite', 'mssql'):
+        return False
+
+    tablas = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        if nombre == 'sqlite':
+            nuevo = FTS not in tablas
+            for sentencia in _SQLITE_CREAR:
+                conn.execute(text(sentencia))
+            if nuevo:
+                conn.execute(text(f"INSERT INTO {FTS}({FTS}) VALUES ('rebuild')"))
+        else:
+            nuevo = 'app_codigo_termino' not in tablas
+            for sentencia in _MSSQL_CREAR:
+                conn.execute(text(sentencia))
+            if nuevo:
+                conn.execute(text(f"INSERT INTO [dbo].[app_codigo_termino] (finca_id, termino, codigo_id) "
+                                  f"{_terminos_mssql('[dbo].[app_codigo]')}"))
+    return nuevo
+
+
+def terminos(texto):
+    """Palabras de búsqueda válidas de `texto`"""
+    return _PALABRA.findall(texto or '')[:MAX_TERMINOS]
+
+
+def filtro_busqueda(texto, finca_id=None):
+    """Condición sobre Codigo.id para los códigos que coinciden con `texto`
+
+    Cada palabra se busca como prefijo en cualquiera de los campos y todas
+    deben coincidir. Devuelve None si el texto no tiene palabras.
+    """
+    palabras = terminos(texto)
+    if not palabras:
+        return None
+
+    if db.engine.dialect.name == 'mssql':
+        condiciones = []
+        for palabra in palabras:
+            ids = select(_termino.c.codigo_id).where(_termino.c.termino.like(f'{palabra}%'))
+            if finca_id:
+                ids = ids.where(_termino.c.finca_id == finca_id)
+            condiciones.append(Codigo.id.in_(ids))
+        return and_(*condiciones)
+
+    # FTS5: {columnas} : ("pal1"* AND "pal2"*), con la finca como columna indexada
+    expresion = '{%s} : (%s)' % (' '.join(COLUMNAS_BUSQUEDA),
+                                 ' AND '.join(f'"{palabra}"*' for palabra in palabras))
+    if finca_id:
+        expresion = f'finca_id : "{int(finca_id)}" AND {expresion}'
+    ids = (select(literal_column('rowid')).select_from(table(FTS))
+           .where(text(f'{FTS} MATCH :expresion_busqueda').bindparams(expresion_busqueda=expresion)))
+    return Codigo.id.in_(ids)
+
+
+def buscar_codigos(texto, finca_id=None, limite=MAX_RESULTADOS):
+    """Primeros códigos que coinciden con `texto`, para el autocompletado"""
+    if len((texto or '').strip()) < MIN_CARACTERES:
+        return []
+    condicion = filtro_busqueda(texto, finca_id)
+    if condicion is None:
+        return []
+
+    consulta = (select(Codigo.id, Codigo.codigo, Codigo.nombre_persona, Codigo.apellido_persona,
+                       Codigo.telefono, Codigo.finca_id, Codigo.activo, Area.nombre.label('area'))
+                .outerjoin(Area, Codigo.area_id == Area.id)
+                .where(condicion)
+                .limit(limite))
+    if finca_id:
+        consulta = consulta.where(Codigo.finca_id == finca_id)
+    return [dict(fila._mapping) for fila in db.session.execute(consulta)]
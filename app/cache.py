@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+# Caché en memoria del proceso con expiración por entrada. Cada worker tiene
+# la suya, por eso se usa solo para datos donde unos segundos de retraso son
+# aceptables y las escrituras locales invalidan explícitamente.
+
+
+class CacheTTL:
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._datos = {}
+        self._lock = threading.Lock()
+        self._calculos = {}
+        self._generacion = 0
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado o None si no existe o ya expiró"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira <= time.monotonic():
+                del self._datos[clave]
+                return None
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+
+    def obtener_o_calcular(self, clave, funcion, ttl=None):
+        """Devuelve el valor en caché o lo calcula con funcion()
+
+        Si varios hilos piden la misma clave a la vez, solo uno ejecuta
+        funcion() y los demás esperan su resultado.
+        """
+        valor = self.obtener(clave)
+        if valor is not None:
+            return valor
+
+        with self._lock:
+            calculo = self._calculos.setdefault(clave, threading.Lock())
+        with calculo:
+            valor = self.obtener(clave)
+            if valor is None:
+                generacion = self._generacion
+                valor = funcion()
+                # No guardar un resultado calculado antes de una invalidación
+                if generacion == self._generacion:
+                    self.guardar(clave, valor, ttl)
+        with self._lock:
+            if self._calculos.get(clave) is calculo and not calculo.locked():
+                del self._calculos[clave]
+        return valor
+
+    def invalidar(self, clave=None):
+        """Elimina una clave, o todo el contenido si no se indica ninguna"""
+        with self._lock:
+            self._generacion += 1
+            if clave is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+
+
+class CacheLRU:
+    """Caché con cantidad máxima de entradas que descarta la menos usada
+
+    Cada entrada se guarda con sus dependencias (valores hashables, por
+    ejemplo (tabla, id)) y invalidar_dependencia() elimina todas las
+    entradas que dependen de una.
+    """
+
+    def __init__(self, maximo=10000):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._por_dependencia = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado o None, y lo marca como recién usado"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            self._datos.move_to_end(clave)
+            return entrada[0]
+
+    def guardar(self, clave, valor, dependencias=(), maximo=None):
+        maximo = self.maximo if maximo is None else maximo
+        with self._lock:
+            self._quitar(clave)
+            self._datos[clave] = (valor, tuple(dependencias))
+            for dependencia in dependencias:
+                self._por_dependencia[dependencia].add(clave)
+            while len(self._datos) > maximo:
+                self._quitar(next(iter(self._datos)))
+
+    def _quitar(self, clave):
+        entrada = self._datos.pop(clave, None)
+        if entrada is None:
+            return
+        for dependencia in entrada[1]:
+            claves = self._por_dependencia.get(dependencia)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_dependencia[dependencia]
+
+    def invalidar_dependencia(self, dependencia):
+        """Elimina las entradas que dependen de `dependencia`; devuelve cuántas"""
+        with self._lock:
+            claves = list(self._por_dependencia.get(dependencia, ()))
+            for clave in claves:
+                self._quitar(clave)
+            return len(claves)
+
+    def invalidar(self):
+        """Elimina todo el contenido"""
+        with self._lock:
+            self._datos.clear()
+            self._por_dependencia.clear()
@@ -25,6 +25,29 @@ class Config:
     )
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Segundos que se reutilizan rol y finca del usuario antes de volver a consultarlos
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 30))
+    
+    # Segundos que se reutilizan los contadores del dashboard
+    RESUMEN_CACHE_TTL = int(os.environ.get('RESUMEN_CACHE_TTL', 60))
+    
+    # Fragmentos HTML renderizados que se conservan en memoria (app/fragmentos.py)
+    FRAGMENTOS_CACHE_MAX = int(os.environ.get('FRAGMENTOS_CACHE_MAX', 20000))
+    
+    # Operaciones masivas en segundo plano (app/trabajos.py): hilos por proceso
+    # (0 las ejecuta dentro de la petición) y tamaño a partir del cual se encolan
+    TRABAJOS_HILOS = int(os.environ.get('TRABAJOS_HILOS', 2))
+    TRABAJOS_UMBRAL_CODIGOS = int(os.environ.get('TRABAJOS_UMBRAL_CODIGOS', 2000))
+    TRABAJOS_UMBRAL_BYTES = int(os.environ.get('TRABAJOS_UMBRAL_BYTES', 1024 * 1024))
+    
+    # Auditoría de cambios (app/auditoria.py): por defecto la escribe un hilo en
+    # lotes después del commit; con 0 se escribe en la misma transacción
+    AUDITORIA_ASINCRONA = os.environ.get('AUDITORIA_ASINCRONA', '1') != '0'
+    
+    # Token Bearer que debe enviar Prometheus a /metrics (app/metricas.py). Sin
+    # token solo puede leerlo un admin con sesión
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -0,0 +1,269 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, Area, Consolidacion, Finca, Rendimiento, RendimientoDiario, RendimientoSemanal
+from app.operaciones_masivas import MAX_PARAMETROS, lotes
+
+# Consolidados de rendimiento por (finca, día, área) y (finca, semana). Un
+# proceso de recuperación suma solo los registros nuevos desde la marca de
+# agua (último id consolidado) y avanza la marca en la misma transacción,
+# así los reportes nunca recorren app_rendimiento.
+#
+# Los registros más recientes que MARGEN no se consolidan todavía: una
+# ingesta que obtuvo un id menor puede confirmar después que otra con un id
+# mayor, y sin el margen ese registro quedaría por debajo de la marca. El
+# margen solo cubre las ingestas que confirman dentro de MARGEN desde su
+# fecha_registro; una transacción más lenta (bloqueos, un lote grande) puede
+# confirmar filas por debajo de una marca que ya avanzó. conciliar() las
+# recupera: compara los registros de los últimos días con los consolidados
+# y reconstruye las semanas que no coinciden.
+#
+# reconstruir() y conciliar() toman el mismo bloqueo de la fila de la marca
+# que _reclamar_tramo, así no se cruzan con una consolidación en curso.
+
+PROCESO = 'rendimientos'
+MARGEN = timedelta(minutes=2)
+
+# Ids de app_rendimiento procesados por transacción
+TAMANO_TRAMO = 50000
+
+# Registros confirmados tarde que conciliar() todavía busca (por fecha_registro)
+VENTANA_CONCILIACION = timedelta(days=1)
+
+CENTAVOS = Decimal('0.01')
+
+
+def lunes(fecha):
+    """Inicio (lunes) de la semana de `fecha`"""
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def marca_actual():
+    """Último id de app_rendimiento incluido en los consolidados"""
+    marca = db.session.get(Consolidacion, PROCESO)
+    return marca.ultimo_id if marca else 0
+
+
+def _reclamar_tramo(anterior, nuevo):
+    # UPDATE condicionado: si otro proceso ya avanzó la marca no se suma nada
+    if anterior == 0 and db.session.get(Consolidacion, PROCESO) is None:
+        db.session.add(Consolidacion(nombre=PROCESO, ultimo_id=nuevo))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            return False
+        return True
+    resultado = db.session.execute(
+        update(Consolidacion.__table__)
+        .where(Consolidacion.nombre == PROCESO, Consolidacion.ultimo_id == anterior)
+        .values(ultimo_id=nuevo, fecha_actualizacion=datetime.utcnow()))
+    return resultado.rowcount == 1
+
+
+def _bloquear_marca():
+    """Bloquea la fila de la marca hasta el fin de la transacción; devuelve la marca"""
+    # UPDATE sin cambios: toma el mismo bloqueo de escritura que _reclamar_tramo
+    resultado = db.session.execute(
+        update(Consolidacion.__table__)
+        .where(Consolidacion.nombre == PROCESO)
+        .values(ultimo_id=Consolidacion.ultimo_id))
+    if resultado.rowcount == 0:
+        db.session.add(Consolidacion(nombre=PROCESO, ultimo_id=0))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # Otro proceso creó la marca al mismo tiempo
+            db.session.rollback()
+            return _bloquear_marca()
+    return db.session.execute(select(Consolidacion.ultimo_id)
+                              .where(Consolidacion.nombre == PROCESO)).scalar()
+
+
+def _totales_diarios(condicion):
+    consulta = (select(Rendimiento.finca_id, Rendimiento.fecha, Rendimiento.area_id, Rendimiento.unidad,
+                       func.sum(Rendimiento.cantidad), func.count())
+                .where(condicion)
+                .group_by(Rendimiento.finca_id, Rendimiento.fecha, Rendimiento.area_id, Rendimiento.unidad))
+    return {tuple(fila[:4]): (Decimal(str(fila[4])).quantize(CENTAVOS), fila[5])
+            for fila in db.session.execute(consulta)}
+
+
+def _por_semana(diarios):
+    semanales = defaultdict(lambda: [Decimal(0), 0])
+    for (finca_id, fecha, _, unidad), (cantidad, registros) in diarios.items():
+        total = semanales[(finca_id, lunes(fecha), unidad)]
+        total[0] += cantidad
+        total[1] += registros
+    return {clave: tuple(valor) for clave, valor in semanales.items()}
+
+
+def _acumular(modelo, columnas, totales):
+    """Suma `totales` {clave: (cantidad, registros)} a las filas del consolidado"""
+    if not totales:
+        return
+    tabla = modelo.__table__
+    claves = [tabla.c[nombre] for nombre in columnas]
+
+    # Claves ya existentes dentro del rango de fechas del tramo
+    fechas = [clave[1] for clave in totales]
+    fincas = {clave[0] for clave in totales}
+    consulta = select(*claves).where(claves[0].in_(fincas), claves[1].between(min(fechas), max(fechas)))
+    existentes = {tuple(fila) for fila in db.session.execute(consulta)}
+
+    actualizar, nuevas = [], []
+    for clave, (cantidad, registros) in totales.items():
+        fila = dict(zip(columnas, clave), cantidad=cantidad, registros=registros)
+        (actualizar if clave in existentes else nuevas).append(fila)
+
+    if actualizar:
+        sentencia = (update(tabla)
+                     .where(and_(*[columna == bindparam(f'clave_{columna.name}') for columna in claves]))
+                     .values(cantidad=tabla.c.cantidad + bindparam('suma_cantidad'),
+                             registros=tabla.c.registros + bindparam('suma_registros')))
+        db.session.execute(sentencia, [
+            {**{f'clave_{nombre}': fila[nombre] for nombre in columnas},
+             'suma_cantidad': fila['cantidad'], 'suma_registros': fila['registros']}
+            for fila in actualizar])
+    if nuevas:
+        db.session.execute(insert(tabla), nuevas)
+
+
+def _fin_de_tramo(anterior, limite_registro, tamano_tramo):
+    # El tramo termina antes del primer registro más reciente que el margen
+    reciente = db.session.execute(
+        select(func.min(Rendimiento.id))
+        .where(Rendimiento.id > anterior, Rendimiento.fecha_registro > limite_registro)).scalar()
+    ids = select(Rendimiento.id).where(Rendimiento.id > anterior)
+    if reciente is not None:
+        ids = ids.where(Rendimiento.id < reciente)
+    ids = ids.order_by(Rendimiento.id).limit(tamano_tramo).subquery()
+    return db.session.execute(select(func.max(ids.c.id))).scalar()
+
+
+def consolidar_pendientes(margen=MARGEN, tamano_tramo=TAMANO_TRAMO):
+    """Suma a los consolidados los registros posteriores a la marca de agua
+
+    Confirma cada tramo por separado. Devuelve la cantidad de registros
+    consolidados.
+    """
+    limite_registro = datetime.utcnow() - margen
+    total = 0
+    while True:
+        anterior = marca_actual()
+        hasta = _fin_de_tramo(anterior, limite_registro, tamano_tramo)
+        if hasta is None:
+            db.session.rollback()
+            return total
+
+        if not _reclamar_tramo(anterior, hasta):
+            # Otro proceso consolidó este tramo
+            db.session.rollback()
+            return total
+
+        diarios = _totales_diarios(and_(Rendimiento.id > anterior, Rendimiento.id <= hasta))
+        _acumular(RendimientoDiario, ('finca_id', 'fecha', 'area_id', 'unidad'), diarios)
+        _acumular(RendimientoSemanal, ('finca_id', 'semana', 'unidad'), _por_semana(diarios))
+        db.session.commit()
+        total += sum(registros for _, registros in diarios.values())
+
+
+def reconstruir(desde, hasta):
+    """Recalcula los consolidados de las semanas completas entre `desde` y `hasta`
+
+    Solo usa los registros que ya están por debajo de la marca de agua; los
+    posteriores los suma consolidar_pendientes. Devuelve (desde, hasta)
+    ajustados a semanas completas.
+    """
+    desde, hasta = lunes(desde), lunes(hasta) + timedelta(days=6)
+    marca = _bloquear_marca()
+
+    db.session.execute(delete(RendimientoDiario.__table__)
+                       .where(RendimientoDiario.fecha.between(desde, hasta)))
+    db.session.execute(delete(RendimientoSemanal.__table__)
+                       .where(RendimientoSemanal.semana.between(desde, hasta)))
+
+    diarios = _totales_diarios(and_(Rendimiento.fecha.between(desde, hasta), Rendimiento.id <= marca))
+    filas = [dict(finca_id=f, fecha=d, area_id=a, unidad=u, cantidad=c, registros=r)
+             for (f, d, a, u), (c, r) in diarios.items()]
+    if filas:
+        db.session.execute(insert(RendimientoDiario.__table__), filas)
+    filas = [dict(finca_id=f, semana=s, unidad=u, cantidad=c, registros=r)
+             for (f, s, u), (c, r) in _por_semana(diarios).items()]
+    if filas:
+        db.session.execute(insert(RendimientoSemanal.__table__), filas)
+    db.session.commit()
+    return desde, hasta
+
+
+def conciliar(ventana=VENTANA_CONCILIACION):
+    """Reconstruye las semanas con registros por debajo de la marca que faltan en los consolidados
+
+    Revisa los días con registros de las últimas `ventana` (por
+    fecha_registro). Devuelve la lista de semanas (lunes) reconstruidas.
+    """
+    marca = _bloquear_marca()
+    # El id y fecha_registro se asignan juntos al insertar: recorriendo la
+    # clave primaria hacia atrás, el primer registro anterior a la ventana
+    # marca dónde empieza, sin un índice sobre fecha_registro
+    inicio = db.session.execute(
+        select(Rendimiento.id)
+        .where(Rendimiento.id <= marca, Rendimiento.fecha_registro < datetime.utcnow() - ventana)
+        .order_by(Rendimiento.id.desc()).limit(1)).scalar() or 0
+    recientes = select(Rendimiento.fecha).distinct().where(Rendimiento.id > inicio, Rendimiento.id <= marca)
+    fechas = db.session.execute(recientes).scalars().all()
+    semanas = set()
+    for lote in lotes(sorted(fechas), MAX_PARAMETROS):
+        diarios = _totales_diarios(and_(Rendimiento.fecha.in_(lote), Rendimiento.id <= marca))
+        consolidados = {
+            (fila.finca_id, fila.fecha, fila.area_id, fila.unidad): (fila.cantidad, fila.registros)
+            for fila in RendimientoDiario.query.filter(RendimientoDiario.fecha.in_(lote))}
+        for clave in diarios.keys() | consolidados.keys():
+            if diarios.get(clave) != consolidados.get(clave):
+                semanas.add(lunes(clave[1]))
+    # reconstruir confirma; sin diferencias se libera el bloqueo
+    db.session.rollback()
+    for semana in sorted(semanas):
+        reconstruir(semana, semana)
+    return sorted(semanas)
+
+
+def totales_por_area(desde, hasta, finca_id=None):
+    """[(finca, área, unidad, cantidad, registros)] del rango, leído del consolidado diario"""
+    consulta = (select(Finca.nombre, Area.nombre, RendimientoDiario.unidad,
+                       func.sum(RendimientoDiario.cantidad), func.sum(RendimientoDiario.registros))
+                .join(Area, RendimientoDiario.area_id == Area.id)
+                .join(Finca, RendimientoDiario.finca_id == Finca.id)
+                .where(RendimientoDiario.fecha.between(desde, hasta))
+                .group_by(Finca.nombre, Area.nombre, RendimientoDiario.unidad)
+                .order_by(Finca.nombre, Area.nombre, RendimientoDiario.unidad))
+    if finca_id is not None:
+        consulta = consulta.where(RendimientoDiario.finca_id == finca_id)
+    return db.session.execute(consulta).all()
+
+
+def totales_por_dia(desde, hasta, finca_id=None):
+    """[(fecha, unidad, cantidad, registros)] del rango, leído del consolidado diario"""
+    consulta = (select(RendimientoDiario.fecha, RendimientoDiario.unidad,
+                       func.sum(RendimientoDiario.cantidad), func.sum(RendimientoDiario.registros))
+                .where(RendimientoDiario.fecha.between(desde, hasta))
+                .group_by(RendimientoDiario.fecha, RendimientoDiario.unidad)
+                .order_by(RendimientoDiario.fecha, RendimientoDiario.unidad))
+    if finca_id is not None:
+        consulta = consulta.where(RendimientoDiario.finca_id == finca_id)
+    return db.session.execute(consulta).all()
+
+
+def totales_por_semana(desde, hasta, finca_id=None):
+    """[(semana, unidad, cantidad, registros)] de las semanas del rango, leído del consolidado semanal"""
+    consulta = (select(RendimientoSemanal.semana, RendimientoSemanal.unidad,
+                       func.sum(RendimientoSemanal.cantidad), func.sum(RendimientoSemanal.registros))
+                .where(RendimientoSemanal.semana.between(lunes(desde), hasta))
+                .group_by(RendimientoSemanal.semana, RendimientoSemanal.unidad)
+                .order_by(RendimientoSemanal.semana, RendimientoSemanal.unidad))
+    if finca_id is not None:
+        consulta = consulta.where(RendimientoSemanal.finca_id == finca_id)
+    return db.session.execute(consulta).all()
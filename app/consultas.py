@@ -0,0 +1,31 @@
+from collections import defaultdict
+
+from sqlalchemy.orm import joinedload
+
+from app.models import Area, Codigo
+
+# Consultas compartidas por las pantallas de asignaciones. Cada función emite
+# una sola sentencia sin importar cuántas áreas haya, para no repetir una
+# consulta por área contra el servidor remoto.
+
+
+def areas_activas(finca_id=None):
+    """Áreas activas con su finca y supervisor cargados en la misma consulta"""
+    consulta = Area.query.options(joinedload(Area.finca), joinedload(Area.supervisor)).filter_by(activa=True)
+    if finca_id is not None:
+        consulta = consulta.filter_by(finca_id=finca_id)
+    return consulta.order_by(Area.id).all()
+
+
+def codigos_activos_por_area(finca_id=None):
+    """Códigos activos agrupados por área activa: {area_id: [Codigo, ...]}"""
+    consulta = (Codigo.query
+                .join(Area, Codigo.area_id == Area.id)
+                .filter(Area.activa == True, Codigo.activo == True))
+    if finca_id is not None:
+        consulta = consulta.filter(Area.finca_id == finca_id)
+
+    agrupados = defaultdict(list)
+    for codigo in consulta.order_by(Codigo.area_id, Codigo.codigo).all():
+        agrupados[codigo.area_id].append(codigo)
+    return agrupados
@@ -0,0 +1,63 @@
+import logging
+from collections import defaultdict
+
+from sqlalchemy import event
+
+# Avisos de cambios confirmados. Los eventos de la sesión anotan qué filas
+# se tocaron durante la transacción y, tras el commit, se llama a cada
+# suscriptor con {tabla: {ids}}. Las sentencias masivas (INSERT/UPDATE/DELETE
+# ejecutados directamente) no identifican filas y se anotan con el id None.
+
+logger = logging.getLogger(__name__)
+
+_suscriptores = []
+
+
+def al_confirmar(funcion):
+    """Registra funcion(cambios) para llamarla después de cada commit"""
+    _suscriptores.append(funcion)
+    return funcion
+
+
+def registrar_eventos(sesion):
+    """Conecta los eventos a la sesión de Flask-SQLAlchemy (una sola vez)"""
+    if event.contains(sesion, 'after_flush', _despues_de_flush):
+        return
+    event.listen(sesion, 'after_flush', _despues_de_flush)
+    event.listen(sesion, 'do_orm_execute', _al_ejecutar)
+    event.listen(sesion, 'after_commit', _despues_de_commit)
+    event.listen(sesion, 'after_rollback', _despues_de_rollback)
+
+
+def _cambios(session):
+    return session.info.setdefault('cambios_pendientes', defaultdict(set))
+
+
+def _despues_de_flush(session, flush_context):
+    cambios = _cambios(session)
+    for objeto in list(session.new) + list(session.dirty) + list(session.deleted):
+        tabla = getattr(objeto, '__tablename__', None)
+        if tabla:
+            cambios[tabla].add(getattr(objeto, 'id', None))
+
+
+def _al_ejecutar(estado):
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        tabla = getattr(estado.statement, 'table', None)
+        if tabla is not None:
+            _cambios(estado.session)[tabla.name].add(None)
+
+
+def _despues_de_commit(session):
+    cambios = session.info.pop('cambios_pendientes', None)
+    if not cambios:
+        return
+    for funcion in _suscriptores:
+        try:
+            funcion(cambios)
+        except Exception:
+            logger.exception('Error notificando cambios a %s', funcion.__name__)
+
+
+def _despues_de_rollback(session):
+    session.info.pop('cambios_pendientes', None)
@@ -0,0 +1,97 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+
+from flask import Response, flash, redirect, request, send_file, stream_with_context
+
+from app.models import db
+
+# Exportación de listados. Las filas se leen con un cursor del lado del
+# servidor (yield_per) y se escriben a la respuesta a medida que llegan, de
+# modo que el worker nunca tiene en memoria el resultado completo.
+
+FILAS_POR_LECTURA = 1000
+
+
+def _valor(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'Sí' if valor else 'No'
+    return valor
+
+
+def _filas(consulta):
+    resultado = db.session.execute(consulta.execution_options(yield_per=FILAS_POR_LECTURA))
+    for particion in resultado.partitions():
+        for fila in particion:
+            yield [_valor(valor) for valor in fila]
+
+
+def _nombre_archivo(nombre, extension):
+    return f"{nombre}_{datetime.now().strftime('%Y%m%d_%H%M')}.{extension}"
+
+
+def respuesta_csv(nombre, encabezados, consulta):
+    """Respuesta HTTP que va enviando el CSV por bloques de filas"""
+    def generar():
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        # BOM para que Excel reconozca UTF-8 (tildes y ñ)
+        buffer.write('\ufeff')
+        escritor.writerow(encabezados)
+        for numero, fila in enumerate(_filas(consulta), start=1):
+            escritor.writerow(fila)
+            if numero % FILAS_POR_LECTURA == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generar()), mimetype='text/csv; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename={_nombre_archivo(nombre, "csv")}'})
+
+
+def respuesta_xlsx(nombre, encabezados, consulta):
+    """Respuesta HTTP con un XLSX escrito en modo de memoria constante"""
+    import xlsxwriter
+
+    descriptor, ruta = tempfile.mkstemp(suffix='.xlsx')
+    os.close(descriptor)
+    try:
+        # constant_memory escribe cada fila al disco en cuanto se completa
+        libro = xlsxwriter.Workbook(ruta, {'constant_memory': True,
+                                           'default_date_format': 'dd/mm/yyyy hh:mm'})
+        hoja = libro.add_worksheet(nombre.capitalize())
+        hoja.write_row(0, 0, encabezados, libro.add_format({'bold': True}))
+        for numero, fila in enumerate(_filas(consulta), start=1):
+            hoja.write_row(numero, 0, fila)
+        libro.close()
+
+        archivo = open(ruta, 'rb')
+    except Exception:
+        os.remove(ruta)
+        raise
+
+    respuesta = send_file(archivo, as_attachment=True, download_name=_nombre_archivo(nombre, 'xlsx'),
+                          mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+    def limpiar():
+        archivo.close()
+        os.remove(ruta)
+
+    respuesta.call_on_close(limpiar)
+    return respuesta
+
+
+def respuesta_exportacion(nombre, encabezados, consulta, formato='csv'):
+    """Exporta el resultado de `consulta` como CSV o XLSX"""
+    if formato == 'xlsx':
+        try:
+            return respuesta_xlsx(nombre, encabezados, consulta)
+        except ImportError:
+            flash('La exportación a Excel requiere el paquete XlsxWriter', 'error')
+            return redirect(request.referrer or '/')
+    return respuesta_csv(nombre, encabezados, consulta)
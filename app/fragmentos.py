@@ -0,0 +1,76 @@
+from flask import current_app, render_template, session
+from markupsafe import Markup
+
+from app.cache import CacheLRU
+from app.eventos import al_confirmar
+
+# Caché de fragmentos HTML: filas del listado de códigos y tarjetas de
+# gestionar asignaciones. Renderizar miles de filas cuesta más que la
+# consulta, así que cada fragmento se guarda ya renderizado.
+#
+# La clave incluye la fecha_modificacion de todo lo que muestra el
+# fragmento, por eso un dato cambiado nunca reutiliza HTML viejo (tampoco si
+# el cambio lo hizo otro worker). Además, tras cada commit se descartan los
+# fragmentos de las filas tocadas: una reasignación vuelve a renderizar solo
+# las tarjetas y filas afectadas. Las sentencias masivas (id None) descartan
+# todos los fragmentos de la tabla.
+
+_cache = CacheLRU()
+
+# Roles que ven los botones de edición en el listado de códigos
+ROLES_EDICION = ('admin', 'rrhh', 'jefe_cultivo')
+
+
+def _dependencias(*filas):
+    dependencias = []
+    for tabla, id_ in filas:
+        if id_ is not None:
+            dependencias += [(tabla, id_), (tabla, None)]
+    return dependencias
+
+
+def _fragmento(plantilla, clave, dependencias, **contexto):
+    html = _cache.obtener(clave)
+    if html is None:
+        html = Markup(render_template(plantilla, **contexto))
+        _cache.guardar(clave, html, dependencias, current_app.config['FRAGMENTOS_CACHE_MAX'])
+    return html
+
+
+def fila_codigo(codigo):
+    """Fila <tr> del listado de códigos (area y finca ya cargadas)"""
+    area, finca = codigo.area, codigo.finca
+    editor = session.get('rol') in ROLES_EDICION
+    clave = ('fila_codigo', codigo.id, codigo.fecha_modificacion, editor,
+             area.id if area else None, area.fecha_modificacion if area else None,
+             finca.id if finca else None, finca.fecha_modificacion if finca else None)
+    dependencias = _dependencias(('app_codigo', codigo.id), ('app_area', codigo.area_id),
+                                 ('app_finca', codigo.finca_id))
+    return _fragmento('codigos/_fila.html', clave, dependencias, codigo=codigo)
+
+
+def tarjeta_area(info):
+    """Tarjeta de un área en gestionar asignaciones, con supervisor y códigos"""
+    area, supervisor, codigos = info['area'], info['supervisor'], info['codigos']
+    clave = ('tarjeta_area', area.id, area.fecha_modificacion,
+             area.finca.fecha_modificacion,
+             supervisor.id if supervisor else None, supervisor.fecha_modificacion if supervisor else None,
+             len(codigos),
+             max((codigo.fecha_modificacion for codigo in codigos if codigo.fecha_modificacion), default=None))
+    dependencias = _dependencias(('app_area', area.id), ('app_finca', area.finca_id),
+                                 ('app_supervisor', area.supervisor_id),
+                                 *[('app_codigo', codigo.id) for codigo in codigos])
+    return _fragmento('areas/_tarjeta.html', clave, dependencias, info=info)
+
+
+def registrar_fragmentos(app):
+    """Expone los fragmentos a las plantillas"""
+    app.add_template_global(fila_codigo)
+    app.add_template_global(tarjeta_area)
+
+
+@al_confirmar
+def _invalidar(cambios):
+    for tabla, ids in cambios.items():
+        for id_ in ids:
+            _cache.invalidar_dependencia((tabla, id_))
@@ -0,0 +1,154 @@
+from datetime import date, datetime
+
+from sqlalchemy import func, or_, select
+
+from app.models import db
+
+# Tablas con procesamiento del lado del servidor (protocolo de DataTables).
+# El navegador pide una página (start/length) con orden, búsqueda global y
+# filtros por columna; el servidor devuelve solo esas filas y los totales.
+#
+# La página se obtiene en dos pasos: primero los ids de la página, ordenados
+# y filtrados sobre la tabla principal (el OFFSET recorre solo el índice),
+# y luego las columnas a mostrar, con sus uniones, solo para esos ids.
+# Únicamente se ordena por columnas con índice, y el id desempata.
+
+POR_PAGINA = 25
+MAX_POR_PAGINA = 200
+MAX_COLUMNAS = 50
+
+
+class ErrorGrid(Exception):
+    pass
+
+
+class Columna:
+    """Columna de la tabla: `nombre` es el `data` que usa DataTables
+
+    `filtro` indica cómo se aplica el filtro de columna: 'exacto' (entero),
+    'booleano' ('1'/'0'), 'prefijo' o 'contiene'. Solo pueden filtrarse
+    columnas de la tabla principal.
+    """
+
+    def __init__(self, nombre, expresion, ordenable=False, filtro=None):
+        self.nombre = nombre
+        self.expresion = expresion
+        self.ordenable = ordenable
+        self.filtro = filtro
+
+
+class Grid:
+    """Definición de la tabla de una entidad; debe incluir la columna 'id'"""
+
+    def __init__(self, modelo, columnas, uniones=(), busqueda=None):
+        self.modelo = modelo
+        self.columnas = {columna.nombre: columna for columna in columnas}
+        # (modelo, condición) unidos con OUTER JOIN al leer la página
+        self.uniones = uniones
+        # busqueda(texto, finca_id) -> condición, o None para ignorar el texto
+        self.busqueda = busqueda
+
+
+def _patron(texto, prefijo=False):
+    texto = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{texto}%' if prefijo else f'%{texto}%'
+
+
+def buscar_en(*columnas):
+    """Búsqueda global por texto contenido en cualquiera de `columnas` (tablas chicas)"""
+    def busqueda(texto, finca_id=None):
+        return or_(*[columna.ilike(_patron(texto), escape='\\') for columna in columnas])
+    return busqueda
+
+
+def _condicion_columna(columna, valor):
+    if columna.filtro == 'exacto':
+        if not valor.isdigit():
+            raise ErrorGrid(f'Filtro inválido para {columna.nombre}')
+        return columna.expresion == int(valor)
+    if columna.filtro == 'booleano':
+        if valor not in ('1', '0'):
+            raise ErrorGrid(f'Filtro inválido para {columna.nombre}')
+        return columna.expresion == (valor == '1')
+    if columna.filtro == 'prefijo':
+        return columna.expresion.like(_patron(valor, prefijo=True), escape='\\')
+    return columna.expresion.ilike(_patron(valor), escape='\\')
+
+
+def leer_parametros(args):
+    """Parámetros del protocolo server-side de DataTables"""
+    largo = args.get('length', POR_PAGINA, type=int)
+    parametros = {
+        'draw': args.get('draw', 0, type=int),
+        'start': max(0, args.get('start', 0, type=int)),
+        # DataTables envía -1 para "todas": se limita igual que el resto
+        'length': MAX_POR_PAGINA if largo < 0 else max(1, min(largo, MAX_POR_PAGINA)),
+        'busqueda': args.get('search[value]', '').strip(),
+        'columnas': [],
+        'orden': [],
+    }
+    for i in range(MAX_COLUMNAS):
+        nombre = args.get(f'columns[{i}][data]')
+        if nombre is None:
+            break
+        parametros['columnas'].append((nombre, args.get(f'columns[{i}][search][value]', '').strip()))
+    for i in range(MAX_COLUMNAS):
+        indice = args.get(f'order[{i}][column]', type=int)
+        if indice is None:
+            break
+        parametros['orden'].append((indice, args.get(f'order[{i}][dir]', 'asc')))
+    return parametros
+
+
+def _valor(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def responder(grid, parametros, condiciones=(), finca_id=None):
+    """Respuesta de DataTables para `grid` limitada por `condiciones` (alcance del usuario)"""
+    modelo = grid.modelo
+    alcance = list(condiciones)
+    filtros = []
+    if parametros['busqueda'] and grid.busqueda:
+        condicion = grid.busqueda(parametros['busqueda'], finca_id)
+        if condicion is not None:
+            filtros.append(condicion)
+    for nombre, valor in parametros['columnas']:
+        columna = grid.columnas.get(nombre)
+        if valor and columna is not None and columna.filtro:
+            filtros.append(_condicion_columna(columna, valor))
+
+    orden = []
+    for indice, direccion in parametros['orden']:
+        if indice >= len(parametros['columnas']):
+            continue
+        columna = grid.columnas.get(parametros['columnas'][indice][0])
+        if columna is None or not columna.ordenable:
+            continue
+        orden.append(columna.expresion.desc() if direccion == 'desc' else columna.expresion.asc())
+    orden.append(modelo.id.asc())
+
+    def contar(condiciones):
+        return db.session.execute(select(func.count()).select_from(modelo).where(*condiciones)).scalar()
+
+    total = contar(alcance)
+    filtrados = contar(alcance + filtros) if filtros else total
+
+    ids = db.session.execute(select(modelo.id).where(*alcance, *filtros)
+                             .order_by(*orden)
+                             .offset(parametros['start'])
+                             .limit(parametros['length'])).scalars().all()
+    datos = []
+    if ids:
+        columnas = list(grid.columnas.values())
+        consulta = select(*[columna.expresion.label(columna.nombre) for columna in columnas]).select_from(modelo)
+        for union, condicion in grid.uniones:
+            consulta = consulta.outerjoin(union, condicion)
+        por_id = {}
+        for fila in db.session.execute(consulta.where(modelo.id.in_(ids))):
+            por_id[fila.id] = {nombre: _valor(valor) for nombre, valor in fila._mapping.items()}
+        datos = [por_id[id_] for id_ in ids if id_ in por_id]
+
+    return {'draw': parametros['draw'], 'recordsTotal': total, 'recordsFiltered': filtrados, 'data': datos}
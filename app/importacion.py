@@ -0,0 +1,201 @@
+import csv
+import io
+import uuid
+from datetime import datetime
+
+from sqlalchemy import and_, delete, exists, insert, literal, select
+
+from app.models import db, Area, Codigo, CodigoImportacion, Finca
+from app.operaciones_masivas import TAMANO_LOTE
+
+# Importación de códigos desde CSV. El archivo se lee fila a fila, se valida
+# contra conjuntos precargados (códigos existentes por finca, áreas y
+# fincas), las filas válidas se cargan por lotes en app_codigo_staging y al
+# final se pasan a app_codigo con un INSERT ... SELECT. No confirma la
+# transacción: eso queda a cargo de quien llama.
+
+# Encabezados aceptados y la columna a la que corresponden
+ENCABEZADOS = {
+    'codigo': 'codigo', 'código': 'codigo',
+    'nombre_persona': 'nombre_persona', 'nombre': 'nombre_persona',
+    'apellido_persona': 'apellido_persona', 'apellido': 'apellido_persona',
+    'telefono': 'telefono', 'teléfono': 'telefono',
+    'area_id': 'area_id',
+    'finca_id': 'finca_id',
+}
+
+LONGITUDES = {'codigo': 20, 'nombre_persona': 100, 'apellido_persona': 100, 'telefono': 20}
+
+# Errores que se conservan para el informe
+MAX_ERRORES = 5000
+
+
+class ErrorImportacion(Exception):
+    pass
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.filas = 0
+        self.importados = 0
+        self.errores = []
+        self.errores_omitidos = 0
+
+    def error(self, fila, codigo, mensaje):
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'fila': fila, 'codigo': codigo, 'error': mensaje})
+        else:
+            self.errores_omitidos += 1
+
+    @property
+    def total_errores(self):
+        return len(self.errores) + self.errores_omitidos
+
+
+class _Validador:
+    """Valida filas contra datos precargados, sin consultas por fila"""
+
+    def __init__(self, finca_id):
+        self.finca_id = finca_id
+        self.fincas = set(db.session.execute(select(Finca.id)).scalars())
+        self.areas = dict(db.session.execute(select(Area.id, Area.finca_id).where(Area.activa == True)).all())
+        self._existentes = {}
+        self.vistos = set()
+
+    def existentes(self, finca_id):
+        # Códigos ya registrados, cargados una vez por cada finca del archivo
+        if finca_id not in self._existentes:
+            consulta = select(Codigo.codigo).where(Codigo.finca_id == finca_id)
+            self._existentes[finca_id] = set(db.session.execute(consulta).scalars())
+        return self._existentes[finca_id]
+
+    def validar(self, datos):
+        """Devuelve (fila_normalizada, None) o (None, mensaje de error)"""
+        for campo in ('codigo', 'nombre_persona', 'apellido_persona'):
+            if not datos.get(campo):
+                return None, f'Falta el campo {campo}'
+        for campo, maximo in LONGITUDES.items():
+            if len(datos.get(campo) or '') > maximo:
+                return None, f'{campo} supera {maximo} caracteres'
+
+        if self.finca_id is not None:
+            finca_id = self.finca_id
+            if datos.get('finca_id') and datos['finca_id'] != str(finca_id):
+                return None, 'Solo puedes importar códigos de tu finca'
+        elif not (datos.get('finca_id') or '').isdigit():
+            return None, 'Falta finca_id o no es un número'
+        else:
+            finca_id = int(datos['finca_id'])
+        if finca_id not in self.fincas:
+            return None, f'La finca {finca_id} no existe'
+
+        area_id = None
+        if datos.get('area_id'):
+            if not datos['area_id'].isdigit() or int(datos['area_id']) not in self.areas:
+                return None, f'El área {datos["area_id"]} no existe o no está activa'
+            area_id = int(datos['area_id'])
+            if self.areas[area_id] != finca_id:
+                return None, f'El área {area_id} no pertenece a la finca {finca_id}'
+
+        clave = (datos['codigo'], finca_id)
+        if clave in self.vistos:
+            return None, 'Código repetido en el archivo'
+        if datos['codigo'] in self.existentes(finca_id):
+            return None, 'El código ya existe en la finca'
+        self.vistos.add(clave)
+
+        return {
+            'codigo': datos['codigo'],
+            'nombre_persona': datos['nombre_persona'],
+            'apellido_persona': datos['apellido_persona'],
+            'telefono': datos.get('telefono') or '',
+            'area_id': area_id,
+            'finca_id': finca_id,
+        }, None
+
+
+def _leer_csv(archivo):
+    """Itera (número de fila, dict) normalizando encabezados y espacios"""
+    if isinstance(archivo, (bytes, bytearray)):
+        archivo = io.BytesIO(archivo)
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+
+    lector = csv.reader(texto, dialecto)
+    encabezados = next(lector, None)
+    if not encabezados:
+        raise ErrorImportacion('El archivo está vacío')
+    columnas = [ENCABEZADOS.get(e.strip().lower()) for e in encabezados]
+    faltantes = {'codigo', 'nombre_persona', 'apellido_persona'} - set(columnas)
+    if faltantes:
+        raise ErrorImportacion(f'Faltan columnas obligatorias: {", ".join(sorted(faltantes))}')
+
+    for numero, valores in enumerate(lector, start=2):
+        if not any(v.strip() for v in valores):
+            continue
+        yield numero, {c: v.strip() for c, v in zip(columnas, valores) if c}
+
+
+def importar_codigos(archivo, finca_id=None, progreso=None):
+    """Importa códigos desde un CSV (archivo binario o bytes)
+
+    Con finca_id todas las filas se asignan a esa finca; si es None cada
+    fila debe traer su columna finca_id. `progreso(filas_leidas)` se llama
+    después de cada lote. Devuelve un ResultadoImportacion.
+    """
+    resultado = ResultadoImportacion()
+    validador = _Validador(finca_id)
+    lote = str(uuid.uuid4())
+    tabla = CodigoImportacion.__table__
+    pendientes = []
+
+    def cargar():
+        db.session.execute(insert(tabla), pendientes)
+        pendientes.clear()
+        if progreso:
+            progreso(resultado.filas)
+
+    for numero, datos in _leer_csv(archivo):
+        resultado.filas += 1
+        fila, error = validador.validar(datos)
+        if error:
+            resultado.error(numero, datos.get('codigo', ''), error)
+            continue
+        pendientes.append(dict(fila, lote=lote, fila=numero))
+        if len(pendientes) >= TAMANO_LOTE:
+            cargar()
+    if pendientes:
+        cargar()
+
+    resultado.importados = _fusionar(lote, resultado)
+    return resultado
+
+
+def _fusionar(lote, resultado):
+    """Pasa las filas del lote a app_codigo con una sola sentencia"""
+    staging = CodigoImportacion.__table__
+    codigos = Codigo.__table__
+    ya_existe = exists().where(and_(codigos.c.codigo == staging.c.codigo,
+                                    codigos.c.finca_id == staging.c.finca_id))
+
+    columnas = ['codigo', 'nombre_persona', 'apellido_persona', 'telefono', 'area_id', 'finca_id',
+                'activo', 'fecha_creacion']
+    seleccion = (select(staging.c.codigo, staging.c.nombre_persona, staging.c.apellido_persona,
+                        staging.c.telefono, staging.c.area_id, staging.c.finca_id,
+                        literal(True), literal(datetime.utcnow()))
+                 .where(staging.c.lote == lote, ~ya_existe))
+
+    # Filas que otro usuario creó mientras se validaba el archivo
+    en_conflicto = db.session.execute(
+        select(staging.c.fila, staging.c.codigo).where(staging.c.lote == lote, ya_existe)).all()
+    for fila, codigo in en_conflicto:
+        resultado.error(fila, codigo, 'El código ya existe en la finca')
+
+    importados = db.session.execute(insert(codigos).from_select(columnas, seleccion)).rowcount
+    db.session.execute(delete(staging).where(staging.c.lote == lote))
+    return importados
@@ -0,0 +1,223 @@
+import bisect
+import threading
+import time
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+# Métricas por ruta: tiempo total de la petición, tiempo y cantidad de
+# sentencias SQL y tiempo de renderizado de plantillas. Cada petición acumula
+# sus valores en `g` y al terminar se suman a histogramas en memoria del
+# proceso, que se exponen en formato de texto de Prometheus en /metrics y en
+# la página de administración /sistema/metricas.
+#
+# El costo por petición es un par de perf_counter por sentencia y plantilla y
+# un lock al final. Cada worker tiene sus propios histogramas: Prometheus
+# debe consultar cada proceso (o sumar las series con su etiqueta de
+# instancia).
+
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CANTIDADES = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+class Histograma:
+    """Histograma acumulado con límites fijos (buckets de Prometheus)"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)  # El último es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.cuentas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        """[(límite, cantidad <= límite)] incluyendo +Inf"""
+        acumulado = 0
+        resultado = []
+        for limite, cuenta in zip(list(self.limites) + [float('inf')], self.cuentas):
+            acumulado += cuenta
+            resultado.append((limite, acumulado))
+        return resultado
+
+    def percentil(self, p):
+        """Estimación del percentil `p` (0-100) interpolando dentro del bucket"""
+        if not self.total:
+            return None
+        objetivo = self.total * p / 100
+        anterior_limite, anterior = 0.0, 0
+        for limite, acumulado in self.acumulados():
+            if acumulado >= objetivo:
+                if limite == float('inf'):
+                    return anterior_limite
+                cuenta = acumulado - anterior
+                return anterior_limite + (limite - anterior_limite) * (objetivo - anterior) / cuenta
+            anterior_limite, anterior = limite, acumulado
+        return anterior_limite
+
+
+class Metricas:
+    """Histogramas por (ruta, método, estado)"""
+
+    SERIES = (
+        ('peticion_segundos', 'Duración de la petición', SEGUNDOS),
+        ('sql_segundos', 'Tiempo en SQL por petición', SEGUNDOS),
+        ('sql_sentencias', 'Sentencias SQL por petición', CANTIDADES),
+        ('plantillas_segundos', 'Tiempo de renderizado de plantillas por petición', SEGUNDOS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = {}
+
+    def registrar(self, etiquetas, valores):
+        with self._lock:
+            series = self._datos.get(etiquetas)
+            if series is None:
+                series = self._datos[etiquetas] = {nombre: Histograma(limites)
+                                                   for nombre, _, limites in self.SERIES}
+            for nombre, valor in valores.items():
+                series[nombre].observar(valor)
+
+    def copia(self):
+        """{etiquetas: {serie: Histograma}} consistente para leer sin el lock"""
+        with self._lock:
+            copia = {}
+            for etiquetas, series in self._datos.items():
+                copia[etiquetas] = {}
+                for nombre, histograma in series.items():
+                    duplicado = Histograma(histograma.limites)
+                    duplicado.cuentas = list(histograma.cuentas)
+                    duplicado.suma, duplicado.total = histograma.suma, histograma.total
+                    copia[etiquetas][nombre] = duplicado
+            return copia
+
+    def reiniciar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+metricas = Metricas()
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def texto_prometheus(prefijo='agricultura'):
+    """Histogramas en el formato de exposición de texto de Prometheus"""
+    datos = metricas.copia()
+    lineas = []
+    for nombre, ayuda, _ in Metricas.SERIES:
+        completo = f'{prefijo}_{nombre}'
+        lineas.append(f'# HELP {completo} {ayuda}')
+        lineas.append(f'# TYPE {completo} histogram')
+        for (ruta, metodo, estado), series in sorted(datos.items()):
+            histograma = series[nombre]
+            base = f'ruta="{_etiqueta(ruta)}",metodo="{metodo}",estado="{estado}"'
+            for limite, acumulado in histograma.acumulados():
+                le = '+Inf' if limite == float('inf') else repr(float(limite))
+                lineas.append(f'{completo}_bucket{{{base},le="{le}"}} {acumulado}')
+            lineas.append(f'{completo}_sum{{{base}}} {histograma.suma:.6f}')
+            lineas.append(f'{completo}_count{{{base}}} {histograma.total}')
+    return '\n'.join(lineas) + '\n'
+
+
+def resumen_por_ruta():
+    """Filas para la página de estadísticas, las rutas más lentas primero"""
+    filas = []
+    for (ruta, metodo, estado), series in metricas.copia().items():
+        peticion = series['peticion_segundos']
+        total = peticion.total
+        filas.append({
+            'ruta': ruta, 'metodo': metodo, 'estado': estado, 'peticiones': total,
+            'p50_ms': peticion.percentil(50) * 1000, 'p95_ms': peticion.percentil(95) * 1000,
+            'promedio_ms': peticion.suma / total * 1000,
+            'sql_ms': series['sql_segundos'].suma / total * 1000,
+            'sentencias': series['sql_sentencias'].suma / total,
+            'plantillas_ms': series['plantillas_segundos'].suma / total * 1000,
+        })
+    return sorted(filas, key=lambda fila: fila['p95_ms'], reverse=True)
+
+
+# Acumulación por petición
+
+def _antes_de_peticion():
+    g.metricas = {'inicio': time.perf_counter(), 'sql': 0.0, 'sentencias': 0, 'plantillas': 0.0,
+                  'plantillas_abiertas': []}
+
+
+def _despues_de_peticion(respuesta):
+    if 'metricas' in g:
+        g.metricas['estado'] = respuesta.status_code
+    return respuesta
+
+
+def _al_terminar_peticion(error):
+    datos = g.pop('metricas', None)
+    if datos is None:
+        return
+    ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+    estado = datos.get('estado', 500)
+    metricas.registrar((ruta, request.method, estado), {
+        'peticion_segundos': time.perf_counter() - datos['inicio'],
+        'sql_segundos': datos['sql'],
+        'sql_sentencias': datos['sentencias'],
+        'plantillas_segundos': datos['plantillas'],
+    })
+
+
+def _datos_peticion():
+    if has_request_context():
+        return g.get('metricas')
+    return None
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info['metricas_inicio'].pop()
+    datos = _datos_peticion()
+    if datos is not None:
+        datos['sql'] += time.perf_counter() - inicio
+        datos['sentencias'] += 1
+
+
+def _error_de_sentencia(contexto):
+    # Sin after_cursor_execute: se descarta la marca de inicio pendiente
+    inicios = contexto.connection.info.get('metricas_inicio') if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+
+def _antes_de_plantilla(sender, template, context, **extra):
+    datos = _datos_peticion()
+    if datos is not None:
+        datos['plantillas_abiertas'].append(time.perf_counter())
+
+
+def _plantilla_renderizada(sender, template, context, **extra):
+    datos = _datos_peticion()
+    if datos is not None and datos['plantillas_abiertas']:
+        inicio = datos['plantillas_abiertas'].pop()
+        # Las plantillas anidadas (fragmentos) ya cuentan dentro de la externa
+        if not datos['plantillas_abiertas']:
+            datos['plantillas'] += time.perf_counter() - inicio
+
+
+def registrar_metricas(app, engine):
+    """Conecta la instrumentación a la aplicación y al engine"""
+    app.before_request(_antes_de_peticion)
+    app.after_request(_despues_de_peticion)
+    app.teardown_request(_al_terminar_peticion)
+    before_render_template.connect(_antes_de_plantilla, app)
+    template_rendered.connect(_plantilla_renderizada, app)
+    if not event.contains(engine, 'before_cursor_execute', _antes_de_sentencia):
+        event.listen(engine, 'before_cursor_execute', _antes_de_sentencia)
+        event.listen(engine, 'after_cursor_execute', _despues_de_sentencia)
+        event.listen(engine, 'handle_error', _error_de_sentencia)
@@ -15,6 +15,8 @@ class Usuario(db.Model):
     finca_id = db.Column(db.Integer, db.ForeignKey('app_finca.id'))  # Finca asignada (None para admin)
     activo = db.Column(db.Boolean, default=True)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    # Versión de los listados (app/versiones.py)
+    fecha_modificacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relaciones
     finca = db.relationship('Finca', backref='usuarios_asignados')
@@ -37,6 +39,8 @@ class Finca(db.Model):
     descripcion = db.Column(db.Text)
     activa = db.Column(db.Boolean, default=True)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    # Versión de los listados (app/versiones.py)
+    fecha_modificacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relaciones
     areas = db.relationship('Area', backref='finca', lazy=True)
@@ -54,11 +58,22 @@ class Area(db.Model):
     supervisor_id = db.Column(db.Integer, db.ForeignKey('app_supervisor.id'))  # Supervisor asignado
     activa = db.Column(db.Boolean, default=True)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
-    
+    # Cambios para la sincronización móvil y versión de los listados
+    fecha_modificacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     # Relaciones
     supervisor = db.relationship('Supervisor', backref='area_asignada', uselist=False)
     codigos = db.relationship('Codigo', backref='area', lazy=True)
     
+    # Índices de las consultas frecuentes: áreas activas de una finca y
+    # búsqueda del área de un supervisor
+    __table_args__ = (
+        db.Index('IX_app_area_finca_activa', 'finca_id', 'activa'),
+        db.Index('IX_app_area_supervisor_id', 'supervisor_id'),
+        # Cambios de una finca para la sincronización
+        db.Index('IX_app_area_finca_modificacion', 'finca_id', 'fecha_modificacion', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Area {self.nombre}>'
 
@@ -74,6 +89,12 @@ class Supervisor(db.Model):
     activo = db.Column(db.Boolean, default=True)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
     fecha_ultimo_acceso = db.Column(db.DateTime)
+    # Cambios para la sincronización móvil y versión de los listados
+    fecha_modificacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('IX_app_supervisor_modificacion', 'fecha_modificacion', 'id'),
+    )
     
     def __repr__(self):
         return f'<Supervisor {self.nombre} {self.apellido}>'
@@ -90,12 +111,158 @@ class Codigo(db.Model):
     finca_id = db.Column(db.Integer, db.ForeignKey('app_finca.id'), nullable=False)  # Finca del código
     activo = db.Column(db.Boolean, default=True)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    # Cambios para la sincronización móvil y versión de los listados
+    fecha_modificacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relación con finca
     finca = db.relationship('Finca', backref='codigos')
     
-    # Constraint único: código debe ser único dentro de cada finca
-    __table_args__ = (db.UniqueConstraint('codigo', 'finca_id', name='_codigo_finca_uc'),)
+    __table_args__ = (
+        # Constraint único: código debe ser único dentro de cada finca
+        db.UniqueConstraint('codigo', 'finca_id', name='_codigo_finca_uc'),
+        # Filtros del listado (finca, área, activo) en el orden de la paginación
+        db.Index('IX_app_codigo_finca_area_activo', 'finca_id', 'area_id', 'activo', 'codigo'),
+        # Orden del listado paginado: finca, código
+        db.Index('IX_app_codigo_finca_codigo', 'finca_id', 'codigo'),
+        # Códigos de un área (asignaciones por área)
+        db.Index('IX_app_codigo_area_id', 'area_id'),
+        # Cambios de una finca para la sincronización
+        db.Index('IX_app_codigo_finca_modificacion', 'finca_id', 'fecha_modificacion', 'id'),
+    )
     
     def __repr__(self):
         return f'<Codigo {self.codigo} (Finca {self.finca_id})>'
+
+class CodigoImportacion(db.Model):
+    __tablename__ = 'app_codigo_staging'
+    
+    # Tabla intermedia de la importación CSV: las filas validadas se cargan
+    # aquí por lotes y luego se pasan a app_codigo con un solo INSERT ... SELECT
+    id = db.Column(db.Integer, primary_key=True)
+    lote = db.Column(db.String(36), nullable=False, index=True)  # Identificador de la importación
+    fila = db.Column(db.Integer, nullable=False)  # Número de fila en el archivo
+    codigo = db.Column(db.String(20), nullable=False)
+    nombre_persona = db.Column(db.String(100), nullable=False)
+    apellido_persona = db.Column(db.String(100), nullable=False)
+    telefono = db.Column(db.String(20))
+    area_id = db.Column(db.Integer)
+    finca_id = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<CodigoImportacion {self.codigo} (Lote {self.lote})>'
+
+class Rendimiento(db.Model):
+    __tablename__ = 'app_rendimiento'
+    
+    # Registro diario de cosecha por código. Tabla de solo inserción con gran
+    # volumen: BIGINT en SQL Server (SQLite solo autoincrementa INTEGER)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    codigo_id = db.Column(db.Integer, db.ForeignKey('app_codigo.id'), nullable=False)
+    area_id = db.Column(db.Integer, db.ForeignKey('app_area.id'), nullable=False)  # Área donde se cosechó
+    finca_id = db.Column(db.Integer, db.ForeignKey('app_finca.id'), nullable=False)
+    supervisor_id = db.Column(db.Integer, db.ForeignKey('app_supervisor.id'))  # Quién lo registró
+    fecha = db.Column(db.Date, nullable=False)  # Día de la cosecha
+    cantidad = db.Column(db.Numeric(12, 2), nullable=False)
+    unidad = db.Column(db.String(20), nullable=False, default='tallos')
+    fecha_registro = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Consultas por día: finca y día, luego por área
+        db.Index('IX_app_rendimiento_finca_fecha_area', 'finca_id', 'fecha', 'area_id'),
+        # Historial de un área
+        db.Index('IX_app_rendimiento_area_fecha', 'area_id', 'fecha'),
+        # Historial de un trabajador
+        db.Index('IX_app_rendimiento_codigo_fecha', 'codigo_id', 'fecha'),
+    )
+    
+    def __repr__(self):
+        return f'<Rendimiento {self.codigo_id} {self.fecha} {self.cantidad} {self.unidad}>'
+
+class RendimientoDiario(db.Model):
+    __tablename__ = 'app_rendimiento_diario'
+    
+    # Consolidado por finca, día, área y unidad; lo mantiene app/consolidacion.py
+    finca_id = db.Column(db.Integer, db.ForeignKey('app_finca.id'), primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    area_id = db.Column(db.Integer, db.ForeignKey('app_area.id'), primary_key=True)
+    unidad = db.Column(db.String(20), primary_key=True)
+    cantidad = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    registros = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<RendimientoDiario {self.finca_id} {self.fecha} {self.area_id} {self.cantidad} {self.unidad}>'
+
+class RendimientoSemanal(db.Model):
+    __tablename__ = 'app_rendimiento_semanal'
+    
+    # Consolidado por finca y semana (lunes de la semana) y unidad
+    finca_id = db.Column(db.Integer, db.ForeignKey('app_finca.id'), primary_key=True)
+    semana = db.Column(db.Date, primary_key=True)
+    unidad = db.Column(db.String(20), primary_key=True)
+    cantidad = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    registros = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<RendimientoSemanal {self.finca_id} {self.semana} {self.cantidad} {self.unidad}>'
+
+class Consolidacion(db.Model):
+    __tablename__ = 'app_consolidacion'
+    
+    # Marca de agua de cada proceso de consolidación: último id ya sumado
+    nombre = db.Column(db.String(50), primary_key=True)
+    ultimo_id = db.Column(db.BigInteger, nullable=False, default=0)
+    fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Consolidacion {self.nombre} {self.ultimo_id}>'
+
+class Trabajo(db.Model):
+    __tablename__ = 'app_trabajo'
+    
+    # Operación masiva ejecutada en segundo plano (app/trabajos.py)
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')  # pendiente, en_curso, terminado, fallido
+    usuario_id = db.Column(db.Integer, db.ForeignKey('app_usuario.id'))  # Quién lo pidió
+    parametros = db.Column(db.Text)  # JSON
+    progreso = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)  # None si no se conoce de antemano
+    resultado = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_inicio = db.Column(db.DateTime)
+    fecha_fin = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # Trabajos recientes de un usuario
+        db.Index('IX_app_trabajo_usuario_fecha', 'usuario_id', 'fecha_creacion'),
+    )
+    
+    def __repr__(self):
+        return f'<Trabajo {self.id} {self.tipo} {self.estado}>'
+
+class Auditoria(db.Model):
+    __tablename__ = 'app_auditoria'
+    
+    # Cambio confirmado en los datos maestros (app/auditoria.py). Sin FK a
+    # usuario: las filas se escriben en segundo plano, después del commit
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    tabla = db.Column(db.String(50), nullable=False)
+    registro_id = db.Column(db.Integer)  # None en sentencias masivas
+    accion = db.Column(db.String(20), nullable=False)  # insertar, actualizar, eliminar, masivo
+    usuario_id = db.Column(db.Integer)  # None si no hubo usuario (scripts)
+    cambios = db.Column(db.Text)  # JSON {columna: [antes, después]}
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Historial de una entidad y cambios de un usuario, recientes primero
+        db.Index('IX_app_auditoria_entidad', 'tabla', 'registro_id', 'id'),
+        db.Index('IX_app_auditoria_usuario', 'usuario_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<Auditoria {self.tabla} {self.registro_id} {self.accion}>'
+
+# Registra el índice de búsqueda (FTS5 / tabla de términos) para que se cree
+# y elimine junto con app_codigo
+from app import busqueda  # noqa: E402,F401
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Opciones del motor de SQLAlchemy para el servidor remoto. Se leen de
+# variables de entorno en create_app para poder ajustar el pool por
+# despliegue sin tocar los archivos de configuración.
+#
+#   DB_POOL_SIZE          conexiones permanentes del pool (10)
+#   DB_MAX_OVERFLOW       conexiones extra en picos (20)
+#   DB_POOL_TIMEOUT       segundos de espera por una conexión libre (30)
+#   DB_POOL_RECYCLE       segundos antes de reabrir una conexión (1800)
+#   DB_POOL_PRE_PING      verificar la conexión antes de usarla (1)
+#   DB_FAST_EXECUTEMANY   executemany en bloque con pyodbc (1)
+#   DB_STATEMENT_TIMEOUT  segundos máximos por sentencia, 0 = sin límite (0)
+#   DB_LOGIN_TIMEOUT      segundos para establecer la conexión (15)
+
+
+def _entero(entorno, nombre, defecto):
+    valor = entorno.get(nombre)
+    return int(valor) if valor not in (None, '') else defecto
+
+
+def _booleano(entorno, nombre, defecto):
+    valor = entorno.get(nombre)
+    if valor in (None, ''):
+        return defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+
+class PoolConEstadisticas(QueuePool):
+    """QueuePool que además cuenta las esperas por una conexión libre"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_estadisticas = threading.Lock()
+        self.esperas = 0
+        self.tiempo_espera = 0.0
+        self.agotamientos = 0
+
+    def _do_get(self):
+        # Sin conexiones libres y sin margen de desborde la petición espera
+        sin_libres = self.checkedin() == 0
+        sin_desborde = self._max_overflow > -1 and self.overflow() >= self._max_overflow
+        if not (sin_libres and sin_desborde):
+            return super()._do_get()
+
+        inicio = time.perf_counter()
+        agotado = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            agotado = True
+            raise
+        finally:
+            with self._lock_estadisticas:
+                self.esperas += 1
+                self.tiempo_espera += time.perf_counter() - inicio
+                if agotado:
+                    self.agotamientos += 1
+
+
+def opciones_motor(uri, entorno=None):
+    """SQLALCHEMY_ENGINE_OPTIONS para la URI indicada"""
+    entorno = os.environ if entorno is None else entorno
+    opciones = {'pool_pre_ping': _booleano(entorno, 'DB_POOL_PRE_PING', True)}
+
+    # SQLite usa los pools por defecto de Flask-SQLAlchemy
+    if uri.startswith('sqlite'):
+        return opciones
+
+    opciones.update({
+        'poolclass': PoolConEstadisticas,
+        'pool_size': _entero(entorno, 'DB_POOL_SIZE', 10),
+        'max_overflow': _entero(entorno, 'DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _entero(entorno, 'DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _entero(entorno, 'DB_POOL_RECYCLE', 1800),
+    })
+
+    if uri.startswith('mssql+pyodbc'):
+        # Con pyodbc los executemany se envían en bloque en lugar de fila por fila
+        opciones['fast_executemany'] = _booleano(entorno, 'DB_FAST_EXECUTEMANY', True)
+        # pyodbc.connect(timeout=...) es el tiempo máximo de inicio de sesión
+        opciones['connect_args'] = {'timeout': _entero(entorno, 'DB_LOGIN_TIMEOUT', 15)}
+
+    return opciones
+
+
+def timeout_sentencias(entorno=None):
+    """Segundos de DB_STATEMENT_TIMEOUT, 0 si no hay límite"""
+    entorno = os.environ if entorno is None else entorno
+    return _entero(entorno, 'DB_STATEMENT_TIMEOUT', 0)
+
+
+def configurar_timeout_sentencias(engine, segundos):
+    """Limita la duración de cada sentencia en las conexiones nuevas de pyodbc"""
+    if engine.dialect.driver != 'pyodbc':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def fijar_timeout(dbapi_connection, connection_record):
+        dbapi_connection.timeout = segundos
+
+
+def estadisticas_pool(engine):
+    """Estado actual del pool de conexiones del motor"""
+    pool = engine.pool
+    datos = {'clase': type(pool).__name__, 'estado': pool.status()}
+    if isinstance(pool, QueuePool):
+        datos.update({
+            'tamano': pool.size(),
+            'en_uso': pool.checkedout(),
+            'disponibles': pool.checkedin(),
+            'desborde': max(pool.overflow(), 0),
+            'max_desborde': pool._max_overflow,
+        })
+    if isinstance(pool, PoolConEstadisticas):
+        datos.update({
+            'esperas': pool.esperas,
+            'tiempo_espera': round(pool.tiempo_espera, 3),
+            'agotamientos': pool.agotamientos,
+        })
+    return datos
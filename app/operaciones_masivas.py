@@ -0,0 +1,82 @@
+from sqlalchemy import insert, select, update
+
+from app.models import db, Area, Codigo
+
+# Operaciones sobre muchos códigos a la vez. Trabajan con sentencias por
+# conjuntos (una consulta o un executemany por lote) en lugar de una ida y
+# vuelta al servidor por cada código. No confirman la transacción: eso queda
+# a cargo de quien las llama.
+
+# SQL Server admite como máximo 2100 parámetros por sentencia
+MAX_PARAMETROS = 2000
+
+# Filas por cada executemany
+TAMANO_LOTE = 1000
+
+
+def lotes(elementos, tamano):
+    """Divide una lista en trozos de como máximo `tamano` elementos"""
+    for i in range(0, len(elementos), tamano):
+        yield elementos[i:i + tamano]
+
+
+def crear_rango_codigos(finca_id, inicio, fin, area_id=None, progreso=None):
+    """Crea en la finca los códigos inicio..fin que no existan
+
+    Devuelve (creados, existentes). Los códigos se generan con el mismo
+    formato y datos por defecto que la creación por rango del formulario.
+    `progreso(insertados)` se llama después de cada lote.
+    """
+    codigos = [f"{i:03d}" for i in range(inicio, fin + 1)]
+
+    # Una sola consulta por cada MAX_PARAMETROS códigos del rango
+    existentes = set()
+    for lote in lotes(codigos, MAX_PARAMETROS):
+        consulta = select(Codigo.codigo).where(Codigo.finca_id == finca_id, Codigo.codigo.in_(lote))
+        existentes.update(db.session.execute(consulta).scalars())
+
+    nuevos = [
+        {
+            'codigo': codigo,
+            'nombre_persona': f"Persona {codigo}",
+            'apellido_persona': "Cosechador",
+            'telefono': "",
+            'area_id': area_id,
+            'finca_id': finca_id,
+        }
+        for codigo in codigos if codigo not in existentes
+    ]
+
+    # executemany por lotes (fast_executemany con pyodbc, ver create_app)
+    insertados = 0
+    for lote in lotes(nuevos, TAMANO_LOTE):
+        db.session.execute(insert(Codigo.__table__), lote)
+        insertados += len(lote)
+        if progreso:
+            progreso(insertados)
+
+    return len(nuevos), len(codigos) - len(nuevos)
+
+
+def reasignar_codigos_area(codigo_ids, area_id, progreso=None):
+    """Asigna los códigos al área con un UPDATE por cada lote de ids
+
+    La misma sentencia exige que cada código sea de la finca del área
+    destino, así que los de otras fincas se omiten. Devuelve el número
+    real de filas actualizadas. `progreso(procesados)` se llama después de
+    cada lote.
+    """
+    tabla = Codigo.__table__
+    finca_del_area = select(Area.finca_id).where(Area.id == area_id).scalar_subquery()
+
+    actualizados = procesados = 0
+    # Se reservan dos parámetros para el área (SET y subconsulta)
+    for lote in lotes(sorted(set(codigo_ids)), MAX_PARAMETROS - 2):
+        sentencia = (update(tabla)
+                     .where(tabla.c.id.in_(lote), tabla.c.finca_id == finca_del_area)
+                     .values(area_id=area_id))
+        actualizados += db.session.execute(sentencia).rowcount
+        procesados += len(lote)
+        if progreso:
+            progreso(procesados)
+    return actualizados
@@ -0,0 +1,111 @@
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+# Paginación por clave (keyset / seek): en lugar de OFFSET se filtra por la
+# clave de la última fila vista, así el costo de cada página no depende de
+# cuántas filas hay antes y los enlaces no se desplazan cuando se insertan filas.
+
+
+class Pagina:
+    def __init__(self, items, cursor_anterior=None, cursor_siguiente=None):
+        self.items = items
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+
+def codificar_cursor(valores):
+    """Convierte la clave de una fila en un token apto para la URL"""
+    datos = json.dumps(list(valores), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token, cantidad):
+    """Devuelve la clave contenida en el token o None si no es válido"""
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno).decode('utf-8'))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        return None
+    return valores
+
+
+def _clave_de_cursor(token, columnas):
+    """Clave del token si cada valor tiene el tipo de su columna; si no, None"""
+    valores = decodificar_cursor(token, len(columnas))
+    if valores is None:
+        return None
+    for columna, valor in zip(columnas, valores):
+        try:
+            tipo = columna.type.python_type
+        except NotImplementedError:
+            tipo = (str, int, float)
+        if tipo is float:
+            tipo = (int, float)
+        # El token viaja en la URL: un valor alterado no debe llegar a la base
+        if isinstance(valor, bool) or not isinstance(valor, tipo):
+            return None
+    return valores
+
+
+def filtro_keyset(columnas, valores, mayor=True):
+    """Equivalente portable de (c1, c2, ...) > (v1, v2, ...)
+
+    SQL Server no soporta comparación de tuplas, así que se expande en
+    c1 > v1 OR (c1 = v1 AND (c2 > v2 OR (...))).
+    """
+    columna, valor = columnas[-1], valores[-1]
+    condicion = columna > valor if mayor else columna < valor
+    for columna, valor in zip(reversed(columnas[:-1]), reversed(valores[:-1])):
+        comparacion = columna > valor if mayor else columna < valor
+        condicion = or_(comparacion, and_(columna == valor, condicion))
+    return condicion
+
+
+def paginar_keyset(consulta, columnas, despues=None, antes=None, por_pagina=50, descendente=False):
+    """Obtiene una página de `consulta` ordenada por `columnas`
+
+    `despues` y `antes` son tokens generados por codificar_cursor; solo se
+    usa uno de los dos. Se lee una fila extra para saber si hay más páginas.
+    Con `descendente` la primera página trae las claves más altas.
+    """
+    clave_despues = _clave_de_cursor(despues, columnas)
+    clave_antes = None if clave_despues else _clave_de_cursor(antes, columnas)
+    orden = [c.desc() if descendente else c.asc() for c in columnas]
+    orden_inverso = [c.asc() if descendente else c.desc() for c in columnas]
+
+    if clave_antes:
+        filas = (consulta.filter(filtro_keyset(columnas, clave_antes, mayor=descendente))
+                 .order_by(*orden_inverso)
+                 .limit(por_pagina + 1)
+                 .all())
+        hay_anterior = len(filas) > por_pagina
+        filas = list(reversed(filas[:por_pagina]))
+        hay_siguiente = True
+    else:
+        if clave_despues:
+            consulta = consulta.filter(filtro_keyset(columnas, clave_despues, mayor=not descendente))
+        filas = consulta.order_by(*orden).limit(por_pagina + 1).all()
+        hay_siguiente = len(filas) > por_pagina
+        filas = filas[:por_pagina]
+        hay_anterior = clave_despues is not None
+
+    def clave(fila):
+        return [getattr(fila, c.key) for c in columnas]
+
+    cursor_anterior = codificar_cursor(clave(filas[0])) if filas and hay_anterior else None
+    cursor_siguiente = codificar_cursor(clave(filas[-1])) if filas and hay_siguiente else None
+    return Pagina(filas, cursor_anterior, cursor_siguiente)
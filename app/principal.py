@@ -0,0 +1,44 @@
+from collections import namedtuple
+
+from flask import current_app, g, session
+
+from app.cache import CacheTTL
+from app.models import db, Usuario
+
+# Datos del usuario que inició sesión, cargados a lo sumo una vez por petición
+# y compartidos entre peticiones por una caché corta indexada por id. Evita
+# consultar app_usuario en cada vista solo para leer rol y finca_id.
+
+Principal = namedtuple('Principal', ['id', 'username', 'rol', 'finca_id'])
+
+_cache = CacheTTL()
+
+
+def obtener_principal():
+    """Usuario de la sesión actual, o None si no hay sesión o ya no existe"""
+    if 'principal' not in g:
+        g.principal = _cargar(session.get('user_id'))
+    return g.principal
+
+
+def invalidar_principal(usuario_id):
+    """Descarta los datos en caché de un usuario tras modificarlo"""
+    _cache.invalidar(usuario_id)
+    if g.get('principal') is not None and g.principal.id == usuario_id:
+        g.pop('principal')
+
+
+def _cargar(usuario_id):
+    if usuario_id is None:
+        return None
+
+    principal = _cache.obtener(usuario_id)
+    if principal is None:
+        fila = (db.session.query(Usuario.id, Usuario.username, Usuario.rol, Usuario.finca_id)
+                .filter(Usuario.id == usuario_id)
+                .first())
+        if fila is None:
+            return None
+        principal = Principal(*fila)
+        _cache.guardar(usuario_id, principal, current_app.config['PRINCIPAL_CACHE_TTL'])
+    return principal
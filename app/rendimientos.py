@@ -0,0 +1,166 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import insert, select
+
+from app.models import db, Area, Codigo, Rendimiento
+from app.operaciones_masivas import MAX_PARAMETROS, TAMANO_LOTE, lotes
+
+# Registro de rendimientos por lotes. Cada petición trae miles de registros:
+# los códigos y áreas se cargan con pocas consultas, cada registro se valida
+# en memoria y los válidos se insertan con executemany por lotes. Los
+# registros con errores se informan sin detener al resto. No confirma la
+# transacción: eso queda a cargo de quien llama.
+
+# Registros aceptados por petición
+MAX_REGISTROS = 10000
+
+# Errores que se conservan para la respuesta
+MAX_ERRORES = 500
+
+UNIDADES = ('tallos', 'mallas', 'cajas', 'kg')
+MAX_CANTIDAD = Decimal('1000000')
+
+
+class ErrorRendimientos(Exception):
+    pass
+
+
+class ResultadoRendimientos:
+    def __init__(self):
+        self.registros = 0
+        self.insertados = 0
+        self.errores = []
+        self.errores_omitidos = 0
+
+    def error(self, indice, mensaje):
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'indice': indice, 'error': mensaje})
+        else:
+            self.errores_omitidos += 1
+
+    @property
+    def total_errores(self):
+        return len(self.errores) + self.errores_omitidos
+
+    def como_dict(self):
+        return {'registros': self.registros, 'insertados': self.insertados,
+                'errores': self.errores, 'total_errores': self.total_errores}
+
+
+class _Validador:
+    """Valida registros contra áreas y códigos precargados"""
+
+    def __init__(self, registros, finca_id=None, supervisor_id=None):
+        self.supervisor_id = supervisor_id
+        consulta = select(Area.id, Area.finca_id).where(Area.activa == True)
+        if supervisor_id is not None:
+            consulta = consulta.where(Area.supervisor_id == supervisor_id)
+        else:
+            consulta = consulta.where(Area.finca_id == finca_id)
+        self.areas = dict(db.session.execute(consulta).all())
+
+        self.fincas = set(self.areas.values())
+        if finca_id is not None:
+            self.fincas.add(finca_id)
+
+        # {(finca_id, codigo): (codigo_id, area_id)} solo de los códigos pedidos
+        pedidos = sorted({str(r.get('codigo')).strip() for r in registros
+                          if isinstance(r, dict) and r.get('codigo') is not None})
+        self.codigos = {}
+        for lote in lotes(pedidos, MAX_PARAMETROS - len(self.fincas)):
+            consulta = (select(Codigo.finca_id, Codigo.codigo, Codigo.id, Codigo.area_id)
+                        .where(Codigo.activo == True, Codigo.finca_id.in_(self.fincas), Codigo.codigo.in_(lote)))
+            for finca, codigo, codigo_id, area_id in db.session.execute(consulta):
+                self.codigos[(finca, codigo)] = (codigo_id, area_id)
+
+    def validar(self, registro, hoy):
+        """Devuelve (fila, None) o (None, mensaje de error)"""
+        if not isinstance(registro, dict):
+            return None, 'El registro debe ser un objeto'
+        for campo in ('codigo', 'fecha', 'cantidad'):
+            if registro.get(campo) in (None, ''):
+                return None, f'Falta el campo {campo}'
+
+        try:
+            fecha = date.fromisoformat(str(registro['fecha']))
+        except ValueError:
+            return None, 'fecha debe tener el formato AAAA-MM-DD'
+        if fecha > hoy:
+            return None, 'La fecha no puede ser futura'
+
+        try:
+            cantidad = Decimal(str(registro['cantidad']))
+        except InvalidOperation:
+            return None, 'cantidad no es un número'
+        if not cantidad.is_finite() or cantidad <= 0 or cantidad >= MAX_CANTIDAD:
+            return None, 'cantidad fuera de rango'
+
+        unidad = registro.get('unidad') or UNIDADES[0]
+        if unidad not in UNIDADES:
+            return None, f'unidad debe ser una de: {", ".join(UNIDADES)}'
+
+        area_id = registro.get('area_id')
+        if area_id not in (None, ''):
+            if not str(area_id).isdigit() or int(area_id) not in self.areas:
+                return None, f'El área {area_id} no existe, no está activa o no te corresponde'
+            area_id = int(area_id)
+            finca_id = self.areas[area_id]
+        elif len(self.fincas) == 1:
+            finca_id = next(iter(self.fincas))
+        else:
+            return None, 'Falta area_id'
+
+        codigo = str(registro['codigo']).strip()
+        encontrado = self.codigos.get((finca_id, codigo))
+        if encontrado is None:
+            return None, f'El código {codigo} no existe o no está activo'
+        codigo_id, area_codigo = encontrado
+
+        # Sin área explícita se usa la asignada al código
+        if area_id in (None, ''):
+            if area_codigo is None or area_codigo not in self.areas:
+                return None, f'El código {codigo} no tiene un área asignada que te corresponda'
+            area_id = area_codigo
+
+        return {
+            'codigo_id': codigo_id,
+            'area_id': area_id,
+            'finca_id': finca_id,
+            'supervisor_id': self.supervisor_id,
+            'fecha': fecha,
+            'cantidad': cantidad,
+            'unidad': unidad,
+        }, None
+
+
+def registrar_rendimientos(registros, finca_id=None, supervisor_id=None):
+    """Valida e inserta un lote de registros de rendimiento
+
+    Con `supervisor_id` solo se aceptan las áreas de ese supervisor; si no,
+    las áreas activas de `finca_id`. Devuelve un ResultadoRendimientos.
+    """
+    if not isinstance(registros, list):
+        raise ErrorRendimientos('Se esperaba una lista de registros')
+    if len(registros) > MAX_REGISTROS:
+        raise ErrorRendimientos(f'Se aceptan como máximo {MAX_REGISTROS} registros por petición')
+    if finca_id is None and supervisor_id is None:
+        raise ErrorRendimientos('Falta la finca de los registros')
+
+    resultado = ResultadoRendimientos()
+    resultado.registros = len(registros)
+    validador = _Validador(registros, finca_id, supervisor_id)
+    hoy = date.today()
+
+    filas = []
+    for indice, registro in enumerate(registros):
+        fila, error = validador.validar(registro, hoy)
+        if error:
+            resultado.error(indice, error)
+        else:
+            filas.append(fila)
+
+    for lote in lotes(filas, TAMANO_LOTE):
+        db.session.execute(insert(Rendimiento.__table__), lote)
+    resultado.insertados = len(filas)
+    return resultado
@@ -0,0 +1,56 @@
+from flask import current_app
+from sqlalchemy import distinct, func, select
+
+from app.cache import CacheTTL
+from app.eventos import al_confirmar
+from app.models import db, Area, Codigo, Finca, Supervisor
+
+# Contadores del dashboard. Se calculan con una sola consulta (una
+# subconsulta escalar por contador) y se guardan por finca durante
+# RESUMEN_CACHE_TTL segundos; cualquier commit que toque estas tablas
+# vacía la caché.
+
+TABLAS_RESUMEN = {'app_finca', 'app_area', 'app_supervisor', 'app_codigo'}
+
+_cache = CacheTTL()
+
+
+def resumen_dashboard(finca_id=None):
+    """Contadores para toda la base (admin) o para una finca"""
+    return _cache.obtener_o_calcular(finca_id, lambda: _calcular(finca_id),
+                                     current_app.config['RESUMEN_CACHE_TTL'])
+
+
+def _contar(modelo, *condiciones, columna=None):
+    conteo = func.count(columna) if columna is not None else func.count()
+    return select(conteo).select_from(modelo).where(*condiciones).scalar_subquery()
+
+
+def _calcular(finca_id):
+    if finca_id is None:
+        por_finca = []
+        fincas = _contar(Finca, Finca.activa == True)
+        supervisores = _contar(Supervisor, Supervisor.activo == True)
+    else:
+        por_finca = [Codigo.finca_id == finca_id]
+        fincas = _contar(Finca, Finca.id == finca_id, Finca.activa == True)
+        # Supervisores asignados a áreas activas de la finca
+        supervisores = _contar(Area, Area.finca_id == finca_id, Area.activa == True,
+                               columna=distinct(Area.supervisor_id))
+
+    areas_finca = [Area.finca_id == finca_id] if finca_id is not None else []
+    consulta = select(
+        fincas.label('fincas'),
+        _contar(Area, Area.activa == True, *areas_finca).label('areas'),
+        _contar(Area, Area.activa == True, Area.supervisor_id.isnot(None), *areas_finca).label('areas_con_supervisor'),
+        supervisores.label('supervisores'),
+        _contar(Codigo, Codigo.activo == True, *por_finca).label('codigos'),
+        _contar(Codigo, Codigo.activo == True, Codigo.area_id.is_(None), *por_finca).label('codigos_sin_area'),
+    )
+    return dict(db.session.execute(consulta).one()._mapping)
+
+
+@al_confirmar
+def _invalidar(cambios):
+    if TABLAS_RESUMEN.intersection(cambios):
+        _cache.invalidar()
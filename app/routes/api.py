@@ -0,0 +1,91 @@
+import gzip
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request, session
+from sqlalchemy import update
+from app.models import db, Supervisor
+from app.principal import obtener_principal
+from app.rendimientos import registrar_rendimientos, ErrorRendimientos
+from app.sincronizacion import LIMITE, cambios_desde, fincas_de_supervisor, ErrorSincronizacion
+
+api_bp = Blueprint('api', __name__)
+
+def _supervisor_por_clave(clave):
+    return Supervisor.query.filter_by(clave_acceso=clave, activo=True).first()
+
+def _registrar_acceso(supervisor):
+    # Sin tocar fecha_modificacion: un acceso no es un cambio para la sincronización
+    db.session.execute(update(Supervisor.__table__)
+                       .where(Supervisor.id == supervisor.id)
+                       .values(fecha_ultimo_acceso=datetime.utcnow(),
+                               fecha_modificacion=Supervisor.fecha_modificacion))
+
+@api_bp.route('/api/rendimientos', methods=['POST'])
+def registrar_rendimientos_api():
+    # Los supervisores se identifican con su clave de acceso; los usuarios con la sesión
+    clave = request.headers.get('X-Clave-Acceso')
+    supervisor = None
+    finca_id = None
+    if clave:
+        supervisor = _supervisor_por_clave(clave)
+        if not supervisor:
+            return jsonify(error='Clave de acceso inválida'), 401
+    elif 'user_id' not in session:
+        return jsonify(error='No autenticado'), 401
+    elif session['rol'] not in ['admin', 'rrhh', 'jefe_cultivo']:
+        return jsonify(error='No tienes permisos para registrar rendimientos'), 403
+
+    datos = request.get_json(silent=True)
+    if isinstance(datos, dict):
+        registros = datos.get('registros')
+    else:
+        registros, datos = datos, {}
+
+    if supervisor is None:
+        if session['rol'] == 'admin':
+            finca_id = datos.get('finca_id')
+            if not isinstance(finca_id, int):
+                return jsonify(error='Falta finca_id'), 400
+        else:
+            usuario = obtener_principal()
+            finca_id = usuario.finca_id if usuario else None
+            if not finca_id:
+                return jsonify(error='No tienes una finca asignada'), 403
+
+    try:
+        resultado = registrar_rendimientos(registros, finca_id=finca_id,
+                                           supervisor_id=supervisor.id if supervisor else None)
+    except ErrorRendimientos as e:
+        return jsonify(error=str(e)), 400
+
+    if supervisor:
+        _registrar_acceso(supervisor)
+    db.session.commit()
+
+    codigo_estado = 201 if resultado.insertados else 400
+    return jsonify(resultado.como_dict()), codigo_estado
+
+@api_bp.route('/api/sincronizacion')
+def sincronizar_api():
+    # Solo para la aplicación móvil: los supervisores se identifican con su clave
+    clave = request.headers.get('X-Clave-Acceso')
+    supervisor = _supervisor_por_clave(clave) if clave else None
+    if not supervisor:
+        return jsonify(error='Clave de acceso inválida'), 401
+
+    limite = max(1, min(request.args.get('limite', LIMITE, type=int), LIMITE))
+    try:
+        datos = cambios_desde(request.args.get('version'), fincas_de_supervisor(supervisor.id), limite)
+    except ErrorSincronizacion as e:
+        return jsonify(error=str(e)), 400
+
+    _registrar_acceso(supervisor)
+    db.session.commit()
+
+    # Las redes móviles son lentas: se comprime si el cliente lo acepta
+    respuesta = jsonify(datos)
+    if request.accept_encodings['gzip']:
+        respuesta.set_data(gzip.compress(respuesta.get_data()))
+        respuesta.headers['Content-Encoding'] = 'gzip'
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
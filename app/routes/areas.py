@@ -1,5 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from app.models import db, Area, Finca, Usuario
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app.models import db, Area, Finca, Supervisor
+from app.exportacion import respuesta_exportacion
+from app.principal import obtener_principal
+from app.consultas import areas_activas, codigos_activos_por_area
+from app.versiones import etag_listado, respuesta_no_modificada, con_etag
 
 areas_bp = Blueprint('areas', __name__)
 
@@ -8,17 +14,50 @@ def listar_areas():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
     
-    # Filtrar áreas según el rol
-    if session['rol'] == 'admin':
-        areas = Area.query.filter_by(activa=True).all()
-    else:
-        usuario = Usuario.query.get(session['user_id'])
-        if usuario and usuario.finca_id:
-            areas = Area.query.filter_by(finca_id=usuario.finca_id, activa=True).all()
-        else:
-            areas = []
+    finca_id = None
+    if session['rol'] != 'admin':
+        usuario = obtener_principal()
+        finca_id = usuario.finca_id if usuario else None
+        if not finca_id:
+            return render_template('areas/listar.html', areas=[])
     
-    return render_template('areas/listar.html', areas=areas)
+    # Sin cambios desde la última visita: 304 sin consultar ni renderizar
+    etag = etag_listado(('app_area', 'app_finca', 'app_supervisor'), finca_id)
+    no_modificada = respuesta_no_modificada(etag)
+    if no_modificada:
+        return no_modificada
+    
+    # Finca y supervisor en la misma consulta (la plantilla muestra ambos)
+    consulta = Area.query.options(joinedload(Area.finca), joinedload(Area.supervisor)).filter_by(activa=True)
+    if finca_id is not None:
+        consulta = consulta.filter_by(finca_id=finca_id)
+    areas = consulta.all()
+    
+    return con_etag(render_template('areas/listar.html', areas=areas), etag)
+
+@areas_bp.route('/areas/exportar')
+def exportar_areas():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    consulta = (select(Area.nombre, Area.descripcion, Finca.nombre, Supervisor.nombre, Supervisor.apellido,
+                       Area.activa, Area.fecha_creacion)
+                .join(Finca, Area.finca_id == Finca.id)
+                .outerjoin(Supervisor, Area.supervisor_id == Supervisor.id)
+                .where(Area.activa == True))
+    
+    # Filtrar áreas según el rol (igual que el listado)
+    if session['rol'] != 'admin':
+        usuario = obtener_principal()
+        if not usuario or not usuario.finca_id:
+            flash('No tienes una finca asignada', 'error')
+            return redirect(url_for('areas.listar_areas'))
+        consulta = consulta.where(Area.finca_id == usuario.finca_id)
+    
+    return respuesta_exportacion('areas',
+                                 ['Área', 'Descripción', 'Finca', 'Supervisor', 'Apellido Supervisor',
+                                  'Activa', 'Fecha Creación'],
+                                 consulta.order_by(Area.finca_id, Area.id), request.args.get('formato', 'csv'))
 
 @areas_bp.route('/areas/crear', methods=['GET', 'POST'])
 def crear_area():
@@ -34,7 +73,7 @@ def crear_area():
         if session['rol'] == 'admin':
             finca_id = request.form['finca_id']
         else:
-            usuario = Usuario.query.get(session['user_id'])
+            usuario = obtener_principal()
             finca_id = usuario.finca_id
         
         if 'areas_multiples' in request.form and request.form['areas_multiples']:
@@ -86,27 +125,23 @@ def gestionar_asignaciones_areas():
     
     # Filtrar áreas según el rol
     if session['rol'] == 'admin':
-        areas = Area.query.filter_by(activa=True).all()
+        finca_id = None
     else:
-        usuario = Usuario.query.get(session['user_id'])
-        areas = Area.query.filter_by(finca_id=usuario.finca_id, activa=True).all()
+        usuario = obtener_principal()
+        finca_id = usuario.finca_id if usuario else None
+        if not finca_id:
+            return render_template('areas/gestionar_asignaciones.html', areas_info=[])
+    
+    # Áreas (con finca y supervisor) y sus códigos en dos consultas fijas
+    areas = areas_activas(finca_id)
+    codigos_por_area = codigos_activos_por_area(finca_id)
     
-    # Obtener información completa de cada área
     areas_info = []
     for area in areas:
-        # Supervisor asignado
-        supervisor = None
-        if area.supervisor_id:
-            from app.models import Supervisor
-            supervisor = Supervisor.query.get(area.supervisor_id)
-        
-        # Códigos asignados
-        from app.models import Codigo
-        codigos = Codigo.query.filter_by(area_id=area.id, activo=True).all()
-        
+        codigos = codigos_por_area.get(area.id, [])
         areas_info.append({
             'area': area,
-            'supervisor': supervisor,
+            'supervisor': area.supervisor,
             'codigos': codigos,
             'total_codigos': len(codigos)
         })
@@ -1,24 +1,143 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from app.models import db, Codigo, Area, Usuario
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app.models import db, Codigo, Area, Finca
+from app.principal import obtener_principal
+from app.paginacion import paginar_keyset
+from app.consultas import areas_activas, codigos_activos_por_area
+from app.exportacion import respuesta_exportacion
+from app.importacion import importar_codigos, ErrorImportacion
+from app.operaciones_masivas import crear_rango_codigos, reasignar_codigos_area
+from app.busqueda import buscar_codigos, filtro_busqueda
+from app.versiones import etag_listado, respuesta_no_modificada, con_etag
+from app.trabajos import encolar, guardar_archivo
 
 codigos_bp = Blueprint('codigos', __name__)
 
+# Tamaño de página del listado de códigos
+POR_PAGINA = 50
+MAX_POR_PAGINA = 200
+
+def _filtros_codigos():
+    """Filtros de la URL y finca a la que se limita el usuario
+
+    Para quien no es admin la finca es siempre la asignada (None si no
+    tiene ninguna, en cuyo caso no debe ver códigos).
+    """
+    filtros = {clave: request.args.get(clave, '').strip()
+               for clave in ('finca_id', 'area_id', 'activo', 'sin_area', 'q')}
+    filtros = {clave: valor for clave, valor in filtros.items() if valor}
+    for clave in ('finca_id', 'area_id'):
+        if clave in filtros and not filtros[clave].isdigit():
+            del filtros[clave]
+    
+    if session['rol'] == 'admin':
+        finca_id = int(filtros['finca_id']) if 'finca_id' in filtros else None
+    else:
+        usuario = obtener_principal()
+        finca_id = usuario.finca_id if usuario else None
+        filtros.pop('finca_id', None)
+    return filtros, finca_id
+
+def _filtrar_codigos(consulta, finca_id, filtros):
+    if finca_id:
+        consulta = consulta.filter(Codigo.finca_id == finca_id)
+    if filtros.get('sin_area'):
+        consulta = consulta.filter(Codigo.area_id.is_(None))
+    elif filtros.get('area_id'):
+        consulta = consulta.filter(Codigo.area_id == int(filtros['area_id']))
+    if filtros.get('activo') in ('1', '0'):
+        consulta = consulta.filter(Codigo.activo == (filtros['activo'] == '1'))
+    if filtros.get('q'):
+        condicion = filtro_busqueda(filtros['q'], finca_id)
+        if condicion is not None:
+            consulta = consulta.filter(condicion)
+    return consulta
+
 @codigos_bp.route('/codigos')
 def listar_codigos():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
     
+    # Filtros de la URL (se conservan en los enlaces de paginación)
+    filtros, finca_id = _filtros_codigos()
+    
+    if session['rol'] != 'admin' and not finca_id:
+        return render_template('codigos/listar.html', codigos=[], pagina=None,
+                               filtros=filtros, fincas=[], areas=[])
+    
+    # Sin cambios desde la última visita: 304 sin consultar ni renderizar. El
+    # admin ve el selector con todas las fincas aunque filtre por una
+    etag = etag_listado(('app_codigo', 'app_area', 'app_finca'), finca_id,
+                        globales=('app_finca',) if session['rol'] == 'admin' else ())
+    no_modificada = respuesta_no_modificada(etag)
+    if no_modificada:
+        return no_modificada
+    
     # Filtrar códigos según el rol
+    fincas = []
     if session['rol'] == 'admin':
-        codigos = Codigo.query.all()
-    else:
-        usuario = Usuario.query.get(session['user_id'])
-        if usuario and usuario.finca_id:
-            codigos = Codigo.query.filter_by(finca_id=usuario.finca_id).all()
-        else:
-            codigos = []
+        fincas = Finca.query.filter_by(activa=True).order_by(Finca.nombre).all()
+    
+    consulta = Codigo.query.options(joinedload(Codigo.area), joinedload(Codigo.finca))
+    consulta = _filtrar_codigos(consulta, finca_id, filtros)
+    areas = Area.query.filter_by(activa=True)
+    if finca_id:
+        areas = areas.filter_by(finca_id=finca_id)
+    
+    por_pagina = request.args.get('por_pagina', POR_PAGINA, type=int)
+    por_pagina = max(1, min(por_pagina, MAX_POR_PAGINA))
+    
+    # Paginación por clave sobre (finca_id, codigo, id)
+    pagina = paginar_keyset(consulta,
+                            [Codigo.finca_id, Codigo.codigo, Codigo.id],
+                            despues=request.args.get('despues'),
+                            antes=request.args.get('antes'),
+                            por_pagina=por_pagina)
+    if por_pagina != POR_PAGINA:
+        filtros['por_pagina'] = por_pagina
+    
+    return con_etag(render_template('codigos/listar.html', codigos=pagina.items, pagina=pagina,
+                                    filtros=filtros, fincas=fincas,
+                                    areas=areas.order_by(Area.nombre).all()), etag)
+
+@codigos_bp.route('/codigos/buscar')
+def buscar_codigos_json():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    # Autocompletado de la barra de navegación, limitado a la finca del usuario
+    filtros, finca_id = _filtros_codigos()
+    if session['rol'] != 'admin' and not finca_id:
+        return jsonify(resultados=[])
+    
+    resultados = buscar_codigos(filtros.get('q', ''), finca_id)
+    for resultado in resultados:
+        resultado['url'] = url_for('codigos.listar_codigos', q=resultado['codigo'],
+                                   finca_id=resultado['finca_id'] if session['rol'] == 'admin' else None)
+    return jsonify(resultados=resultados)
+
+@codigos_bp.route('/codigos/exportar')
+def exportar_codigos():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    # Mismos filtros y misma finca que el listado
+    filtros, finca_id = _filtros_codigos()
+    if session['rol'] != 'admin' and not finca_id:
+        flash('No tienes una finca asignada', 'error')
+        return redirect(url_for('codigos.listar_codigos'))
+    
+    consulta = (select(Codigo.codigo, Codigo.nombre_persona, Codigo.apellido_persona, Codigo.telefono,
+                       Area.nombre, Finca.nombre, Codigo.activo, Codigo.fecha_creacion)
+                .join(Finca, Codigo.finca_id == Finca.id)
+                .outerjoin(Area, Codigo.area_id == Area.id))
+    consulta = _filtrar_codigos(consulta, finca_id, filtros)
+    consulta = consulta.order_by(Codigo.finca_id, Codigo.codigo, Codigo.id)
     
-    return render_template('codigos/listar.html', codigos=codigos)
+    return respuesta_exportacion('codigos',
+                                 ['Código', 'Nombre', 'Apellido', 'Teléfono', 'Área', 'Finca', 'Activo', 'Fecha Creación'],
+                                 consulta, request.args.get('formato', 'csv'))
 
 @codigos_bp.route('/codigos/crear', methods=['GET', 'POST'])
 def crear_codigo():
@@ -48,7 +167,7 @@ def crear_codigo():
                     flash('Debe seleccionar una finca para crear los códigos', 'error')
                     return redirect(url_for('codigos.listar_codigos'))
             else:
-                usuario = Usuario.query.get(session['user_id'])
+                usuario = obtener_principal()
                 finca_id = usuario.finca_id
                 if not finca_id:
                     flash('No tienes una finca asignada', 'error')
@@ -58,34 +177,24 @@ def crear_codigo():
             if area_id == '':
                 area_id = None
             
-            codigos_creados = 0
-            codigos_existentes = 0
-            
             try:
                 if '-' in rango:
                     inicio, fin = rango.split('-')
                     inicio = int(inicio.strip())
                     fin = int(fin.strip())
                     
-                    for i in range(inicio, fin + 1):
-                        codigo_str = f"{i:03d}"
-                        
-                        # Verificar si el código ya existe en esta finca
-                        existe = Codigo.query.filter_by(codigo=codigo_str, finca_id=finca_id).first()
-                        
-                        if not existe:
-                            codigo = Codigo(
-                                codigo=codigo_str,
-                                nombre_persona=f"Persona {codigo_str}",
-                                apellido_persona="Cosechador",
-                                telefono="",
-                                area_id=area_id,
-                                finca_id=finca_id
-                            )
-                            db.session.add(codigo)
-                            codigos_creados += 1
-                        else:
-                            codigos_existentes += 1
+                    # Los rangos grandes se crean en segundo plano (ver app/trabajos.py)
+                    if fin - inicio + 1 > current_app.config['TRABAJOS_UMBRAL_CODIGOS']:
+                        trabajo = encolar('crear_rango',
+                                          {'finca_id': int(finca_id), 'inicio': inicio, 'fin': fin,
+                                           'area_id': int(area_id) if area_id else None},
+                                          usuario_id=session['user_id'], total=fin - inicio + 1)
+                        flash(f'Creando {fin - inicio + 1} códigos en segundo plano', 'info')
+                        return redirect(url_for('trabajos.ver_trabajo', trabajo_id=trabajo.id))
+                    
+                    # Consulta de existentes e inserción por lotes (no un viaje por código)
+                    codigos_creados, codigos_existentes = crear_rango_codigos(
+                        int(finca_id), inicio, fin, int(area_id) if area_id else None)
                     
                     db.session.commit()
                     
@@ -111,7 +220,7 @@ def crear_codigo():
                         flash('Debe seleccionar una finca para crear el código', 'error')
                         return redirect(url_for('codigos.listar_codigos'))
                 else:
-                    usuario = Usuario.query.get(session['user_id'])
+                    usuario = obtener_principal()
                     finca_id = usuario.finca_id
                     if not finca_id:
                         flash('No tienes una finca asignada', 'error')
@@ -154,11 +263,64 @@ def crear_codigo():
     # Obtener fincas para admins
     fincas = []
     if session['rol'] == 'admin':
-        from app.models import Finca
         fincas = Finca.query.filter_by(activa=True).all()
     
     return render_template('codigos/crear.html', areas=areas, fincas=fincas)
 
+@codigos_bp.route('/codigos/importar', methods=['GET', 'POST'])
+def importar_codigos_csv():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    if session['rol'] not in ['admin', 'rrhh', 'jefe_cultivo']:
+        flash('No tienes permisos para realizar esta acción', 'error')
+        return redirect(url_for('codigos.listar_codigos'))
+    
+    # Admin puede fijar la finca o traerla en la columna finca_id; el resto usa la suya
+    if session['rol'] == 'admin':
+        finca_id = request.form.get('finca_id', type=int)
+    else:
+        usuario = obtener_principal()
+        finca_id = usuario.finca_id if usuario else None
+        if not finca_id:
+            flash('No tienes una finca asignada', 'error')
+            return redirect(url_for('codigos.listar_codigos'))
+    
+    resultado = None
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if not archivo or not archivo.filename:
+            flash('Debe seleccionar un archivo CSV', 'error')
+            return redirect(url_for('codigos.importar_codigos_csv'))
+        
+        # Los archivos grandes se importan en segundo plano (ver app/trabajos.py)
+        archivo.stream.seek(0, 2)
+        tamano = archivo.stream.tell()
+        archivo.stream.seek(0)
+        if tamano > current_app.config['TRABAJOS_UMBRAL_BYTES']:
+            trabajo = encolar('importar', {'archivo': guardar_archivo(archivo), 'finca_id': finca_id},
+                              usuario_id=session['user_id'])
+            flash(f'Importando {archivo.filename} en segundo plano', 'info')
+            return redirect(url_for('trabajos.ver_trabajo', trabajo_id=trabajo.id))
+        
+        try:
+            resultado = importar_codigos(archivo.stream, finca_id)
+            db.session.commit()
+            flash(f'{resultado.importados} códigos importados de {resultado.filas} filas',
+                  'success' if resultado.importados else 'warning')
+        except ErrorImportacion as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al importar códigos: {str(e)}', 'error')
+    
+    fincas = []
+    if session['rol'] == 'admin':
+        fincas = Finca.query.filter_by(activa=True).all()
+    
+    return render_template('codigos/importar.html', resultado=resultado, fincas=fincas)
+
 @codigos_bp.route('/codigos/asignar-area', methods=['GET', 'POST'])
 def asignar_area_codigos():
     if 'user_id' not in session:
@@ -180,25 +342,48 @@ def asignar_area_codigos():
             flash('Debe seleccionar al menos un código', 'error')
             return redirect(url_for('codigos.asignar_area_codigos'))
         
-        # Asignar los códigos seleccionados al área
-        for codigo_id in codigos_seleccionados:
-            codigo = Codigo.query.get(codigo_id)
-            if codigo:
-                codigo.area_id = area_id
+        area = Area.query.get(area_id)
+        if not area:
+            flash('El área seleccionada no existe', 'error')
+            return redirect(url_for('codigos.asignar_area_codigos'))
+        
+        # Verificar que el área pertenece a la finca del usuario
+        if session['rol'] != 'admin':
+            usuario = obtener_principal()
+            if not usuario or area.finca_id != usuario.finca_id:
+                flash('No puedes asignar códigos a áreas de otras fincas', 'error')
+                return redirect(url_for('codigos.asignar_area_codigos'))
         
+        codigo_ids = [int(codigo_id) for codigo_id in codigos_seleccionados if codigo_id.isdigit()]
+        
+        if len(codigo_ids) > current_app.config['TRABAJOS_UMBRAL_CODIGOS']:
+            trabajo = encolar('reasignar', {'codigo_ids': codigo_ids, 'area_id': area.id},
+                              usuario_id=session['user_id'], total=len(codigo_ids))
+            flash(f'Asignando {len(codigo_ids)} códigos en segundo plano', 'info')
+            return redirect(url_for('trabajos.ver_trabajo', trabajo_id=trabajo.id))
+        
+        # Un UPDATE por lote en lugar de cargar cada código
+        actualizados = reasignar_codigos_area(codigo_ids, area.id)
         db.session.commit()
-        flash(f'{len(codigos_seleccionados)} códigos asignados al área seleccionada', 'success')
+        
+        mensaje = f'{actualizados} códigos asignados al área seleccionada'
+        omitidos = len(codigos_seleccionados) - actualizados
+        if omitidos > 0:
+            mensaje += f' ({omitidos} códigos omitidos por no existir o ser de otra finca)'
+        flash(mensaje, 'success' if actualizados > 0 else 'warning')
         return redirect(url_for('codigos.listar_codigos'))
     
-    # Filtrar áreas y códigos según el rol
+    # Filtrar áreas y códigos según el rol; la plantilla muestra la finca de
+    # cada área y de cada código, que se cargan en la misma consulta
     if session['rol'] == 'admin':
-        areas = Area.query.filter_by(activa=True).all()
-        codigos_sin_area = Codigo.query.filter_by(area_id=None).all()
+        areas = Area.query.options(joinedload(Area.finca)).filter_by(activa=True).all()
+        codigos_sin_area = Codigo.query.options(joinedload(Codigo.finca)).filter_by(area_id=None).all()
     else:
-        usuario = Usuario.query.get(session['user_id'])
+        usuario = obtener_principal()
         if usuario and usuario.finca_id:
-            areas = Area.query.filter_by(finca_id=usuario.finca_id, activa=True).all()
-            codigos_sin_area = Codigo.query.filter_by(finca_id=usuario.finca_id, area_id=None).all()
+            areas = Area.query.options(joinedload(Area.finca)).filter_by(finca_id=usuario.finca_id, activa=True).all()
+            codigos_sin_area = Codigo.query.options(joinedload(Codigo.finca)).filter_by(
+                finca_id=usuario.finca_id, area_id=None).all()
         else:
             areas = []
             codigos_sin_area = []
@@ -216,20 +401,23 @@ def gestionar_asignaciones_codigos():
     
     # Filtrar áreas según el rol
     if session['rol'] == 'admin':
-        areas = Area.query.filter_by(activa=True).all()
+        finca_id = None
     else:
-        usuario = Usuario.query.get(session['user_id'])
-        areas = Area.query.filter_by(finca_id=usuario.finca_id, activa=True).all()
+        usuario = obtener_principal()
+        finca_id = usuario.finca_id if usuario else None
     
-    # Obtener códigos por área
+    # Áreas y códigos agrupados en consultas fijas (no una por área)
     codigos_por_area = {}
-    for area in areas:
-        codigos = Codigo.query.filter_by(area_id=area.id, activo=True).all()
-        codigos_por_area[area.id] = {
-            'area': area,
-            'codigos': codigos,
-            'total': len(codigos)
-        }
+    if session['rol'] == 'admin' or finca_id:
+        areas = areas_activas(finca_id)
+        codigos_agrupados = codigos_activos_por_area(finca_id)
+        for area in areas:
+            codigos = codigos_agrupados.get(area.id, [])
+            codigos_por_area[area.id] = {
+                'area': area,
+                'codigos': codigos,
+                'total': len(codigos)
+            }
     
     # Códigos sin área
     codigos_sin_area = Codigo.query.filter_by(area_id=None).all()
@@ -257,26 +445,27 @@ def asignar_codigo_area():
         if codigo and area:
             # Verificar que el área pertenece a la finca del usuario
             if session['rol'] != 'admin':
-                usuario = Usuario.query.get(session['user_id'])
+                usuario = obtener_principal()
                 if area.finca_id != usuario.finca_id:
                     flash('No puedes asignar códigos a áreas de otras fincas', 'error')
                     return redirect(url_for('codigos.asignar_codigo_area'))
             
-            codigo.area_id = area_id
+            codigo.area_id = area.id
             db.session.commit()
             flash(f'Código {codigo.codigo} asignado al área {area.nombre}', 'success')
             return redirect(url_for('codigos.listar_codigos'))
         else:
             flash('Error al asignar código', 'error')
     
-    # Filtrar códigos y áreas según el rol
+    # Filtrar códigos y áreas según el rol; la finca de cada área se carga en
+    # la misma consulta (la plantilla muestra su nombre)
     if session['rol'] == 'admin':
         codigos_sin_area = Codigo.query.filter_by(area_id=None, activo=True).all()
-        areas = Area.query.filter_by(activa=True).all()
+        areas = Area.query.options(joinedload(Area.finca)).filter_by(activa=True).all()
     else:
-        usuario = Usuario.query.get(session['user_id'])
+        usuario = obtener_principal()
         codigos_sin_area = Codigo.query.filter_by(area_id=None, activo=True).all()
-        areas = Area.query.filter_by(finca_id=usuario.finca_id, activa=True).all()
+        areas = Area.query.options(joinedload(Area.finca)).filter_by(finca_id=usuario.finca_id, activa=True).all()
     
     return render_template('codigos/asignar_codigo_area.html', 
                          codigos_sin_area=codigos_sin_area, 
@@ -1,4 +1,6 @@
 from flask import Blueprint, render_template, session, redirect, url_for
+from app.principal import obtener_principal
+from app.resumen import resumen_dashboard
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -7,4 +9,13 @@ def index():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
     
-    return render_template('dashboard.html')
+    # Contadores de toda la base para admin, de su finca para el resto
+    resumen = None
+    if session['rol'] == 'admin':
+        resumen = resumen_dashboard()
+    else:
+        usuario = obtener_principal()
+        if usuario and usuario.finca_id:
+            resumen = resumen_dashboard(usuario.finca_id)
+    
+    return render_template('dashboard.html', resumen=resumen)
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from app.models import db, Finca
+from app.versiones import etag_listado, respuesta_no_modificada, con_etag
 
 fincas_bp = Blueprint('fincas', __name__)
 
@@ -12,8 +13,14 @@ def listar_fincas():
         flash('No tienes permisos para ver fincas', 'error')
         return redirect(url_for('dashboard.index'))
     
+    # Sin cambios desde la última visita: 304 sin consultar ni renderizar
+    etag = etag_listado(('app_finca',))
+    no_modificada = respuesta_no_modificada(etag)
+    if no_modificada:
+        return no_modificada
+    
     fincas = Finca.query.filter_by(activa=True).all()
-    return render_template('fincas/listar.html', fincas=fincas)
+    return con_etag(render_template('fincas/listar.html', fincas=fincas), etag)
 
 @fincas_bp.route('/fincas/crear', methods=['GET', 'POST'])
 def crear_finca():
@@ -0,0 +1,137 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from app.models import Area, Codigo, Finca, Supervisor, Usuario
+from app.principal import obtener_principal
+from app.busqueda import filtro_busqueda
+from app.grid import Grid, Columna, ErrorGrid, buscar_en, leer_parametros, responder
+
+grid_bp = Blueprint('grid', __name__)
+
+# Solo se ordena por columnas con índice: código (finca_id, codigo y la
+# restricción única), clave de acceso, usuario y email (únicos) e id
+GRIDS = {
+    'codigos': Grid(
+        Codigo,
+        [Columna('id', Codigo.id, ordenable=True),
+         Columna('codigo', Codigo.codigo, ordenable=True, filtro='prefijo'),
+         Columna('nombre_persona', Codigo.nombre_persona),
+         Columna('apellido_persona', Codigo.apellido_persona),
+         Columna('telefono', Codigo.telefono),
+         Columna('area_id', Codigo.area_id, filtro='exacto'),
+         Columna('area', Area.nombre),
+         Columna('finca_id', Codigo.finca_id, filtro='exacto'),
+         Columna('finca', Finca.nombre),
+         Columna('activo', Codigo.activo, filtro='booleano'),
+         Columna('fecha_creacion', Codigo.fecha_creacion)],
+        uniones=[(Area, Codigo.area_id == Area.id), (Finca, Codigo.finca_id == Finca.id)],
+        busqueda=filtro_busqueda),
+    'areas': Grid(
+        Area,
+        [Columna('id', Area.id, ordenable=True),
+         Columna('nombre', Area.nombre, filtro='contiene'),
+         Columna('descripcion', Area.descripcion),
+         Columna('finca_id', Area.finca_id, filtro='exacto'),
+         Columna('finca', Finca.nombre),
+         Columna('supervisor_id', Area.supervisor_id, filtro='exacto'),
+         Columna('supervisor', Supervisor.nombre),
+         Columna('supervisor_apellido', Supervisor.apellido),
+         Columna('activa', Area.activa, filtro='booleano'),
+         Columna('fecha_creacion', Area.fecha_creacion)],
+        uniones=[(Finca, Area.finca_id == Finca.id), (Supervisor, Area.supervisor_id == Supervisor.id)],
+        busqueda=buscar_en(Area.nombre, Area.descripcion)),
+    # Sin la clave de acceso: la tabla es de consulta
+    'supervisores': Grid(
+        Supervisor,
+        [Columna('id', Supervisor.id, ordenable=True),
+         Columna('nombre', Supervisor.nombre, filtro='contiene'),
+         Columna('apellido', Supervisor.apellido, filtro='contiene'),
+         Columna('telefono', Supervisor.telefono),
+         Columna('email', Supervisor.email),
+         Columna('activo', Supervisor.activo, filtro='booleano'),
+         Columna('fecha_ultimo_acceso', Supervisor.fecha_ultimo_acceso)],
+        busqueda=buscar_en(Supervisor.nombre, Supervisor.apellido, Supervisor.email)),
+    'usuarios': Grid(
+        Usuario,
+        [Columna('id', Usuario.id, ordenable=True),
+         Columna('username', Usuario.username, ordenable=True, filtro='prefijo'),
+         Columna('email', Usuario.email, ordenable=True, filtro='prefijo'),
+         Columna('rol', Usuario.rol, filtro='contiene'),
+         Columna('finca_id', Usuario.finca_id, filtro='exacto'),
+         Columna('finca', Finca.nombre),
+         Columna('activo', Usuario.activo, filtro='booleano'),
+         Columna('fecha_creacion', Usuario.fecha_creacion)],
+        uniones=[(Finca, Usuario.finca_id == Finca.id)],
+        busqueda=buscar_en(Usuario.username, Usuario.email)),
+}
+
+# Roles que pueden consultar cada tabla (None: cualquier usuario)
+ROLES = {
+    'codigos': None,
+    'areas': None,
+    'supervisores': ['admin', 'rrhh', 'jefe_cultivo'],
+    'usuarios': ['admin'],
+}
+
+# Columnas que se muestran en la página de cada tabla: (data, título)
+TITULOS = {
+    'codigos': [('codigo', 'Código'), ('nombre_persona', 'Nombre'), ('apellido_persona', 'Apellido'),
+                ('telefono', 'Teléfono'), ('area', 'Área'), ('finca', 'Finca'), ('activo', 'Activo')],
+    'areas': [('nombre', 'Área'), ('descripcion', 'Descripción'), ('finca', 'Finca'),
+              ('supervisor', 'Supervisor'), ('activa', 'Activa')],
+    'supervisores': [('nombre', 'Nombre'), ('apellido', 'Apellido'), ('telefono', 'Teléfono'),
+                     ('email', 'Email'), ('activo', 'Activo')],
+    'usuarios': [('username', 'Usuario'), ('email', 'Email'), ('rol', 'Rol'), ('finca', 'Finca'),
+                 ('activo', 'Activo')],
+}
+
+def _alcance(entidad):
+    """(condiciones, finca_id) que limitan la tabla a lo que el usuario puede ver
+
+    Devuelve None si el usuario no tiene acceso a ninguna fila.
+    """
+    if session['rol'] == 'admin':
+        return [], None
+    usuario = obtener_principal()
+    finca_id = usuario.finca_id if usuario else None
+    if entidad == 'codigos':
+        return ([Codigo.finca_id == finca_id], finca_id) if finca_id else None
+    if entidad == 'areas':
+        return ([Area.finca_id == finca_id], finca_id) if finca_id else None
+    return [], None
+
+def _permitido(entidad):
+    roles = ROLES[entidad]
+    return roles is None or session['rol'] in roles
+
+@grid_bp.route('/grid/<entidad>')
+def ver_grid(entidad):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    if entidad not in GRIDS or not _permitido(entidad):
+        flash('No tienes permisos para ver esta tabla', 'error')
+        return redirect(url_for('dashboard.index'))
+
+    return render_template('grid/tabla.html', entidad=entidad, columnas=TITULOS[entidad])
+
+@grid_bp.route('/grid/<entidad>/datos', methods=['GET', 'POST'])
+def datos_grid(entidad):
+    if 'user_id' not in session:
+        return jsonify(error='No autenticado'), 401
+
+    if entidad not in GRIDS:
+        return jsonify(error='Tabla desconocida'), 404
+    if not _permitido(entidad):
+        return jsonify(error='No tienes permisos para ver esta tabla'), 403
+
+    # DataTables envía los parámetros por query string (GET) o formulario (POST)
+    parametros = leer_parametros(request.values)
+    alcance = _alcance(entidad)
+    if alcance is None:
+        return jsonify(draw=parametros['draw'], recordsTotal=0, recordsFiltered=0, data=[])
+
+    condiciones, finca_id = alcance
+    try:
+        return jsonify(responder(GRIDS[entidad], parametros, condiciones, finca_id))
+    except ErrorGrid as e:
+        # El protocolo informa los errores en el campo error con estado 200
+        return jsonify(draw=parametros['draw'], error=str(e))
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from app.models import Finca
+from app.principal import obtener_principal
+from app.consolidacion import marca_actual, totales_por_area, totales_por_dia, totales_por_semana
+
+rendimientos_bp = Blueprint('rendimientos', __name__)
+
+# Días del reporte cuando no se indica un rango
+DIAS_REPORTE = 7
+MAX_DIAS_REPORTE = 366
+
+def _fecha(texto, defecto):
+    try:
+        return date.fromisoformat(texto) if texto else defecto
+    except ValueError:
+        return defecto
+
+@rendimientos_bp.route('/rendimientos/reporte')
+def reporte_rendimientos():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    # Rango de fechas (por defecto la última semana)
+    hasta = _fecha(request.args.get('hasta'), date.today())
+    desde = _fecha(request.args.get('desde'), hasta - timedelta(days=DIAS_REPORTE - 1))
+    if desde > hasta:
+        desde, hasta = hasta, desde
+    if (hasta - desde).days >= MAX_DIAS_REPORTE:
+        flash(f'El reporte abarca como máximo {MAX_DIAS_REPORTE} días', 'warning')
+        desde = hasta - timedelta(days=MAX_DIAS_REPORTE - 1)
+
+    # Admin puede ver todas las fincas; el resto solo la suya
+    fincas = []
+    if session['rol'] == 'admin':
+        fincas = Finca.query.filter_by(activa=True).order_by(Finca.nombre).all()
+        finca_id = request.args.get('finca_id', type=int)
+    else:
+        usuario = obtener_principal()
+        finca_id = usuario.finca_id if usuario else None
+        if not finca_id:
+            flash('No tienes una finca asignada', 'error')
+            return redirect(url_for('dashboard.index'))
+
+    # Solo se leen los consolidados, nunca app_rendimiento
+    return render_template('rendimientos/reporte.html',
+                           desde=desde, hasta=hasta, finca_id=finca_id, fincas=fincas,
+                           por_area=totales_por_area(desde, hasta, finca_id),
+                           por_dia=totales_por_dia(desde, hasta, finca_id),
+                           por_semana=totales_por_semana(desde, hasta, finca_id),
+                           marca=marca_actual())
@@ -0,0 +1,89 @@
+import hmac
+import json
+
+from flask import Blueprint, jsonify, session, redirect, url_for, flash, request, render_template, current_app
+from app.models import db, Auditoria, Usuario
+from app.motor import estadisticas_pool
+from app.auditoria import TABLAS
+from app.paginacion import paginar_keyset
+from app.metricas import texto_prometheus, resumen_por_ruta
+
+sistema_bp = Blueprint('sistema', __name__)
+
+@sistema_bp.route('/sistema/pool')
+def estado_pool():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    if session['rol'] != 'admin':
+        flash('No tienes permisos para ver el estado del sistema', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    return jsonify(estadisticas_pool(db.engine))
+
+@sistema_bp.route('/sistema/auditoria')
+def ver_auditoria():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    if session['rol'] != 'admin':
+        flash('No tienes permisos para ver la auditoría', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    # Filtros por entidad (tabla y registro) o por usuario, cada uno con su índice
+    filtros = {
+        'tabla': request.args.get('tabla', '') if request.args.get('tabla') in TABLAS else '',
+        'registro_id': request.args.get('registro_id', type=int),
+        'usuario_id': request.args.get('usuario_id', type=int),
+    }
+    consulta = Auditoria.query
+    if filtros['tabla']:
+        consulta = consulta.filter(Auditoria.tabla == filtros['tabla'])
+        if filtros['registro_id'] is not None:
+            consulta = consulta.filter(Auditoria.registro_id == filtros['registro_id'])
+    if filtros['usuario_id'] is not None:
+        consulta = consulta.filter(Auditoria.usuario_id == filtros['usuario_id'])
+    filtros = {clave: valor for clave, valor in filtros.items() if valor not in ('', None)}
+    
+    pagina = paginar_keyset(consulta, [Auditoria.id],
+                            despues=request.args.get('despues'), antes=request.args.get('antes'),
+                            descendente=True)
+    
+    # Nombres de los usuarios de la página en una sola consulta
+    usuario_ids = {registro.usuario_id for registro in pagina.items if registro.usuario_id}
+    usuarios = {}
+    if usuario_ids:
+        usuarios = dict(db.session.query(Usuario.id, Usuario.username).filter(Usuario.id.in_(usuario_ids)).all())
+    
+    registros = [{'registro': registro, 'cambios': json.loads(registro.cambios or '{}')}
+                 for registro in pagina.items]
+    return render_template('sistema/auditoria.html', pagina=pagina, registros=registros,
+                           usuarios=usuarios, tablas=TABLAS, filtros=filtros)
+
+def _puede_leer_metricas():
+    if session.get('rol') == 'admin':
+        return True
+    # Sin token no se abre a nadie más: detrás de un proxy en el mismo servidor
+    # (nginx, IIS) todas las peticiones llegan desde 127.0.0.1
+    token = current_app.config.get('METRICAS_TOKEN')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+@sistema_bp.route('/metrics')
+def metricas_prometheus():
+    if not _puede_leer_metricas():
+        return 'No autorizado\n', 401, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    return texto_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@sistema_bp.route('/sistema/metricas')
+def ver_metricas():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    if session['rol'] != 'admin':
+        flash('No tienes permisos para ver el estado del sistema', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    return render_template('sistema/metricas.html', filas=resumen_por_ruta())
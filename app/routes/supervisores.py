@@ -1,5 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from app.models import db, Supervisor, Area, Usuario
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app.models import db, Supervisor, Area
+from app.exportacion import respuesta_exportacion
+from app.principal import obtener_principal
+from app.consultas import areas_activas
+from app.versiones import etag_listado, respuesta_no_modificada, con_etag
 
 supervisores_bp = Blueprint('supervisores', __name__)
 
@@ -12,8 +18,34 @@ def listar_supervisores():
         flash('No tienes permisos para ver supervisores', 'error')
         return redirect(url_for('dashboard.index'))
     
+    # Sin cambios desde la última visita: 304 sin consultar ni renderizar
+    etag = etag_listado(('app_supervisor',))
+    no_modificada = respuesta_no_modificada(etag)
+    if no_modificada:
+        return no_modificada
+    
     supervisores = Supervisor.query.filter_by(activo=True).all()
-    return render_template('supervisores/listar.html', supervisores=supervisores)
+    return con_etag(render_template('supervisores/listar.html', supervisores=supervisores), etag)
+
+@supervisores_bp.route('/supervisores/exportar')
+def exportar_supervisores():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    if session['rol'] not in ['admin', 'rrhh', 'jefe_cultivo']:
+        flash('No tienes permisos para ver supervisores', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    # La clave de acceso no se exporta
+    consulta = (select(Supervisor.nombre, Supervisor.apellido, Supervisor.telefono, Supervisor.email,
+                       Supervisor.activo, Supervisor.fecha_creacion, Supervisor.fecha_ultimo_acceso)
+                .where(Supervisor.activo == True)
+                .order_by(Supervisor.id))
+    
+    return respuesta_exportacion('supervisores',
+                                 ['Nombre', 'Apellido', 'Teléfono', 'Email', 'Activo', 'Fecha Creación',
+                                  'Último Acceso'],
+                                 consulta, request.args.get('formato', 'csv'))
 
 @supervisores_bp.route('/supervisores/crear', methods=['GET', 'POST'])
 def crear_supervisor():
@@ -58,26 +90,27 @@ def asignar_supervisor_area():
         if supervisor and area:
             # Verificar que el área pertenece a la finca del usuario
             if session['rol'] != 'admin':
-                usuario = Usuario.query.get(session['user_id'])
+                usuario = obtener_principal()
                 if area.finca_id != usuario.finca_id:
                     flash('No puedes asignar supervisores a áreas de otras fincas', 'error')
                     return redirect(url_for('supervisores.asignar_supervisor_area'))
             
-            area.supervisor_id = supervisor_id
+            area.supervisor_id = supervisor.id
             db.session.commit()
             flash(f'Supervisor {supervisor.nombre} {supervisor.apellido} asignado al área {area.nombre}', 'success')
             return redirect(url_for('supervisores.listar_supervisores'))
         else:
             flash('Error al asignar supervisor', 'error')
     
-    # Filtrar supervisores y áreas según el rol
+    # Filtrar supervisores y áreas según el rol; la finca de cada área se
+    # carga en la misma consulta (la plantilla muestra su nombre)
     if session['rol'] == 'admin':
         supervisores = Supervisor.query.filter_by(activo=True).all()
-        areas = Area.query.filter_by(activa=True).all()
+        areas = Area.query.options(joinedload(Area.finca)).filter_by(activa=True).all()
     else:
-        usuario = Usuario.query.get(session['user_id'])
+        usuario = obtener_principal()
         supervisores = Supervisor.query.filter_by(activo=True).all()
-        areas = Area.query.filter_by(finca_id=usuario.finca_id, activa=True).all()
+        areas = Area.query.options(joinedload(Area.finca)).filter_by(finca_id=usuario.finca_id, activa=True).all()
     
     return render_template('supervisores/asignar_area.html', supervisores=supervisores, areas=areas)
 
@@ -92,26 +125,23 @@ def gestionar_asignaciones_supervisores():
     
     # Filtrar áreas según el rol
     if session['rol'] == 'admin':
-        areas = Area.query.filter_by(activa=True).all()
+        finca_id = None
     else:
-        usuario = Usuario.query.get(session['user_id'])
-        areas = Area.query.filter_by(finca_id=usuario.finca_id, activa=True).all()
+        usuario = obtener_principal()
+        finca_id = usuario.finca_id if usuario else None
     
-    # Obtener supervisores por área
+    # Supervisores por área (el supervisor llega en la misma consulta del área)
+    areas = areas_activas(finca_id) if session['rol'] == 'admin' or finca_id else []
     supervisores_por_area = {}
     for area in areas:
-        supervisor = None
-        if area.supervisor_id:
-            supervisor = Supervisor.query.get(area.supervisor_id)
-        
         supervisores_por_area[area.id] = {
             'area': area,
-            'supervisor': supervisor
+            'supervisor': area.supervisor
         }
     
     # Supervisores sin área
-    supervisores_sin_area = Supervisor.query.filter_by(activo=True).all()
-    supervisores_sin_area = [s for s in supervisores_sin_area if not any(data['supervisor'] and data['supervisor'].id == s.id for data in supervisores_por_area.values())]
+    asignados = {area.supervisor_id for area in areas if area.supervisor_id}
+    supervisores_sin_area = [s for s in Supervisor.query.filter_by(activo=True).all() if s.id not in asignados]
     
     return render_template('supervisores/gestionar_asignaciones.html', 
                          supervisores_por_area=supervisores_por_area, 
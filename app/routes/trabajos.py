@@ -0,0 +1,37 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, session, jsonify
+from app.models import db, Trabajo
+from app.trabajos import estado_trabajo
+
+trabajos_bp = Blueprint('trabajos', __name__)
+
+def _trabajo_visible(trabajo_id):
+    """El trabajo si existe y lo pidió el usuario actual (o es admin)"""
+    trabajo = db.session.get(Trabajo, trabajo_id)
+    if trabajo is None:
+        return None
+    if session['rol'] != 'admin' and trabajo.usuario_id != session['user_id']:
+        return None
+    return trabajo
+
+@trabajos_bp.route('/trabajos/<int:trabajo_id>')
+def ver_trabajo(trabajo_id):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    trabajo = _trabajo_visible(trabajo_id)
+    if trabajo is None:
+        flash('El trabajo no existe', 'error')
+        return redirect(url_for('codigos.listar_codigos'))
+
+    return render_template('trabajos/ver.html', trabajo=estado_trabajo(trabajo))
+
+@trabajos_bp.route('/trabajos/<int:trabajo_id>/estado')
+def estado_trabajo_json(trabajo_id):
+    if 'user_id' not in session:
+        return jsonify(error='No autenticado'), 401
+
+    trabajo = _trabajo_visible(trabajo_id)
+    if trabajo is None:
+        return jsonify(error='El trabajo no existe'), 404
+
+    return jsonify(estado_trabajo(trabajo))
@@ -1,5 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from app.models import db, Usuario, Finca
+from app.principal import invalidar_principal
+from app.versiones import etag_listado, respuesta_no_modificada, con_etag
 
 usuarios_bp = Blueprint('usuarios', __name__)
 
@@ -12,8 +14,14 @@ def listar_usuarios():
         flash('No tienes permisos para ver usuarios', 'error')
         return redirect(url_for('dashboard.index'))
     
+    # Sin cambios desde la última visita: 304 sin consultar ni renderizar
+    etag = etag_listado(('app_usuario', 'app_finca'))
+    no_modificada = respuesta_no_modificada(etag)
+    if no_modificada:
+        return no_modificada
+    
     usuarios = Usuario.query.all()
-    return render_template('usuarios/listar.html', usuarios=usuarios)
+    return con_etag(render_template('usuarios/listar.html', usuarios=usuarios), etag)
 
 @usuarios_bp.route('/usuarios/crear', methods=['GET', 'POST'])
 def crear_usuario():
@@ -54,6 +62,7 @@ def asignar_usuario_finca(usuario_id):
     if request.method == 'POST':
         usuario.finca_id = request.form['finca_id'] if request.form['finca_id'] else None
         db.session.commit()
+        invalidar_principal(usuario.id)
         flash(f'Usuario {usuario.username} asignado exitosamente', 'success')
         return redirect(url_for('usuarios.listar_usuarios'))
     
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models import db, Area, Codigo, Supervisor
+from app.paginacion import codificar_cursor, decodificar_cursor, filtro_keyset
+
+# Sincronización incremental de la aplicación móvil de supervisores. El
+# cliente guarda la versión recibida y en la siguiente petición solo recibe
+# las áreas, códigos y supervisores modificados desde entonces (columna
+# fecha_modificacion). Las desactivaciones viajan como bajas (solo el id)
+# para que el cliente borre su copia local.
+#
+# La versión es la posición (fecha_modificacion, id) alcanzada en cada tabla
+# más las fincas del supervisor. Al terminar, la posición retrocede hasta
+# ahora - MARGEN: una transacción que tomó su fecha antes puede confirmar
+# después, y así esas filas se vuelven a leer (el cliente las aplica como
+# reemplazo, repetirlas no hace daño). Si cambian las fincas del supervisor
+# se envía una copia completa.
+#
+# Las escrituras fuera de la aplicación (scripts, SQL a mano) deben poner
+# fecha_modificacion; actualizar_esquema.py rellena las filas anteriores a
+# la columna.
+
+MARGEN = timedelta(minutes=2)
+
+# Filas por tabla en cada respuesta; con hay_mas el cliente repite la
+# petición con la versión recibida
+LIMITE = 2000
+
+
+class ErrorSincronizacion(Exception):
+    pass
+
+
+# (nombre, modelo, columna de activo, columnas enviadas, filtra por finca)
+ENTIDADES = (
+    ('areas', Area, Area.activa,
+     (Area.id, Area.nombre, Area.finca_id, Area.supervisor_id), True),
+    ('codigos', Codigo, Codigo.activo,
+     (Codigo.id, Codigo.codigo, Codigo.nombre_persona, Codigo.apellido_persona,
+      Codigo.area_id, Codigo.finca_id), True),
+    # Sin email ni clave de acceso
+    ('supervisores', Supervisor, Supervisor.activo,
+     (Supervisor.id, Supervisor.nombre, Supervisor.apellido, Supervisor.telefono), False),
+)
+
+
+def fincas_de_supervisor(supervisor_id):
+    """Ids de las fincas donde el supervisor tiene áreas activas"""
+    consulta = (select(Area.finca_id)
+                .where(Area.supervisor_id == supervisor_id, Area.activa == True)
+                .distinct())
+    return sorted(db.session.execute(consulta).scalars())
+
+
+def _leer_version(version):
+    valores = decodificar_cursor(version, 2)
+    if valores is None:
+        raise ErrorSincronizacion('Versión inválida')
+    fincas, posiciones = valores
+    if not isinstance(fincas, list) or not isinstance(posiciones, list) or len(posiciones) != len(ENTIDADES):
+        raise ErrorSincronizacion('Versión inválida')
+    try:
+        fincas = sorted(int(finca_id) for finca_id in fincas)
+        posiciones = [(datetime.fromisoformat(fecha), int(id_)) for fecha, id_ in posiciones]
+    except (TypeError, ValueError):
+        raise ErrorSincronizacion('Versión inválida')
+    return fincas, posiciones
+
+
+def _version(fincas, posiciones):
+    return codificar_cursor([fincas, [[fecha.isoformat(), id_] for fecha, id_ in posiciones]])
+
+
+def cambios_desde(version, fincas, limite=LIMITE):
+    """Filas modificadas desde `version` en las fincas indicadas
+
+    Sin versión (o si cambiaron las fincas) devuelve todas las filas activas
+    con completa=True. Lanza ErrorSincronizacion si la versión no es válida.
+    """
+    completa = True
+    posiciones = [None] * len(ENTIDADES)
+    if version:
+        fincas_version, anteriores = _leer_version(version)
+        if fincas_version == fincas:
+            completa = False
+            posiciones = anteriores
+
+    corte = datetime.utcnow() - MARGEN
+    datos = {'completa': completa, 'hay_mas': False, 'bajas': {}}
+    nuevas = []
+    for (nombre, modelo, activo, columnas, por_finca), posicion in zip(ENTIDADES, posiciones):
+        orden = [modelo.fecha_modificacion, modelo.id]
+        consulta = select(*columnas, activo, modelo.fecha_modificacion)
+        if por_finca:
+            consulta = consulta.where(modelo.finca_id.in_(fincas))
+        if posicion is None:
+            # El cliente no tiene filas: no hace falta enviarle bajas
+            consulta = consulta.where(activo == True)
+        else:
+            consulta = consulta.where(filtro_keyset(orden, posicion))
+        filas = db.session.execute(consulta.order_by(*orden).limit(limite + 1)).all()
+
+        hay_mas = len(filas) > limite
+        filas = filas[:limite]
+        claves = [columna.key for columna in columnas]
+        datos[nombre] = [dict(zip(claves, fila)) for fila in filas if fila[-2]]
+        datos['bajas'][nombre] = [fila.id for fila in filas if not fila[-2]]
+
+        if hay_mas:
+            datos['hay_mas'] = True
+            nuevas.append((filas[-1][-1], filas[-1].id))
+        else:
+            nuevas.append((corte, 0))
+
+    datos['version'] = _version(fincas, nuevas)
+    return datos
@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from app.importacion import importar_codigos
+from app.models import db, Trabajo
+from app.operaciones_masivas import crear_rango_codigos, reasignar_codigos_area
+
+# Cola de trabajos en segundo plano para las operaciones masivas (rangos de
+# códigos, reasignaciones e importaciones grandes). La petición solo guarda
+# el registro en app_trabajo y responde; un pool de hilos del proceso
+# (TRABAJOS_HILOS) ejecuta los trabajos con paralelismo acotado y la página
+# del trabajo consulta su estado.
+#
+# Cada trabajo corre en su propio contexto de aplicación (sesión propia) y
+# confirma su resultado en la misma transacción que los datos: o queda
+# terminado con todo aplicado o fallido sin cambios. El avance se guarda en
+# memoria del proceso; fuera de SQLite también se escribe en la tabla desde
+# otra conexión, para que lo vean los demás workers (en SQLite la transacción
+# del trabajo tiene el bloqueo de escritura y esa escritura esperaría).
+#
+# Los trabajos viven en el proceso que los encoló: si se reinicia, los que
+# quedaron en curso no van a terminar y los pendientes nadie los ejecuta.
+# recuperar_trabajos.py (al arrancar, antes de levantar los workers) marca
+# fallidos los primeros, borra sus archivos y ejecuta los pendientes.
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_FINALES = ('terminado', 'fallido')
+MAX_ERROR = 2000
+ERROR_INTERRUMPIDO = 'Interrumpido por un reinicio del servidor'
+
+_tareas = {}
+_progreso = {}
+_futuros = {}
+_lock = threading.Lock()
+_ejecutor = None
+
+
+def tarea(tipo):
+    """Registra funcion(parametros, progreso) -> resultado como tarea `tipo`
+
+    `progreso(n)` informa cuántos elementos lleva procesados. El resultado
+    debe poder guardarse como JSON.
+    """
+    def registrar(funcion):
+        _tareas[tipo] = funcion
+        return funcion
+    return registrar
+
+
+def _obtener_ejecutor(hilos):
+    global _ejecutor
+    with _lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='trabajo')
+        return _ejecutor
+
+
+def encolar(tipo, parametros, usuario_id=None, total=None):
+    """Crea el trabajo y lo entrega al pool; devuelve el Trabajo
+
+    Hace commit de la sesión actual. Con TRABAJOS_HILOS = 0 el trabajo se
+    ejecuta en el momento, dentro de la petición.
+    """
+    if tipo not in _tareas:
+        raise ValueError(f'Tarea desconocida: {tipo}')
+    trabajo = Trabajo(tipo=tipo, usuario_id=usuario_id, total=total,
+                      parametros=json.dumps(parametros))
+    db.session.add(trabajo)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    hilos = app.config['TRABAJOS_HILOS']
+    if hilos <= 0:
+        _ejecutar(app, trabajo.id)
+        db.session.refresh(trabajo)
+    else:
+        futuro = _obtener_ejecutor(hilos).submit(_ejecutar, app, trabajo.id)
+        with _lock:
+            _futuros[trabajo.id] = futuro
+        futuro.add_done_callback(lambda _, trabajo_id=trabajo.id: _olvidar(trabajo_id))
+    return trabajo
+
+
+def guardar_archivo(archivo):
+    """Copia un archivo subido a instance/trabajos para que lo lea el trabajo"""
+    carpeta = os.path.join(current_app.instance_path, 'trabajos')
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f'{uuid.uuid4().hex}.csv')
+    archivo.save(ruta)
+    return ruta
+
+
+def _olvidar(trabajo_id):
+    with _lock:
+        _futuros.pop(trabajo_id, None)
+
+
+def esperar(trabajo_id, timeout=None):
+    """Espera a que termine un trabajo encolado por este proceso"""
+    with _lock:
+        futuro = _futuros.get(trabajo_id)
+    if futuro is not None:
+        futuro.result(timeout)
+
+
+def _reportar(trabajo_id):
+    persistir = db.engine.dialect.name != 'sqlite'
+
+    def progreso(n):
+        with _lock:
+            _progreso[trabajo_id] = n
+        if persistir:
+            with db.engine.begin() as conexion:
+                conexion.execute(update(Trabajo.__table__)
+                                 .where(Trabajo.__table__.c.id == trabajo_id)
+                                 .values(progreso=n))
+    return progreso
+
+
+def _ejecutar(app, trabajo_id):
+    with app.app_context():
+        try:
+            tabla = Trabajo.__table__
+            # Solo un hilo puede tomar el trabajo
+            tomado = db.session.execute(update(tabla)
+                                        .where(tabla.c.id == trabajo_id, tabla.c.estado == 'pendiente')
+                                        .values(estado='en_curso', fecha_inicio=datetime.utcnow())).rowcount
+            db.session.commit()
+            if not tomado:
+                return
+
+            trabajo = db.session.get(Trabajo, trabajo_id)
+            # La auditoría atribuye los cambios a quien pidió el trabajo
+            db.session.info['usuario_id'] = trabajo.usuario_id
+            try:
+                resultado = _tareas[trabajo.tipo](json.loads(trabajo.parametros or '{}'),
+                                                  _reportar(trabajo_id))
+                trabajo.estado = 'terminado'
+                trabajo.resultado = json.dumps(resultado)
+                trabajo.progreso = trabajo.total if trabajo.total is not None else _progreso.get(trabajo_id, 0)
+                trabajo.fecha_fin = datetime.utcnow()
+                db.session.commit()
+            except Exception as e:
+                logger.exception('Falló el trabajo %s (%s)', trabajo_id, trabajo.tipo)
+                db.session.rollback()
+                db.session.execute(update(tabla)
+                                   .where(tabla.c.id == trabajo_id)
+                                   .values(estado='fallido', error=str(e)[:MAX_ERROR],
+                                           fecha_fin=datetime.utcnow()))
+                db.session.commit()
+        finally:
+            with _lock:
+                _progreso.pop(trabajo_id, None)
+            db.session.remove()
+
+
+def recuperar_trabajos(app):
+    """Cierra los trabajos que dejó un reinicio; devuelve (interrumpidos, ejecutados)
+
+    Los trabajos en curso quedan fallidos (su transacción ya se revirtió) y
+    los pendientes se ejecutan aquí mismo, en orden. Solo debe llamarse sin
+    workers en marcha: no distingue un trabajo huérfano de uno que otro
+    proceso está ejecutando.
+    """
+    interrumpidos = Trabajo.query.filter_by(estado='en_curso').all()
+    for trabajo in interrumpidos:
+        _borrar_archivo(trabajo)
+        trabajo.estado = 'fallido'
+        trabajo.error = ERROR_INTERRUMPIDO
+        trabajo.fecha_fin = datetime.utcnow()
+    db.session.commit()
+
+    pendientes = db.session.execute(select(Trabajo.id).where(Trabajo.estado == 'pendiente')
+                                    .order_by(Trabajo.id)).scalars().all()
+    for trabajo_id in pendientes:
+        _ejecutar(app, trabajo_id)
+    return len(interrumpidos), len(pendientes)
+
+
+def _borrar_archivo(trabajo):
+    # Copia del CSV de una importación (guardar_archivo)
+    ruta = json.loads(trabajo.parametros or '{}').get('archivo')
+    if ruta and os.path.exists(ruta):
+        os.remove(ruta)
+
+
+def estado_trabajo(trabajo):
+    """Estado del trabajo para la página y el endpoint de consulta"""
+    progreso = trabajo.progreso or 0
+    if trabajo.estado not in ESTADOS_FINALES:
+        with _lock:
+            progreso = max(progreso, _progreso.get(trabajo.id, 0))
+    porcentaje = None
+    if trabajo.total:
+        porcentaje = min(100, round(progreso * 100 / trabajo.total))
+    return {
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'progreso': progreso,
+        'total': trabajo.total,
+        'porcentaje': porcentaje,
+        'resultado': json.loads(trabajo.resultado) if trabajo.resultado else None,
+        'error': trabajo.error,
+        'fecha_creacion': trabajo.fecha_creacion.isoformat() if trabajo.fecha_creacion else None,
+        'fecha_inicio': trabajo.fecha_inicio.isoformat() if trabajo.fecha_inicio else None,
+        'fecha_fin': trabajo.fecha_fin.isoformat() if trabajo.fecha_fin else None,
+    }
+
+
+# Tareas de las operaciones masivas de códigos
+
+@tarea('crear_rango')
+def _crear_rango(parametros, progreso):
+    creados, existentes = crear_rango_codigos(parametros['finca_id'], parametros['inicio'], parametros['fin'],
+                                              parametros.get('area_id'), progreso=progreso)
+    return {'creados': creados, 'existentes': existentes}
+
+
+@tarea('reasignar')
+def _reasignar(parametros, progreso):
+    actualizados = reasignar_codigos_area(parametros['codigo_ids'], parametros['area_id'], progreso=progreso)
+    return {'actualizados': actualizados, 'omitidos': len(parametros['codigo_ids']) - actualizados}
+
+
+@tarea('importar')
+def _importar(parametros, progreso):
+    try:
+        with open(parametros['archivo'], 'rb') as archivo:
+            resultado = importar_codigos(archivo, parametros.get('finca_id'), progreso=progreso)
+    finally:
+        os.remove(parametros['archivo'])
+    return {'filas': resultado.filas, 'importados': resultado.importados,
+            'errores': resultado.errores, 'total_errores': resultado.total_errores}
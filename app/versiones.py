@@ -0,0 +1,88 @@
+import hashlib
+import os
+from pathlib import Path
+
+from flask import make_response, request, session
+from sqlalchemy import func, select
+
+from app.models import db, Area, Codigo, Finca, Supervisor, Usuario
+
+# GET condicional de los listados. La versión de una tabla (o de la parte de
+# una finca) es la cantidad de filas más la fecha_modificacion máxima: un
+# alta o una edición cambia la fecha máxima y una baja física cambia la
+# cantidad. Ambas salen de índices, así que comprobar la versión cuesta una
+# consulta pequeña; si el navegador ya tiene esa versión (If-None-Match) se
+# responde 304 sin la consulta principal ni la plantilla.
+#
+# El ETag incluye también al usuario, la URL completa (filtros y cursor) y el
+# despliegue, porque la página depende de todo eso. Una página que muestra
+# mensajes flash no lleva ETag: el navegador no debe volver a mostrarla.
+
+# (modelo, columna de finca o None, columnas de fecha que cambian la página)
+_TABLAS = {
+    'app_finca': (Finca, Finca.id, (Finca.fecha_modificacion,)),
+    'app_usuario': (Usuario, Usuario.finca_id, (Usuario.fecha_modificacion,)),
+    'app_area': (Area, Area.finca_id, (Area.fecha_modificacion,)),
+    # El último acceso se muestra en el listado pero no cuenta como modificación
+    'app_supervisor': (Supervisor, None, (Supervisor.fecha_modificacion, Supervisor.fecha_ultimo_acceso)),
+    'app_codigo': (Codigo, Codigo.finca_id, (Codigo.fecha_modificacion,)),
+}
+
+
+def _despliegue():
+    # Fecha del archivo más reciente de la aplicación: cambia con cada despliegue
+    raiz = Path(__file__).parent
+    fechas = [os.path.getmtime(os.path.join(carpeta, archivo))
+              for carpeta, _, archivos in os.walk(raiz) for archivo in archivos
+              if archivo.endswith(('.py', '.html'))]
+    return max(fechas, default=0)
+
+
+_DESPLIEGUE = _despliegue()
+
+
+def version_tablas(tablas, finca_id=None, globales=()):
+    """(filas, fechas máximas...) de cada tabla, en una sola consulta
+
+    Las tablas de `globales` no se limitan a `finca_id`: la página muestra
+    todas sus filas (por ejemplo el selector de fincas del admin).
+    """
+    columnas = []
+    for nombre in tablas:
+        modelo, columna_finca, fechas = _TABLAS[nombre]
+        condiciones = []
+        if finca_id is not None and columna_finca is not None and nombre not in globales:
+            condiciones.append(columna_finca == finca_id)
+        for expresion in (func.count(), *[func.max(fecha) for fecha in fechas]):
+            columnas.append(select(expresion).select_from(modelo).where(*condiciones).scalar_subquery())
+    return tuple(db.session.execute(select(*columnas)).one())
+
+
+def etag_listado(tablas, finca_id=None, globales=()):
+    """ETag de la página actual según la versión de `tablas`, o None si hay mensajes flash"""
+    if '_flashes' in session:
+        return None
+    partes = (request.full_path, session.get('user_id'), session.get('rol'), session.get('username'),
+              finca_id, _DESPLIEGUE, version_tablas(tablas, finca_id, globales))
+    return hashlib.blake2b(repr(partes).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _sin_cache_compartida(respuesta, etag):
+    if etag is None:
+        return respuesta
+    respuesta.set_etag(etag, weak=True)
+    # El navegador guarda la página pero la revalida siempre; los proxies no
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+def respuesta_no_modificada(etag):
+    """Respuesta 304 si el navegador ya tiene la versión `etag`, si no None"""
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    return _sin_cache_compartida(make_response('', 304), etag)
+
+
+def con_etag(contenido, etag):
+    """Respuesta con el contenido renderizado y su ETag"""
+    return _sin_cache_compartida(make_response(contenido), etag)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las rutas de la aplicación con línea base y reporte de regresiones
+
+Genera con generar_datos.py una base SQLite temporal por cada volumen (1.000,
+10.000 y 100.000 códigos por defecto, con un mes de rendimientos
+consolidados), levanta create_app contra ella y recorre cada ruta de
+app/routes/ con el cliente de pruebas de Flask, con sesión de admin. Por
+ruta mide p50/p95 de la latencia, sentencias SQL por petición y el pico de
+memoria de Python (tracemalloc, en una petición aparte para no inflar la
+latencia).
+
+Compara contra la línea base anterior y muestra las diferencias: una ruta
+regresa si su p95 crece más que --umbral (y más de 1 ms), si emite más
+sentencias o si su pico de memoria crece más que --umbral. Con regresiones
+termina con código 1, para usarlo antes de un despliegue. La línea base se
+escribe la primera vez y luego solo con --guardar; depende de la máquina,
+por eso no se versiona.
+
+Uso:
+    python benchmarks/bench_endpoints.py
+    python benchmarks/bench_endpoints.py --tamanos 1000 10000 --repeticiones 10
+    python benchmarks/bench_endpoints.py --guardar
+"""
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, select
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app
+from app.config import config
+from app.consolidacion import consolidar_pendientes
+from app.models import db, Area, Codigo, Finca, Supervisor, Trabajo, Usuario
+from benchmarks.rutas import PETICIONES, endpoints_sin_peticion, formatear
+from generar_datos import generar
+
+LINEA_BASE = Path(__file__).parent / 'linea_base_endpoints.json'
+CODIGOS_POR_AREA = 50
+FINCAS = 5
+# Diferencias de latencia menores que esto son ruido del reloj
+MINIMO_MS = 1.0
+
+
+def _percentil(valores, p):
+    """Percentil `p` por rango más cercano"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(len(ordenados) * p / 100) - 1)]
+
+
+def preparar_base(url, codigos, meses):
+    """Genera la base con `codigos` códigos (aproximados); devuelve el conteo por tabla"""
+    engine = create_engine(url)
+    db.metadata.create_all(engine)
+    areas_por_finca = max(1, round(codigos * 0.9 / CODIGOS_POR_AREA / FINCAS))
+    try:
+        conteo = generar(engine, fincas=FINCAS, areas_por_finca=areas_por_finca,
+                         codigos_por_area=CODIGOS_POR_AREA, sin_area=0.1, meses=meses,
+                         informar=lambda texto: None)
+    finally:
+        engine.dispose()
+    conteo.pop('rango_rendimientos', None)
+    return conteo
+
+
+def _crear_app(url):
+    # create_app toma la URL de la clase de configuración
+    class ConfigBenchmark(config['default']):
+        SQLALCHEMY_DATABASE_URI = url
+        DEBUG = False
+        TESTING = True
+        # Sin hilo de auditoría: las peticiones POST escriben en la misma transacción
+        AUDITORIA_ASINCRONA = False
+
+    config['benchmark'] = ConfigBenchmark
+    app = create_app('benchmark')
+    with app.app_context():
+        event.listen(db.engine, 'connect', _sin_fsync)
+    return app
+
+
+def _sin_fsync(conexion, registro):
+    # El fsync de cada commit mide el disco, no la aplicación, y varía entre ejecuciones
+    conexion.execute('PRAGMA synchronous = OFF')
+
+
+def _ids(app):
+    """Crea los usuarios y registros que usan las peticiones; devuelve sus ids"""
+    with app.app_context():
+        admin = Usuario(username='admin', email='admin@agricultura.com', rol='admin')
+        admin.set_password('admin123')
+        finca_id = db.session.execute(select(Finca.id).order_by(Finca.id)).scalars().first()
+        jefe = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=finca_id)
+        jefe.set_password('clave')
+        db.session.add_all([admin, jefe])
+        db.session.flush()
+        trabajo = Trabajo(tipo='crear_rango', usuario_id=admin.id, estado='terminado', resultado='{}')
+        db.session.add(trabajo)
+
+        # Un área activa con supervisor activo y un código activo en ella
+        area, supervisor = db.session.execute(
+            select(Area, Supervisor).join(Supervisor, Area.supervisor_id == Supervisor.id)
+            .where(Area.activa == True, Supervisor.activo == True).order_by(Area.id)).first()
+        codigo = db.session.execute(
+            select(Codigo).where(Codigo.area_id == area.id, Codigo.activo == True).order_by(Codigo.id)).scalars().first()
+        db.session.commit()
+        return {
+            'admin_id': admin.id, 'jefe_id': jefe.id, 'trabajo_id': trabajo.id, 'finca_id': area.finca_id,
+            'area_id': area.id, 'supervisor_id': supervisor.id, 'clave_acceso': supervisor.clave_acceso,
+            'codigo_id': codigo.id, 'codigo': codigo.codigo, 'busqueda': 'Jos', 'hoy': date.today().isoformat(),
+        }
+
+
+def medir_rutas(app, ids, repeticiones):
+    """{'MÉTODO url': {p50_ms, p95_ms, sentencias, memoria_kb, estado}} de cada petición"""
+    sentencias = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', contar)
+
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = ids['admin_id']
+        sesion['username'] = 'admin'
+        sesion['rol'] = 'admin'
+
+    def peticion(metodo, url, opciones):
+        respuesta = client.open(url, method=metodo, **opciones)
+        # Las exportaciones se generan mientras se lee la respuesta
+        respuesta.get_data()
+        if url == '/logout':
+            # Cerrar sesión la borra: se restaura para las siguientes rutas
+            with client.session_transaction() as sesion:
+                sesion['user_id'] = ids['admin_id']
+                sesion['username'] = 'admin'
+                sesion['rol'] = 'admin'
+        return respuesta.status_code
+
+    resultados = {}
+    try:
+        for endpoint, lista in PETICIONES.items():
+            for metodo, url, opciones, _ in lista:
+                url, opciones = formatear(url, ids), formatear(opciones, ids)
+                nombre = f'{metodo} {url}'
+                # Primera petición sin medir: compila plantillas y llena las cachés
+                estado = peticion(metodo, url, opciones)
+
+                tiempos, cuentas = [], []
+                for _ in range(repeticiones):
+                    sentencias.clear()
+                    inicio = time.perf_counter()
+                    peticion(metodo, url, opciones)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                    cuentas.append(len(sentencias))
+
+                tracemalloc.start()
+                peticion(metodo, url, opciones)
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                resultados[nombre] = {
+                    'endpoint': endpoint, 'estado': estado,
+                    'p50_ms': round(_percentil(tiempos, 50), 3), 'p95_ms': round(_percentil(tiempos, 95), 3),
+                    'sentencias': statistics.median_low(cuentas), 'memoria_kb': round(pico / 1024, 1),
+                }
+    finally:
+        event.remove(engine, 'before_cursor_execute', contar)
+    return resultados
+
+
+def _cambio(anterior, actual):
+    return (actual - anterior) / anterior if anterior else (0.0 if actual == anterior else math.inf)
+
+
+def comparar(anterior, actual, umbral):
+    """Imprime las diferencias por volumen y ruta; devuelve la cantidad de regresiones"""
+    regresiones = 0
+    for tamano, datos in actual['tamanos'].items():
+        previo = anterior['tamanos'].get(tamano)
+        if previo is None:
+            print(f"\n{int(tamano):,} códigos: sin datos en la línea base")
+            continue
+        print(f"\n{int(tamano):,} códigos")
+        print(f"  {'petición':<62}{'p95 antes':>11}{'p95 ahora':>11}{'cambio':>9}{'SQL':>9}{'memoria':>10}")
+        for nombre, ruta in datos['rutas'].items():
+            base = previo['rutas'].get(nombre)
+            if base is None:
+                print(f"  {nombre:<62}{'nueva':>11}{ruta['p95_ms']:>8.2f} ms")
+                continue
+            problemas = []
+            cambio_p95 = _cambio(base['p95_ms'], ruta['p95_ms'])
+            if cambio_p95 > umbral and ruta['p95_ms'] - base['p95_ms'] > MINIMO_MS:
+                problemas.append('latencia')
+            if ruta['sentencias'] > base['sentencias']:
+                problemas.append('sentencias')
+            if _cambio(base['memoria_kb'], ruta['memoria_kb']) > umbral:
+                problemas.append('memoria')
+            regresiones += bool(problemas)
+            marca = '❌ ' + ', '.join(problemas) if problemas else ''
+            sql = f"{base['sentencias']}→{ruta['sentencias']}" if ruta['sentencias'] != base['sentencias'] \
+                else str(ruta['sentencias'])
+            memoria = f"{_cambio(base['memoria_kb'], ruta['memoria_kb']):+.0%}" if base['memoria_kb'] else '-'
+            print(f"  {nombre[:61]:<62}{base['p95_ms']:>8.2f} ms{ruta['p95_ms']:>8.2f} ms"
+                  f"{cambio_p95:>+9.0%}{sql:>9}{memoria:>10}  {marca}")
+        for nombre in previo['rutas'].keys() - datos['rutas'].keys():
+            print(f"  {nombre:<62}  ya no se mide")
+    return regresiones
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Benchmark de rutas con línea base')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='cantidades de códigos a generar')
+    parser.add_argument('--repeticiones', type=int, default=20, help='peticiones medidas por ruta')
+    parser.add_argument('--meses', type=int, default=1, help='meses de rendimientos generados')
+    parser.add_argument('--linea-base', type=Path, default=LINEA_BASE)
+    parser.add_argument('--umbral', type=float, default=0.2,
+                        help='crecimiento relativo de p95 o memoria que cuenta como regresión (0.2)')
+    parser.add_argument('--guardar', action='store_true', help='reemplaza la línea base con esta ejecución')
+    args = parser.parse_args()
+
+    actual = {'fecha': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+              'repeticiones': args.repeticiones, 'meses': args.meses, 'tamanos': {}}
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano in args.tamanos:
+            url = f"sqlite:///{Path(directorio) / f'bench_{tamano}.db'}"
+            print(f"🌱 Generando {tamano:,} códigos...")
+            inicio = time.perf_counter()
+            conteo = preparar_base(url, tamano, args.meses)
+            app = _crear_app(url)
+            with app.app_context():
+                consolidar_pendientes(margen=timedelta(0))
+            ids = _ids(app)
+            print(f"   listo en {time.perf_counter() - inicio:.1f} s ({conteo['app_codigo']:,} códigos, "
+                  f"{conteo.get('app_rendimiento', 0):,} rendimientos)")
+
+            faltantes = endpoints_sin_peticion(app)
+            if faltantes:
+                print(f"⚠️  Rutas sin petición en benchmarks/rutas.py: {', '.join(faltantes)}")
+
+            inicio = time.perf_counter()
+            rutas = medir_rutas(app, ids, args.repeticiones)
+            with app.app_context():
+                db.engine.dispose()
+            print(f"⏱️  {len(rutas)} peticiones medidas en {time.perf_counter() - inicio:.1f} s")
+            for nombre, ruta in rutas.items():
+                if ruta['estado'] >= 400:
+                    print(f"⚠️  {nombre} respondió {ruta['estado']}")
+            actual['tamanos'][str(tamano)] = {'conteo': conteo, 'rutas': rutas}
+
+    regresiones = 0
+    if args.linea_base.exists():
+        anterior = json.loads(args.linea_base.read_text(encoding='utf-8'))
+        print(f"\n📊 Comparación con la línea base del {anterior['fecha']}")
+        regresiones = comparar(anterior, actual, args.umbral)
+    else:
+        print("\n📊 Sin línea base anterior")
+        for tamano, datos in actual['tamanos'].items():
+            print(f"\n{int(tamano):,} códigos")
+            print(f"  {'petición':<62}{'p50':>11}{'p95':>11}{'SQL':>6}{'memoria':>12}")
+            for nombre, ruta in datos['rutas'].items():
+                print(f"  {nombre[:61]:<62}{ruta['p50_ms']:>8.2f} ms{ruta['p95_ms']:>8.2f} ms"
+                      f"{ruta['sentencias']:>6}{ruta['memoria_kb']:>9.0f} KB")
+
+    if args.guardar or not args.linea_base.exists():
+        args.linea_base.write_text(json.dumps(actual, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f"\n💾 Línea base guardada en {args.linea_base}")
+
+    if regresiones:
+        print(f"\n❌ {regresiones} regresiones sobre la línea base")
+        sys.exit(1)
+    print("\n✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los índices compuestos de app_area y app_codigo
+
+Genera una base SQLite temporal con generar_datos.py (500.000 códigos por
+defecto), mide las consultas del listado y de las asignaciones sin los
+índices compuestos y después de aplicarlos con actualizar_esquema.py, y
+muestra el plan de SQLite (EXPLAIN QUERY PLAN) de cada una: SCAN recorre
+la tabla, SEARCH usa un índice.
+
+Uso:
+    python benchmarks/bench_indices.py [--codigos 500000] [--repeticiones 5]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, select, text
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from actualizar_esquema import actualizar_esquema
+from app.models import db, Area, Codigo
+from generar_datos import generar
+
+FINCAS = 10
+AREAS_POR_FINCA = 200
+SUPERVISORES = 500
+SIN_AREA = 0.2
+
+
+def consultas():
+    finca_id, area_id, supervisor_id = 3, 2 * AREAS_POR_FINCA + 7, 25
+    orden = (Codigo.finca_id, Codigo.codigo, Codigo.id)
+    return {
+        'listado (finca)': select(Codigo).where(Codigo.finca_id == finca_id).order_by(*orden).limit(51),
+        'listado (finca, área, activo)': (select(Codigo)
+                                          .where(Codigo.finca_id == finca_id, Codigo.area_id == area_id,
+                                                 Codigo.activo == True)
+                                          .order_by(*orden).limit(51)),
+        'listado (sin área)': (select(Codigo)
+                               .where(Codigo.finca_id == finca_id, Codigo.area_id.is_(None))
+                               .order_by(*orden).limit(51)),
+        'asignaciones (códigos por área)': (select(Codigo)
+                                            .join(Area, Codigo.area_id == Area.id)
+                                            .where(Area.activa == True, Codigo.activo == True,
+                                                   Area.finca_id == finca_id)
+                                            .order_by(Codigo.area_id, Codigo.codigo)),
+        'áreas activas (finca)': select(Area).where(Area.finca_id == finca_id, Area.activa == True),
+        'área del supervisor': select(Area).where(Area.supervisor_id == supervisor_id),
+    }
+
+
+def _sql(engine, consulta):
+    return str(consulta.compile(engine, compile_kwargs={'literal_binds': True}))
+
+
+def medir(engine, repeticiones):
+    resultados = {}
+    with engine.connect() as conn:
+        for nombre, consulta in consultas().items():
+            sql = _sql(engine, consulta)
+            plan = [fila[-1] for fila in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                conn.exec_driver_sql(sql).fetchall()
+                tiempos.append(time.perf_counter() - inicio)
+            resultados[nombre] = (statistics.median(tiempos) * 1000, plan)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de índices compuestos')
+    parser.add_argument('--codigos', type=int, default=500000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = create_engine(f"sqlite:///{Path(directorio) / 'bench.db'}")
+        db.metadata.create_all(engine)
+        # Punto de partida: el esquema anterior, sin los índices compuestos
+        with engine.begin() as conn:
+            for tabla in (Area.__table__, Codigo.__table__):
+                for indice in tabla.indexes:
+                    conn.execute(text(f'DROP INDEX IF EXISTS "{indice.name}"'))
+
+        print(f"Generando {args.codigos} códigos...")
+        inicio = time.perf_counter()
+        generar(engine, fincas=FINCAS, areas_por_finca=AREAS_POR_FINCA, supervisores=SUPERVISORES,
+                codigos_por_area=round(args.codigos * (1 - SIN_AREA) / (FINCAS * AREAS_POR_FINCA)),
+                sin_area=SIN_AREA)
+        with engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+        print(f"  listo en {time.perf_counter() - inicio:.1f} s\n")
+
+        antes = medir(engine, args.repeticiones)
+        actualizar_esquema(engine)
+        with engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+        despues = medir(engine, args.repeticiones)
+        engine.dispose()
+
+    print(f"\n{'consulta':<34}{'sin índices':>14}{'con índices':>14}")
+    for nombre in antes:
+        print(f"{nombre:<34}{antes[nombre][0]:>11.2f} ms{despues[nombre][0]:>11.2f} ms")
+        for etiqueta, (_, plan) in (('antes', antes[nombre]), ('después', despues[nombre])):
+            for paso in plan:
+                print(f"    {etiqueta:<8} {paso}")
+
+
+if __name__ == "__main__":
+    main()
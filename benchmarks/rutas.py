@@ -0,0 +1,84 @@
+# Peticiones de ejemplo para cada ruta de app/routes/. Las usan la prueba de
+# presupuestos de sentencias (tests/test_presupuestos.py) y el benchmark de
+# rutas (bench_endpoints.py); una ruta nueva se agrega solo aquí y
+# test_todas_las_rutas_tienen_presupuesto falla mientras falte.
+#
+# Los valores entre llaves se completan con formatear() a partir de los ids
+# de la base de cada uno: finca_id, area_id, supervisor_id, clave_acceso (del
+# supervisor del área), codigo_id y codigo (un código del área), jefe_id,
+# trabajo_id, busqueda (prefijo de un nombre existente) y hoy.
+
+# endpoint: [(método, url, opciones de la petición, presupuesto de sentencias)]
+PETICIONES = {
+    'dashboard.index': [('GET', '/', {}, 2)],
+    'auth.login': [('GET', '/login', {}, 1)],
+    'auth.logout': [('GET', '/logout', {}, 0)],
+    'usuarios.listar_usuarios': [('GET', '/usuarios', {}, 4)],
+    'usuarios.crear_usuario': [('GET', '/usuarios/crear', {}, 1)],
+    'usuarios.asignar_usuario_finca': [('GET', '/usuarios/{jefe_id}/asignar', {}, 3)],
+    'fincas.listar_fincas': [('GET', '/fincas', {}, 3)],
+    'fincas.crear_finca': [('GET', '/fincas/crear', {}, 1)],
+    'areas.listar_areas': [('GET', '/areas', {}, 3)],
+    'areas.crear_area': [('GET', '/areas/crear', {}, 2)],
+    'areas.exportar_areas': [('GET', '/areas/exportar', {}, 1)],
+    'areas.gestionar_asignaciones_areas': [('GET', '/areas/gestionar-asignaciones', {}, 3)],
+    'supervisores.listar_supervisores': [('GET', '/supervisores', {}, 3)],
+    'supervisores.crear_supervisor': [('GET', '/supervisores/crear', {}, 1)],
+    'supervisores.exportar_supervisores': [('GET', '/supervisores/exportar', {}, 1)],
+    'supervisores.asignar_supervisor_area': [
+        ('GET', '/supervisores/asignar-area', {}, 4),
+        ('POST', '/supervisores/asignar-area', {'data': {'supervisor_id': '{supervisor_id}', 'area_id': '{area_id}'}}, 4),
+    ],
+    'supervisores.gestionar_asignaciones_supervisores': [('GET', '/supervisores/gestionar-asignaciones', {}, 3)],
+    'codigos.listar_codigos': [
+        ('GET', '/codigos', {}, 5),
+        ('GET', '/codigos?q={busqueda}', {}, 5),
+    ],
+    'codigos.buscar_codigos_json': [('GET', '/codigos/buscar?q={busqueda}', {}, 1)],
+    'codigos.exportar_codigos': [('GET', '/codigos/exportar?finca_id={finca_id}', {}, 1)],
+    'codigos.crear_codigo': [('GET', '/codigos/crear', {}, 3)],
+    'codigos.importar_codigos_csv': [('GET', '/codigos/importar', {}, 2)],
+    'codigos.asignar_area_codigos': [
+        ('GET', '/codigos/asignar-area', {}, 4),
+        ('POST', '/codigos/asignar-area', {'data': {'area_id': '{area_id}', 'codigos[]': '{codigo_id}'}}, 3),
+    ],
+    'codigos.asignar_codigo_area': [
+        ('GET', '/codigos/asignar-codigo', {}, 4),
+        ('POST', '/codigos/asignar-codigo', {'data': {'codigo_id': '{codigo_id}', 'area_id': '{area_id}'}}, 4),
+    ],
+    'codigos.gestionar_asignaciones_codigos': [('GET', '/codigos/gestionar-asignaciones', {}, 4)],
+    'rendimientos.reporte_rendimientos': [('GET', '/rendimientos/reporte', {}, 6)],
+    'api.registrar_rendimientos_api': [
+        ('POST', '/api/rendimientos', {'headers': {'X-Clave-Acceso': '{clave_acceso}'},
+                                       'json': [{'codigo': '{codigo}', 'fecha': '{hoy}', 'cantidad': 5}]}, 5),
+    ],
+    'api.sincronizar_api': [('GET', '/api/sincronizacion', {'headers': {'X-Clave-Acceso': '{clave_acceso}'}}, 6)],
+    'grid.ver_grid': [('GET', '/grid/codigos', {}, 1)],
+    'grid.datos_grid': [
+        ('GET', '/grid/codigos/datos?draw=1&columns[0][data]=id&columns[1][data]=codigo', {}, 3),
+        ('POST', '/grid/areas/datos', {'data': {'draw': '1', 'columns[0][data]': 'id'}}, 3),
+    ],
+    'trabajos.ver_trabajo': [('GET', '/trabajos/{trabajo_id}', {}, 2)],
+    'trabajos.estado_trabajo_json': [('GET', '/trabajos/{trabajo_id}/estado', {}, 1)],
+    'sistema.estado_pool': [('GET', '/sistema/pool', {}, 0)],
+    'sistema.ver_auditoria': [('GET', '/sistema/auditoria', {}, 2)],
+    'sistema.metricas_prometheus': [('GET', '/metrics', {}, 0)],
+    'sistema.ver_metricas': [('GET', '/sistema/metricas', {}, 1)],
+}
+
+
+def formatear(valor, ids):
+    """Completa los valores entre llaves de una URL u opciones de la petición"""
+    if isinstance(valor, str):
+        return valor.format(**ids)
+    if isinstance(valor, dict):
+        return {clave: formatear(v, ids) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [formatear(v, ids) for v in valor]
+    return valor
+
+
+def endpoints_sin_peticion(app):
+    """Endpoints de la aplicación que no tienen peticiones en PETICIONES"""
+    endpoints = {regla.endpoint for regla in app.url_map.iter_rules() if regla.endpoint != 'static'}
+    return sorted(endpoints - set(PETICIONES))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Script para mantener los consolidados diarios y semanales de rendimiento
+
+Sin opciones suma los registros nuevos desde la última ejecución (pensado
+para ejecutarse cada pocos minutos con cron o el programador de tareas).
+Con --conciliar además reconstruye las semanas donde una ingesta lenta
+confirmó registros por debajo de la marca (ver app/consolidacion.py). Con
+--reconstruir recalcula desde cero las semanas del rango indicado, por
+ejemplo después de corregir registros a mano; puede ejecutarse mientras
+corre la consolidación.
+
+Uso:
+    python consolidar_rendimientos.py
+    python consolidar_rendimientos.py --continuo 300 --conciliar
+    python consolidar_rendimientos.py --reconstruir --desde 2024-01-01 --hasta 2024-03-31
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import create_app
+from app.consolidacion import conciliar, consolidar_pendientes, marca_actual, reconstruir
+
+
+def _fecha(texto):
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{texto} no tiene el formato AAAA-MM-DD')
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Consolida los registros de rendimiento')
+    parser.add_argument('--reconstruir', action='store_true', help='recalcula el rango --desde/--hasta')
+    parser.add_argument('--desde', type=_fecha)
+    parser.add_argument('--hasta', type=_fecha)
+    parser.add_argument('--continuo', type=int, metavar='SEGUNDOS',
+                        help='repite la consolidación cada SEGUNDOS')
+    parser.add_argument('--conciliar', action='store_true',
+                        help='reconstruye las semanas con registros confirmados tarde')
+    args = parser.parse_args()
+
+    if args.reconstruir and not (args.desde and args.hasta):
+        parser.error('--reconstruir requiere --desde y --hasta')
+
+    app = create_app()
+    with app.app_context():
+        if args.reconstruir:
+            inicio = time.perf_counter()
+            desde, hasta = reconstruir(args.desde, args.hasta)
+            print(f"✅ Consolidados recalculados del {desde} al {hasta} "
+                  f"en {time.perf_counter() - inicio:.1f} s")
+            return
+
+        while True:
+            inicio = time.perf_counter()
+            registros = consolidar_pendientes()
+            print(f"✅ {registros} registros consolidados en {time.perf_counter() - inicio:.1f} s "
+                  f"(marca: {marca_actual()})", flush=True)
+            if args.conciliar:
+                semanas = conciliar()
+                if semanas:
+                    print(f"⚠️  Semanas reconstruidas por registros confirmados tarde: "
+                          f"{', '.join(str(semana) for semana in semanas)}", flush=True)
+            if not args.continuo:
+                break
+            time.sleep(args.continuo)
+
+
+if __name__ == "__main__":
+    main()
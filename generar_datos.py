@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos con la forma de la operación real
+
+Llena una base vacía (SQLite o SQL Server) con fincas, áreas por finca,
+supervisores, códigos por área con nombres y teléfonos realistas, una parte
+de códigos sin área y, opcionalmente, meses de registros de rendimiento.
+Con la misma semilla y los mismos volúmenes genera siempre los mismos datos,
+para que los benchmarks y perfiles sean comparables entre ejecuciones.
+
+Inserta por lotes con executemany (fast_executemany en SQL Server). En
+SQLite el índice de búsqueda se reconstruye una sola vez al final en lugar
+de mantenerlo fila por fila con el trigger. Los consolidados de
+rendimiento no se generan; después de --meses ejecutar
+consolidar_rendimientos.py --reconstruir con el rango generado.
+
+Uso:
+    python generar_datos.py --fincas 5 --areas-por-finca 40 --codigos-por-area 50
+    python generar_datos.py --url sqlite:///instance/carga.db --crear-esquema --meses 3
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, insert, select, text
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.busqueda import FTS, _SQLITE_CREAR
+from app.config import config
+from app.models import db, Area, Codigo, Finca, Rendimiento, Supervisor
+from app.motor import opciones_motor
+
+LOTE = 10000
+
+# Frecuencias aproximadas: unos pocos nombres y apellidos se repiten mucho
+NOMBRES = ['José', 'María', 'Luis', 'Ana', 'Carlos', 'Luz', 'Juan', 'Rosa', 'Jorge', 'Carmen', 'Pedro',
+           'Marta', 'Jesús', 'Sandra', 'Manuel', 'Gloria', 'Diego', 'Claudia', 'Andrés', 'Paola', 'Óscar',
+           'Yolanda', 'Fabio', 'Nelly', 'Wilson', 'Deisy', 'Édgar', 'Yésica', 'Hernán', 'Lucero']
+APELLIDOS = ['Rodríguez', 'Gómez', 'González', 'Martínez', 'García', 'López', 'Hernández', 'Sánchez',
+             'Ramírez', 'Pérez', 'Díaz', 'Muñoz', 'Rojas', 'Moreno', 'Jiménez', 'Vargas', 'Castro', 'Gutiérrez',
+             'Ortiz', 'Ruiz', 'Álvarez', 'Suárez', 'Quintero', 'Cárdenas', 'Peña', 'Zapata', 'Ospina', 'Ríos',
+             'Valencia', 'Cifuentes']
+FINCAS = ['La Esperanza', 'El Rosal', 'San José', 'Las Palmas', 'Santa Ana', 'El Recreo', 'La Primavera',
+          'Buenavista', 'El Trébol', 'La Florida', 'Los Alpes', 'San Rafael']
+MUNICIPIOS = ['Facatativá', 'Madrid', 'Funza', 'Mosquera', 'Tocancipá', 'Chía', 'Rionegro', 'La Ceja']
+
+
+def _pesos(cantidad):
+    """Pesos tipo Zipf: el primero es el más frecuente"""
+    return [1 / (i + 1) for i in range(cantidad)]
+
+
+class _Personas:
+    """Nombres, apellidos y teléfonos con la distribución de la nómina"""
+
+    def __init__(self, aleatorio):
+        self.aleatorio = aleatorio
+        self.pesos_nombres = _pesos(len(NOMBRES))
+        self.pesos_apellidos = _pesos(len(APELLIDOS))
+
+    def nombre(self):
+        return self.aleatorio.choices(NOMBRES, self.pesos_nombres)[0]
+
+    def apellido(self):
+        primero, segundo = self.aleatorio.choices(APELLIDOS, self.pesos_apellidos, k=2)
+        # La mitad de las personas se registra con los dos apellidos
+        return f'{primero} {segundo}' if self.aleatorio.random() < 0.5 else primero
+
+    def telefono(self, sin_telefono=0.15):
+        if self.aleatorio.random() < sin_telefono:
+            return ''
+        return f'3{self.aleatorio.randint(0, 2)}{self.aleatorio.randint(0, 9)}{self.aleatorio.randint(0, 9999999):07d}'
+
+
+def _insertar(conn, tabla, filas):
+    """Inserta las filas (iterable) por lotes; devuelve cuántas insertó"""
+    lote, total = [], 0
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == LOTE:
+            conn.execute(insert(tabla), lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        conn.execute(insert(tabla), lote)
+        total += len(lote)
+    return total
+
+
+def generar(engine, fincas=5, areas_por_finca=40, supervisores=None, codigos_por_area=50, sin_area=0.1,
+            meses=0, asistencia=0.8, semilla=42, informar=print):
+    """Genera el conjunto de datos en `engine`; devuelve las filas por tabla
+
+    `codigos_por_area` son los códigos asignados de cada área; además cada
+    finca recibe la fracción `sin_area` de códigos sin área. Sin
+    `supervisores` se crea uno por cada área con supervisor (90 %). Los ids
+    se asignan en orden: fincas, luego áreas finca por finca.
+    """
+    aleatorio = random.Random(semilla)
+    personas = _Personas(aleatorio)
+    ahora = datetime.utcnow()
+    conteo = {}
+
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(Finca.__table__)).scalar():
+            raise ValueError('La base ya tiene fincas: el generador necesita tablas vacías')
+
+    def fase(nombre, funcion):
+        inicio = time.perf_counter()
+        with engine.begin() as conn:
+            conteo[nombre] = funcion(conn)
+        informar(f'  {nombre:<16}{conteo[nombre]:>12,} filas en {time.perf_counter() - inicio:6.1f} s')
+
+    fase('app_finca', lambda conn: _insertar(conn, Finca.__table__, (
+        {'nombre': FINCAS[f % len(FINCAS)] + (f' {f // len(FINCAS) + 1}' if f >= len(FINCAS) else ''),
+         'ubicacion': aleatorio.choice(MUNICIPIOS), 'activa': True}
+        for f in range(fincas))))
+
+    total_areas = fincas * areas_por_finca
+    if supervisores is None:
+        supervisores = round(total_areas * 0.9)
+    fase('app_supervisor', lambda conn: _insertar(conn, Supervisor.__table__, (
+        {'nombre': personas.nombre(), 'apellido': personas.apellido(), 'telefono': personas.telefono(0.05),
+         'email': f'supervisor{s}@agricultura.com' if aleatorio.random() < 0.6 else None,
+         'clave_acceso': f'SUP-{s:06d}', 'activo': aleatorio.random() > 0.03}
+        for s in range(1, supervisores + 1))))
+
+    with engine.connect() as conn:
+        finca_ids = conn.execute(select(Finca.id).order_by(Finca.id)).scalars().all()
+        supervisor_ids = conn.execute(select(Supervisor.id).order_by(Supervisor.id)).scalars().all()
+
+    # Los supervisores se reparten en orden; las áreas restantes quedan sin supervisor
+    def areas(conn):
+        filas = []
+        for f, finca_id in enumerate(finca_ids):
+            for a in range(areas_por_finca):
+                indice = f * areas_por_finca + a
+                filas.append({'nombre': f'Bloque {a + 1}', 'descripcion': f'Bloque {a + 1} de cultivo',
+                              'finca_id': finca_id, 'activa': aleatorio.random() > 0.05,
+                              'supervisor_id': supervisor_ids[indice] if indice < len(supervisor_ids) else None})
+        return _insertar(conn, Area.__table__, filas)
+    fase('app_area', areas)
+
+    with engine.connect() as conn:
+        areas_por_finca_ids = {}
+        for area_id, finca_id in conn.execute(select(Area.id, Area.finca_id).order_by(Area.id)):
+            areas_por_finca_ids.setdefault(finca_id, []).append(area_id)
+
+    def codigos():
+        for finca_id in finca_ids:
+            asignadas = [area_id for area_id in areas_por_finca_ids.get(finca_id, [])
+                         for _ in range(codigos_por_area)]
+            total = round(len(asignadas) / (1 - sin_area)) if sin_area < 1 else len(asignadas)
+            destinos = asignadas + [None] * (total - len(asignadas))
+            aleatorio.shuffle(destinos)
+            ancho = max(4, len(str(total)))
+            for i, area_id in enumerate(destinos, start=1):
+                yield {'codigo': f'{i:0{ancho}d}', 'nombre_persona': personas.nombre(),
+                       'apellido_persona': personas.apellido(), 'telefono': personas.telefono(),
+                       'area_id': area_id, 'finca_id': finca_id, 'activo': aleatorio.random() > 0.03,
+                       'fecha_creacion': ahora, 'fecha_modificacion': ahora}
+
+    def insertar_codigos(conn):
+        # El trigger de FTS5 cuesta más que la inserción misma
+        diferir = conn.dialect.name == 'sqlite' and conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'app_codigo_fts_insertar'")).first()
+        if diferir:
+            conn.execute(text('DROP TRIGGER app_codigo_fts_insertar'))
+        total = _insertar(conn, Codigo.__table__, codigos())
+        if diferir:
+            conn.execute(text(f"INSERT INTO {FTS}({FTS}) VALUES ('rebuild')"))
+            for sentencia in _SQLITE_CREAR:
+                conn.execute(text(sentencia))
+        return total
+    fase('app_codigo', insertar_codigos)
+
+    if meses > 0:
+        with engine.connect() as conn:
+            supervisor_de = dict(conn.execute(select(Area.id, Area.supervisor_id)).all())
+            cosechadores = conn.execute(select(Codigo.id, Codigo.area_id, Codigo.finca_id)
+                                        .where(Codigo.area_id.isnot(None), Codigo.activo == True)
+                                        .order_by(Codigo.id)).all()
+        hasta = date.today() - timedelta(days=1)
+        desde = hasta - timedelta(days=meses * 30 - 1)
+
+        def rendimientos():
+            dia = desde
+            while dia <= hasta:
+                # Los domingos no se cosecha
+                if dia.weekday() != 6:
+                    registro = datetime.combine(dia, datetime.min.time()) + timedelta(hours=18)
+                    for codigo_id, area_id, finca_id in cosechadores:
+                        if aleatorio.random() < asistencia:
+                            yield {'codigo_id': codigo_id, 'area_id': area_id, 'finca_id': finca_id,
+                                   'supervisor_id': supervisor_de.get(area_id), 'fecha': dia,
+                                   'cantidad': round(max(5.0, aleatorio.gauss(150, 40)), 2),
+                                   'unidad': 'tallos', 'fecha_registro': registro}
+                dia += timedelta(days=1)
+        fase('app_rendimiento', lambda conn: _insertar(conn, Rendimiento.__table__, rendimientos()))
+        conteo['rango_rendimientos'] = (desde, hasta)
+
+    return conteo
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos con volúmenes configurables')
+    parser.add_argument('--url', help='URL de SQLAlchemy (por defecto la de la aplicación)')
+    parser.add_argument('--crear-esquema', action='store_true', help='crea las tablas que falten')
+    parser.add_argument('--fincas', type=int, default=5)
+    parser.add_argument('--areas-por-finca', type=int, default=40)
+    parser.add_argument('--supervisores', type=int, help='por defecto uno por cada área con supervisor')
+    parser.add_argument('--codigos-por-area', type=int, default=50)
+    parser.add_argument('--sin-area', type=float, default=0.1, help='fracción de códigos sin área (0.1)')
+    parser.add_argument('--meses', type=int, default=0, help='meses de rendimientos diarios (0: ninguno)')
+    parser.add_argument('--asistencia', type=float, default=0.8,
+                        help='probabilidad de que un código registre cosecha un día hábil')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    if not 0 <= args.sin_area < 1:
+        parser.error('--sin-area debe estar entre 0 y 1 (sin incluir 1)')
+
+    url = args.url or config['default'].SQLALCHEMY_DATABASE_URI
+    engine = create_engine(url, **opciones_motor(url))
+    if args.crear_esquema:
+        db.metadata.create_all(engine)
+
+    print(f"🌱 Generando datos en {engine.url.render_as_string(hide_password=True)} (semilla {args.semilla})")
+    inicio = time.perf_counter()
+    try:
+        conteo = generar(engine, fincas=args.fincas, areas_por_finca=args.areas_por_finca,
+                         supervisores=args.supervisores, codigos_por_area=args.codigos_por_area,
+                         sin_area=args.sin_area, meses=args.meses, asistencia=args.asistencia,
+                         semilla=args.semilla)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        engine.dispose()
+
+    print(f"✅ Datos generados en {time.perf_counter() - inicio:.1f} s")
+    if 'rango_rendimientos' in conteo:
+        desde, hasta = conteo['rango_rendimientos']
+        print(f"   Consolidar: python consolidar_rendimientos.py --reconstruir --desde {desde} --hasta {hasta}")
+
+
+if __name__ == "__main__":
+    main()
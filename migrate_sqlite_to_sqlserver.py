@@ -1,159 +1,245 @@
 #!/usr/bin/env python3
 """
 Script para migrar datos de SQLite a SQL Server
+
+Copia tabla por tabla respetando el orden de las claves foráneas, en bloques
+de filas ordenados por clave primaria e insertados con executemany. Después
+de cada bloque confirmado se actualiza un archivo de checkpoint, así una
+ejecución interrumpida continúa desde el último bloque copiado. Las tablas
+que no dependen entre sí se copian en paralelo.
+
+Uso:
+    python migrate_sqlite_to_sqlserver.py
+    python migrate_sqlite_to_sqlserver.py --origen sqlite:///instance/agricultura.db \\
+        --destino "mssql+pyodbc://..." --lote 5000 --hilos 4
+    python migrate_sqlite_to_sqlserver.py --reiniciar   # ignora el checkpoint anterior
 """
 
-import sys
+import argparse
+import json
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
-
-def migrate_sqlite_to_sqlserver():
-    """Migra datos de SQLite a SQL Server"""
-    
-    print("🔄 Migrando datos de SQLite a SQL Server...")
-    print("=" * 60)
-    
+
+from sqlalchemy import create_engine, func, insert, select, text
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.busqueda import instalar_busqueda
+from app.models import db
+from app.motor import opciones_motor
+from app.paginacion import filtro_keyset
+
+# Tablas de trabajo que no se migran
+EXCLUIDAS = {'app_codigo_staging'}
+
+TAMANO_LOTE = 5000
+CHECKPOINT = Path(__file__).parent / 'instance' / 'migracion_checkpoint.json'
+
+_salida = threading.Lock()
+
+
+def mostrar(mensaje):
+    with _salida:
+        print(mensaje, flush=True)
+
+
+class Checkpoint:
+    """Avance por tabla guardado en un archivo JSON"""
+
+    def __init__(self, ruta, reiniciar=False):
+        self.ruta = Path(ruta)
+        self._lock = threading.Lock()
+        self.tablas = {}
+        if self.ruta.exists() and not reiniciar:
+            self.tablas = json.loads(self.ruta.read_text(encoding='utf-8')).get('tablas', {})
+
+    def estado(self, tabla):
+        return self.tablas.get(tabla, {'ultimo': None, 'copiadas': 0, 'completa': False})
+
+    def guardar(self, tabla, ultimo, copiadas, completa=False):
+        with self._lock:
+            self.tablas[tabla] = {'ultimo': ultimo, 'copiadas': copiadas, 'completa': completa}
+            # Escritura atómica: un corte no deja el archivo a medias
+            temporal = self.ruta.with_suffix('.tmp')
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            temporal.write_text(json.dumps({'tablas': self.tablas}, indent=2, default=str), encoding='utf-8')
+            os.replace(temporal, self.ruta)
+
+
+def niveles_de_tablas(tablas):
+    """Agrupa las tablas en niveles: cada una solo depende de niveles anteriores"""
+    nombres = {t.name for t in tablas}
+    nivel = {}
+    for tabla in tablas:  # sorted_tables ya viene en orden de dependencias
+        padres = [fk.column.table.name for fk in tabla.foreign_keys
+                  if fk.column.table.name in nombres and fk.column.table.name != tabla.name]
+        nivel[tabla.name] = 1 + max((nivel[p] for p in padres), default=-1)
+    agrupadas = {}
+    for tabla in tablas:
+        agrupadas.setdefault(nivel[tabla.name], []).append(tabla)
+    return [agrupadas[n] for n in sorted(agrupadas)]
+
+
+def _formato_tiempo(segundos):
+    minutos, segundos = divmod(int(segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f'{horas:d}:{minutos:02d}:{segundos:02d}'
+
+
+def _usa_identity(destino, tabla):
+    columnas = list(tabla.primary_key.columns)
+    return (destino.dialect.name == 'mssql' and len(columnas) == 1
+            and tabla.autoincrement_column is not None)
+
+
+def _sin_copiadas(conn, tabla, clave, filas):
+    """Descarta las filas del bloque que ya existen en el destino"""
+    desde = [filas[0][c.name] for c in clave]
+    hasta = [filas[-1][c.name] for c in clave]
+    # desde <= clave <= hasta
+    consulta = select(*clave).where(~filtro_keyset(clave, desde, mayor=False),
+                                    ~filtro_keyset(clave, hasta, mayor=True))
+    existentes = {tuple(fila) for fila in conn.execute(consulta)}
+    return [fila for fila in filas if tuple(fila[c.name] for c in clave) not in existentes]
+
+
+def copiar_tabla(origen, destino, tabla, checkpoint, tamano_lote=TAMANO_LOTE):
+    """Copia una tabla por bloques; devuelve las filas copiadas en esta ejecución"""
+    estado = checkpoint.estado(tabla.name)
+    if estado['completa']:
+        mostrar(f'   ⏭️  {tabla.name}: ya copiada ({estado["copiadas"]} filas)')
+        return 0
+
+    clave = list(tabla.primary_key.columns)
+    ultimo = estado['ultimo']
+    copiadas = estado['copiadas']
+
+    with origen.connect() as conn:
+        consulta = select(func.count()).select_from(tabla)
+        if ultimo is not None:
+            consulta = consulta.where(filtro_keyset(clave, ultimo))
+        pendientes = conn.execute(consulta).scalar()
+
+    mostrar(f'   ▶️  {tabla.name}: {pendientes} filas por copiar'
+            + (f' (reanudando tras {copiadas})' if ultimo is not None else ''))
+
+    identity = _usa_identity(destino, tabla)
+    reanudando = ultimo is not None
+    inicio = time.perf_counter()
+    copiadas_ahora = 0
+
+    while True:
+        consulta = select(tabla).order_by(*clave).limit(tamano_lote)
+        if ultimo is not None:
+            consulta = consulta.where(filtro_keyset(clave, ultimo))
+        with origen.connect() as conn:
+            bloque = [dict(fila) for fila in conn.execute(consulta).mappings()]
+        if not bloque:
+            break
+
+        filas = bloque
+
+        with destino.begin() as conn:
+            if reanudando:
+                # El bloque pudo confirmarse justo antes de un corte sin llegar al checkpoint
+                filas = _sin_copiadas(conn, tabla, clave, filas)
+                reanudando = False
+            if identity:
+                conn.execute(text(f'SET IDENTITY_INSERT [{tabla.name}] ON'))
+            if filas:
+                conn.execute(insert(tabla), filas)
+            if identity:
+                conn.execute(text(f'SET IDENTITY_INSERT [{tabla.name}] OFF'))
+
+        ultimo = [bloque[-1][c.name] for c in clave]
+        copiadas += len(filas)
+        copiadas_ahora += len(filas)
+        checkpoint.guardar(tabla.name, ultimo, copiadas)
+
+        transcurrido = time.perf_counter() - inicio
+        velocidad = copiadas_ahora / transcurrido if transcurrido else 0
+        restante = max(pendientes - copiadas_ahora, 0)
+        eta = _formato_tiempo(restante / velocidad) if velocidad else '-'
+        mostrar(f'      {tabla.name}: {copiadas_ahora}/{pendientes} filas '
+                f'({velocidad:,.0f} filas/s, ETA {eta})')
+
+    checkpoint.guardar(tabla.name, ultimo, copiadas, completa=True)
+    mostrar(f'   ✅ {tabla.name}: {copiadas_ahora} filas copiadas en '
+            f'{_formato_tiempo(time.perf_counter() - inicio)}')
+    return copiadas_ahora
+
+
+def migrar(origen_url, destino_url, tamano_lote=TAMANO_LOTE, hilos=4,
+           ruta_checkpoint=CHECKPOINT, reiniciar=False):
+    """Copia todas las tablas del modelo de `origen_url` a `destino_url`"""
+    origen = create_engine(origen_url)
+    destino = create_engine(destino_url, **opciones_motor(destino_url))
+    checkpoint = Checkpoint(ruta_checkpoint, reiniciar=reiniciar)
+
     try:
-        # Importar la aplicación Flask
-        sys.path.append('app')
-        from app import create_app
-        from app.models import db, Usuario, Finca, Area, Supervisor, Codigo
-        from sqlalchemy import create_engine, text
-        
-        app = create_app()
-        
-        with app.app_context():
-            print("✅ Conexión a SQL Server establecida")
-            
-            # Verificar que estamos usando SQL Server
-            print(f"📊 Base de datos actual: {db.engine.url}")
-            
-            if 'sqlite' in str(db.engine.url):
-                print("❌ ERROR: La aplicación aún está usando SQLite")
-                print("🔧 Ejecuta: python switch_database.py --sqlserver")
-                return False
-            
-            # Crear tablas en SQL Server si no existen
-            print("\n🔧 Creando tablas en SQL Server...")
-            db.create_all()
-            print("✅ Tablas creadas/verificadas")
-            
-            # Verificar si ya hay datos en SQL Server
-            usuarios_count = Usuario.query.count()
-            fincas_count = Finca.query.count()
-            
-            print(f"\n📊 Datos actuales en SQL Server:")
-            print(f"   Usuarios: {usuarios_count}")
-            print(f"   Fincas: {fincas_count}")
-            
-            if usuarios_count > 0 or fincas_count > 0:
-                print("⚠️  Ya hay datos en SQL Server")
-                respuesta = input("¿Deseas continuar y agregar más datos? (y/n): ")
-                if respuesta.lower() != 'y':
-                    print("❌ Migración cancelada")
-                    return False
-            
-            # Crear usuario admin si no existe
-            admin_user = Usuario.query.filter_by(username='admin').first()
-            if not admin_user:
-                print("\n👤 Creando usuario admin...")
-                from werkzeug.security import generate_password_hash
-                
-                admin_user = Usuario(
-                    username='admin',
-                    email='admin@tessacorporation.com',
-                    password_hash=generate_password_hash('admin'),
-                    rol='admin',
-                    activo=True,
-                    fecha_creacion=datetime.now()
-                )
-                db.session.add(admin_user)
-                db.session.commit()
-                print("✅ Usuario admin creado")
-            else:
-                print("✅ Usuario admin ya existe")
-            
-            # Crear fincas de ejemplo si no existen
-            fincas_ejemplo = [
-                {
-                    'nombre': 'Tessa 1',
-                    'ubicacion': 'Ubicación Tessa 1',
-                    'descripcion': 'Finca principal Tessa 1',
-                    'activa': True
-                },
-                {
-                    'nombre': 'Tessa 3',
-                    'ubicacion': 'Ubicación Tessa 3',
-                    'descripcion': 'Finca principal Tessa 3',
-                    'activa': True
-                },
-                {
-                    'nombre': 'Positano',
-                    'ubicacion': 'Ubicación Positano',
-                    'descripcion': 'Finca Positano',
-                    'activa': True
-                },
-                {
-                    'nombre': 'Ecuanros 1',
-                    'ubicacion': 'Ubicación Ecuanros 1',
-                    'descripcion': 'Finca Ecuanros 1',
-                    'activa': True
-                }
-            ]
-            
-            print(f"\n🏡 Creando fincas de ejemplo...")
-            for finca_data in fincas_ejemplo:
-                # Verificar si la finca ya existe
-                existing_finca = Finca.query.filter_by(nombre=finca_data['nombre']).first()
-                if not existing_finca:
-                    finca = Finca(
-                        nombre=finca_data['nombre'],
-                        ubicacion=finca_data['ubicacion'],
-                        descripcion=finca_data['descripcion'],
-                        activa=finca_data['activa'],
-                        fecha_creacion=datetime.now()
-                    )
-                    db.session.add(finca)
-                    print(f"   ✅ {finca_data['nombre']} creada")
-                else:
-                    print(f"   ⚠️  {finca_data['nombre']} ya existe")
-            
-            db.session.commit()
-            print("✅ Fincas creadas/verificadas")
-            
-            # Verificar datos finales
-            print(f"\n📊 DATOS FINALES EN SQL SERVER:")
-            usuarios_final = Usuario.query.count()
-            fincas_final = Finca.query.count()
-            areas_final = Area.query.count()
-            supervisores_final = Supervisor.query.count()
-            codigos_final = Codigo.query.count()
-            
-            print(f"   Usuarios: {usuarios_final}")
-            print(f"   Fincas: {fincas_final}")
-            print(f"   Áreas: {areas_final}")
-            print(f"   Supervisores: {supervisores_final}")
-            print(f"   Códigos: {codigos_final}")
-            
-            print(f"\n🎉 ¡Migración completada exitosamente!")
-            return True
-                
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        return False
+        print("\n🔧 Creando tablas en el destino...")
+        db.metadata.create_all(destino)
+        # Si app_codigo ya existía, create_all no instala el índice de búsqueda
+        instalar_busqueda(destino)
+
+        tablas = [t for t in db.metadata.sorted_tables if t.name not in EXCLUIDAS]
+        inicio = time.perf_counter()
+        total = 0
+        for numero, nivel in enumerate(niveles_de_tablas(tablas), start=1):
+            print(f"\n📦 Nivel {numero}: {', '.join(t.name for t in nivel)}")
+            # Las tablas de un mismo nivel no se referencian entre sí
+            with ThreadPoolExecutor(max_workers=max(1, min(hilos, len(nivel)))) as ejecutor:
+                futuros = [ejecutor.submit(copiar_tabla, origen, destino, tabla, checkpoint, tamano_lote)
+                           for tabla in nivel]
+                total += sum(futuro.result() for futuro in futuros)
+
+        print(f"\n📊 DATOS FINALES EN EL DESTINO:")
+        with destino.connect() as conn:
+            for tabla in tablas:
+                cantidad = conn.execute(select(func.count()).select_from(tabla)).scalar()
+                print(f"   {tabla.name}: {cantidad}")
+        print(f"\n⏱️  {total} filas copiadas en {_formato_tiempo(time.perf_counter() - inicio)}")
+        return total
+    finally:
+        origen.dispose()
+        destino.dispose()
+
+
+def _url_sql_server():
+    from app.config_sqlserver import Config
+    return Config.SQLALCHEMY_DATABASE_URI
+
 
 def main():
     """Función principal"""
-    
+    parser = argparse.ArgumentParser(description='Migra los datos de SQLite a SQL Server')
+    parser.add_argument('--origen', default=f"sqlite:///{Path(__file__).parent / 'instance' / 'agricultura.db'}",
+                        help='URL de la base de origen')
+    parser.add_argument('--destino', help='URL de la base de destino (por defecto la de config_sqlserver.py)')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='filas por bloque')
+    parser.add_argument('--hilos', type=int, default=4, help='tablas copiadas en paralelo')
+    parser.add_argument('--checkpoint', default=str(CHECKPOINT), help='archivo de avance')
+    parser.add_argument('--reiniciar', action='store_true', help='ignora el avance guardado')
+    args = parser.parse_args()
+
     print("🚀 Script de migración SQLite → SQL Server")
     print("=" * 70)
-    
-    if migrate_sqlite_to_sqlserver():
-        print("\n✅ ¡Migración exitosa!")
-        print("🚀 Ahora la aplicación usará SQL Server")
-    else:
-        print("\n❌ Error en la migración")
+
+    destino = args.destino or _url_sql_server()
+    try:
+        migrar(args.origen, destino, args.lote, args.hilos, args.checkpoint, args.reiniciar)
+    except Exception as e:
+        print(f"\n❌ Error en la migración: {e}")
+        print(f"🔁 Vuelve a ejecutar el script para continuar desde {args.checkpoint}")
+        sys.exit(1)
+
+    print("\n✅ ¡Migración exitosa!")
+    print("🚀 Ejecuta: python switch_database.py --sqlserver")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Script para cerrar los trabajos en segundo plano que dejó un reinicio
+
+Los trabajos corren en hilos del proceso que los encoló (app/trabajos.py).
+Si el servidor se detiene, los que estaban en curso se marcan fallidos (sus
+cambios ya se revirtieron) y se borra la copia de sus archivos; los
+pendientes se ejecutan aquí, uno por uno. Ejecutarlo al arrancar el
+servicio, antes de levantar los workers: con workers en marcha marcaría
+fallidos trabajos que siguen corriendo.
+
+Uso:
+    python recuperar_trabajos.py
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import create_app
+from app.trabajos import recuperar_trabajos
+
+
+def main():
+    """Función principal"""
+    argparse.ArgumentParser(description='Cierra los trabajos que dejó un reinicio').parse_args()
+
+    app = create_app()
+    with app.app_context():
+        inicio = time.perf_counter()
+        interrumpidos, ejecutados = recuperar_trabajos(app)
+    print(f"✅ {interrumpidos} trabajos interrumpidos marcados como fallidos, "
+          f"{ejecutados} pendientes ejecutados en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ BEGIN
         [descripcion] [ntext] NULL,
         [activa] [bit] NOT NULL DEFAULT 1,
         [fecha_creacion] [datetime] NOT NULL DEFAULT GETDATE(),
+        [fecha_modificacion] [datetime] NULL DEFAULT GETDATE(),
         CONSTRAINT [PK_app_finca] PRIMARY KEY CLUSTERED ([id] ASC)
     )
     PRINT 'Tabla app_finca creada exitosamente'
@@ -43,6 +44,7 @@ BEGIN
         [finca_id] [int] NULL,
         [activo] [bit] NOT NULL DEFAULT 1,
         [fecha_creacion] [datetime] NOT NULL DEFAULT GETDATE(),
+        [fecha_modificacion] [datetime] NULL DEFAULT GETDATE(),
         CONSTRAINT [PK_app_usuario] PRIMARY KEY CLUSTERED ([id] ASC),
         CONSTRAINT [UQ_app_usuario_username] UNIQUE ([username]),
         CONSTRAINT [UQ_app_usuario_email] UNIQUE ([email])
@@ -76,6 +78,7 @@ BEGIN
         [activo] [bit] NOT NULL DEFAULT 1,
         [fecha_creacion] [datetime] NOT NULL DEFAULT GETDATE(),
         [fecha_ultimo_acceso] [datetime] NULL,
+        [fecha_modificacion] [datetime] NULL DEFAULT GETDATE(),
         CONSTRAINT [PK_app_supervisor] PRIMARY KEY CLUSTERED ([id] ASC),
         CONSTRAINT [UQ_app_supervisor_clave] UNIQUE ([clave_acceso])
     )
@@ -100,6 +103,7 @@ BEGIN
         [supervisor_id] [int] NULL,
         [activa] [bit] NOT NULL DEFAULT 1,
         [fecha_creacion] [datetime] NOT NULL DEFAULT GETDATE(),
+        [fecha_modificacion] [datetime] NULL DEFAULT GETDATE(),
         CONSTRAINT [PK_app_area] PRIMARY KEY CLUSTERED ([id] ASC)
     )
     
@@ -135,6 +139,7 @@ BEGIN
         [finca_id] [int] NOT NULL,
         [activo] [bit] NOT NULL DEFAULT 1,
         [fecha_creacion] [datetime] NOT NULL DEFAULT GETDATE(),
+        [fecha_modificacion] [datetime] NULL DEFAULT GETDATE(),
         CONSTRAINT [PK_app_codigo] PRIMARY KEY CLUSTERED ([id] ASC)
     )
     
@@ -160,6 +165,176 @@ BEGIN
 END
 GO
 
+-- =============================================
+-- 5.1 Tabla app_codigo_staging (importación CSV)
+-- =============================================
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='app_codigo_staging' AND xtype='U')
+BEGIN
+    CREATE TABLE [dbo].[app_codigo_staging](
+        [id] [int] IDENTITY(1,1) NOT NULL,
+        [lote] [nvarchar](36) NOT NULL,
+        [fila] [int] NOT NULL,
+        [codigo] [nvarchar](20) NOT NULL,
+        [nombre_persona] [nvarchar](100) NOT NULL,
+        [apellido_persona] [nvarchar](100) NOT NULL,
+        [telefono] [nvarchar](20) NULL,
+        [area_id] [int] NULL,
+        [finca_id] [int] NOT NULL,
+        CONSTRAINT [PK_app_codigo_staging] PRIMARY KEY CLUSTERED ([id] ASC)
+    )
+    
+    CREATE INDEX [ix_app_codigo_staging_lote] ON [dbo].[app_codigo_staging] ([lote])
+    
+    PRINT 'Tabla app_codigo_staging creada exitosamente'
+END
+ELSE
+BEGIN
+    PRINT 'Tabla app_codigo_staging ya existe'
+END
+GO
+
+-- =============================================
+-- 5.2 Tabla app_rendimiento (registros diarios de cosecha)
+-- =============================================
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='app_rendimiento' AND xtype='U')
+BEGIN
+    CREATE TABLE [dbo].[app_rendimiento](
+        [id] [bigint] IDENTITY(1,1) NOT NULL,
+        [codigo_id] [int] NOT NULL,
+        [area_id] [int] NOT NULL,
+        [finca_id] [int] NOT NULL,
+        [supervisor_id] [int] NULL,
+        [fecha] [date] NOT NULL,
+        [cantidad] [numeric](12, 2) NOT NULL,
+        [unidad] [nvarchar](20) NOT NULL,
+        [fecha_registro] [datetime] NULL DEFAULT GETDATE(),
+        CONSTRAINT [PK_app_rendimiento] PRIMARY KEY CLUSTERED ([id] ASC)
+    )
+    
+    -- Foreign Keys
+    ALTER TABLE [dbo].[app_rendimiento] 
+    ADD CONSTRAINT [FK_app_rendimiento_codigo] 
+    FOREIGN KEY([codigo_id]) REFERENCES [dbo].[app_codigo] ([id])
+    
+    ALTER TABLE [dbo].[app_rendimiento] 
+    ADD CONSTRAINT [FK_app_rendimiento_area] 
+    FOREIGN KEY([area_id]) REFERENCES [dbo].[app_area] ([id])
+    
+    ALTER TABLE [dbo].[app_rendimiento] 
+    ADD CONSTRAINT [FK_app_rendimiento_finca] 
+    FOREIGN KEY([finca_id]) REFERENCES [dbo].[app_finca] ([id])
+    
+    ALTER TABLE [dbo].[app_rendimiento] 
+    ADD CONSTRAINT [FK_app_rendimiento_supervisor] 
+    FOREIGN KEY([supervisor_id]) REFERENCES [dbo].[app_supervisor] ([id])
+    
+    -- Consultas por día y área, historial por área y por trabajador
+    CREATE INDEX [IX_app_rendimiento_finca_fecha_area] ON [dbo].[app_rendimiento] ([finca_id], [fecha], [area_id])
+    CREATE INDEX [IX_app_rendimiento_area_fecha] ON [dbo].[app_rendimiento] ([area_id], [fecha])
+    CREATE INDEX [IX_app_rendimiento_codigo_fecha] ON [dbo].[app_rendimiento] ([codigo_id], [fecha])
+    
+    PRINT 'Tabla app_rendimiento creada exitosamente'
+END
+ELSE
+BEGIN
+    PRINT 'Tabla app_rendimiento ya existe'
+END
+GO
+
+-- =============================================
+-- 5.3 Consolidados de rendimiento (consolidar_rendimientos.py)
+-- =============================================
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='app_rendimiento_diario' AND xtype='U')
+BEGIN
+    CREATE TABLE [dbo].[app_rendimiento_diario](
+        [finca_id] [int] NOT NULL,
+        [fecha] [date] NOT NULL,
+        [area_id] [int] NOT NULL,
+        [unidad] [nvarchar](20) NOT NULL,
+        [cantidad] [numeric](14, 2) NOT NULL DEFAULT 0,
+        [registros] [int] NOT NULL DEFAULT 0,
+        CONSTRAINT [PK_app_rendimiento_diario] PRIMARY KEY CLUSTERED ([finca_id], [fecha], [area_id], [unidad]),
+        CONSTRAINT [FK_app_rendimiento_diario_finca] FOREIGN KEY([finca_id]) REFERENCES [dbo].[app_finca] ([id]),
+        CONSTRAINT [FK_app_rendimiento_diario_area] FOREIGN KEY([area_id]) REFERENCES [dbo].[app_area] ([id])
+    )
+    PRINT 'Tabla app_rendimiento_diario creada exitosamente'
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='app_rendimiento_semanal' AND xtype='U')
+BEGIN
+    CREATE TABLE [dbo].[app_rendimiento_semanal](
+        [finca_id] [int] NOT NULL,
+        [semana] [date] NOT NULL,
+        [unidad] [nvarchar](20) NOT NULL,
+        [cantidad] [numeric](14, 2) NOT NULL DEFAULT 0,
+        [registros] [int] NOT NULL DEFAULT 0,
+        CONSTRAINT [PK_app_rendimiento_semanal] PRIMARY KEY CLUSTERED ([finca_id], [semana], [unidad]),
+        CONSTRAINT [FK_app_rendimiento_semanal_finca] FOREIGN KEY([finca_id]) REFERENCES [dbo].[app_finca] ([id])
+    )
+    PRINT 'Tabla app_rendimiento_semanal creada exitosamente'
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='app_consolidacion' AND xtype='U')
+BEGIN
+    CREATE TABLE [dbo].[app_consolidacion](
+        [nombre] [nvarchar](50) NOT NULL,
+        [ultimo_id] [bigint] NOT NULL DEFAULT 0,
+        [fecha_actualizacion] [datetime] NULL,
+        CONSTRAINT [PK_app_consolidacion] PRIMARY KEY CLUSTERED ([nombre])
+    )
+    PRINT 'Tabla app_consolidacion creada exitosamente'
+END
+GO
+
+-- =============================================
+-- 5.4 Tabla app_trabajo (operaciones masivas en segundo plano)
+-- =============================================
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='app_trabajo' AND xtype='U')
+BEGIN
+    CREATE TABLE [dbo].[app_trabajo](
+        [id] [int] IDENTITY(1,1) NOT NULL,
+        [tipo] [nvarchar](50) NOT NULL,
+        [estado] [nvarchar](20) NOT NULL DEFAULT 'pendiente',
+        [usuario_id] [int] NULL,
+        [parametros] [nvarchar](max) NULL,
+        [progreso] [int] NOT NULL DEFAULT 0,
+        [total] [int] NULL,
+        [resultado] [nvarchar](max) NULL,
+        [error] [nvarchar](max) NULL,
+        [fecha_creacion] [datetime] NULL DEFAULT GETDATE(),
+        [fecha_inicio] [datetime] NULL,
+        [fecha_fin] [datetime] NULL,
+        CONSTRAINT [PK_app_trabajo] PRIMARY KEY CLUSTERED ([id] ASC),
+        CONSTRAINT [FK_app_trabajo_usuario] FOREIGN KEY([usuario_id]) REFERENCES [dbo].[app_usuario] ([id])
+    )
+    CREATE INDEX [IX_app_trabajo_usuario_fecha] ON [dbo].[app_trabajo] ([usuario_id], [fecha_creacion])
+    PRINT 'Tabla app_trabajo creada exitosamente'
+END
+GO
+
+-- =============================================
+-- 5.5 Tabla app_auditoria (historial de cambios de los datos maestros)
+-- =============================================
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='app_auditoria' AND xtype='U')
+BEGIN
+    CREATE TABLE [dbo].[app_auditoria](
+        [id] [bigint] IDENTITY(1,1) NOT NULL,
+        [tabla] [nvarchar](50) NOT NULL,
+        [registro_id] [int] NULL,
+        [accion] [nvarchar](20) NOT NULL,
+        [usuario_id] [int] NULL,
+        [cambios] [nvarchar](max) NULL,
+        [fecha] [datetime] NOT NULL DEFAULT GETDATE(),
+        CONSTRAINT [PK_app_auditoria] PRIMARY KEY CLUSTERED ([id] ASC)
+    )
+    CREATE INDEX [IX_app_auditoria_entidad] ON [dbo].[app_auditoria] ([tabla], [registro_id], [id])
+    CREATE INDEX [IX_app_auditoria_usuario] ON [dbo].[app_auditoria] ([usuario_id], [id])
+    PRINT 'Tabla app_auditoria creada exitosamente'
+END
+GO
+
 -- =============================================
 -- 6. Insertar datos iniciales
 -- =============================================
@@ -199,9 +374,10 @@ BEGIN
 END
 
 -- Índices para app_area
-IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_area_finca_id')
+-- Áreas activas de una finca (reemplaza a IX_app_area_finca_id)
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_area_finca_activa')
 BEGIN
-    CREATE INDEX [IX_app_area_finca_id] ON [dbo].[app_area] ([finca_id])
+    CREATE INDEX [IX_app_area_finca_activa] ON [dbo].[app_area] ([finca_id], [activa])
 END
 
 IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_area_supervisor_id')
@@ -215,9 +391,52 @@ BEGIN
     CREATE INDEX [IX_app_codigo_area_id] ON [dbo].[app_codigo] ([area_id])
 END
 
-IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_codigo_finca_id')
+-- Filtros del listado y de las asignaciones (reemplaza a IX_app_codigo_finca_id)
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_codigo_finca_area_activo')
+BEGIN
+    CREATE INDEX [IX_app_codigo_finca_area_activo] ON [dbo].[app_codigo] ([finca_id], [area_id], [activo], [codigo])
+END
+
+-- Orden del listado paginado por finca y código
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_codigo_finca_codigo')
+BEGIN
+    CREATE INDEX [IX_app_codigo_finca_codigo] ON [dbo].[app_codigo] ([finca_id], [codigo])
+END
+
+-- Sincronización de la aplicación móvil y versión de los listados: cambios
+-- por fecha de modificación. En bases creadas antes de la columna se agrega
+-- y se rellena con la fecha de creación (también lo hace actualizar_esquema.py).
+IF COL_LENGTH('dbo.app_finca', 'fecha_modificacion') IS NULL
+    ALTER TABLE [dbo].[app_finca] ADD [fecha_modificacion] [datetime] NULL
+IF COL_LENGTH('dbo.app_usuario', 'fecha_modificacion') IS NULL
+    ALTER TABLE [dbo].[app_usuario] ADD [fecha_modificacion] [datetime] NULL
+IF COL_LENGTH('dbo.app_area', 'fecha_modificacion') IS NULL
+    ALTER TABLE [dbo].[app_area] ADD [fecha_modificacion] [datetime] NULL
+IF COL_LENGTH('dbo.app_codigo', 'fecha_modificacion') IS NULL
+    ALTER TABLE [dbo].[app_codigo] ADD [fecha_modificacion] [datetime] NULL
+IF COL_LENGTH('dbo.app_supervisor', 'fecha_modificacion') IS NULL
+    ALTER TABLE [dbo].[app_supervisor] ADD [fecha_modificacion] [datetime] NULL
+GO
+
+UPDATE [dbo].[app_finca] SET [fecha_modificacion] = [fecha_creacion] WHERE [fecha_modificacion] IS NULL
+UPDATE [dbo].[app_usuario] SET [fecha_modificacion] = [fecha_creacion] WHERE [fecha_modificacion] IS NULL
+UPDATE [dbo].[app_area] SET [fecha_modificacion] = [fecha_creacion] WHERE [fecha_modificacion] IS NULL
+UPDATE [dbo].[app_codigo] SET [fecha_modificacion] = [fecha_creacion] WHERE [fecha_modificacion] IS NULL
+UPDATE [dbo].[app_supervisor] SET [fecha_modificacion] = [fecha_creacion] WHERE [fecha_modificacion] IS NULL
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_area_finca_modificacion')
+BEGIN
+    CREATE INDEX [IX_app_area_finca_modificacion] ON [dbo].[app_area] ([finca_id], [fecha_modificacion], [id])
+END
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_codigo_finca_modificacion')
+BEGIN
+    CREATE INDEX [IX_app_codigo_finca_modificacion] ON [dbo].[app_codigo] ([finca_id], [fecha_modificacion], [id])
+END
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_app_supervisor_modificacion')
 BEGIN
-    CREATE INDEX [IX_app_codigo_finca_id] ON [dbo].[app_codigo] ([finca_id])
+    CREATE INDEX [IX_app_supervisor_modificacion] ON [dbo].[app_supervisor] ([fecha_modificacion], [id])
 END
 
 PRINT 'Índices creados exitosamente'
@@ -0,0 +1,76 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+# La configuración lee DATABASE_URL al importarse: las pruebas usan SQLite en memoria
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app
+from app.models import db, Usuario, Finca
+from app import fragmentos, principal, resumen
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    # SQLite en memoria comparte una sola conexión: sin hilo de auditoría
+    app.config['AUDITORIA_ASINCRONA'] = False
+    principal._cache.invalidar()
+    resumen._cache.invalidar()
+    fragmentos._cache.invalidar()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def finca(app):
+    finca = Finca(nombre='Finca Prueba', ubicacion='Ubicación de prueba')
+    db.session.add(finca)
+    db.session.commit()
+    return finca
+
+
+@pytest.fixture
+def admin(app):
+    usuario = Usuario(username='admin', email='admin@agricultura.com', rol='admin')
+    usuario.set_password('admin123')
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+@pytest.fixture
+def iniciar_sesion(client):
+    def iniciar(usuario):
+        with client.session_transaction() as sesion:
+            sesion['user_id'] = usuario.id
+            sesion['username'] = usuario.username
+            sesion['rol'] = usuario.rol
+    return iniciar
+
+
+@pytest.fixture
+def contador_consultas(app):
+    """Registra las sentencias SQL emitidas mientras está activo"""
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', registrar)
+    yield sentencias
+    event.remove(engine, 'before_cursor_execute', registrar)
@@ -0,0 +1,73 @@
+import pytest
+
+from app.models import db, Area, Codigo, Supervisor, Usuario
+
+PAGINAS = [
+    '/areas/gestionar-asignaciones',
+    '/codigos/gestionar-asignaciones',
+    '/supervisores/gestionar-asignaciones',
+]
+
+
+def crear_areas(finca_id, cantidad, inicio=0):
+    for i in range(inicio, inicio + cantidad):
+        supervisor = Supervisor(nombre=f'Supervisor {i}', apellido='Prueba', clave_acceso=f'clave-{i}')
+        area = Area(nombre=f'Área {i}', finca_id=finca_id, supervisor=supervisor)
+        db.session.add(area)
+        db.session.flush()
+        for j in range(3):
+            db.session.add(Codigo(codigo=f'{i:03d}{j}', nombre_persona=f'Persona {j}',
+                                  apellido_persona='Cosechador', area_id=area.id, finca_id=finca_id))
+    db.session.commit()
+
+
+def consultas_de(client, contador, url):
+    # Primera petición para que las cachés del proceso no alteren el conteo
+    client.get(url)
+    db.session.expunge_all()
+    contador.clear()
+    respuesta = client.get(url)
+    assert respuesta.status_code == 200
+    return len(contador)
+
+
+@pytest.mark.parametrize('url', PAGINAS)
+def test_consultas_constantes_para_admin(client, admin, finca, iniciar_sesion, contador_consultas, url):
+    finca_id = finca.id
+    iniciar_sesion(admin)
+    crear_areas(finca_id, 2)
+    pocas = consultas_de(client, contador_consultas, url)
+
+    crear_areas(finca_id, 10, inicio=2)
+    muchas = consultas_de(client, contador_consultas, url)
+
+    assert muchas == pocas
+
+
+@pytest.mark.parametrize('url', PAGINAS)
+def test_consultas_constantes_para_jefe_de_finca(client, finca, iniciar_sesion, contador_consultas, url):
+    jefe = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=finca.id)
+    jefe.set_password('jefe123')
+    db.session.add(jefe)
+    db.session.commit()
+    finca_id = finca.id
+    iniciar_sesion(jefe)
+
+    crear_areas(finca_id, 1)
+    pocas = consultas_de(client, contador_consultas, url)
+
+    crear_areas(finca_id, 8, inicio=1)
+    muchas = consultas_de(client, contador_consultas, url)
+
+    assert muchas == pocas
+
+
+def test_gestionar_areas_muestra_supervisor_y_codigos(client, admin, finca, iniciar_sesion):
+    finca_id = finca.id
+    iniciar_sesion(admin)
+    crear_areas(finca_id, 2)
+
+    html = client.get('/areas/gestionar-asignaciones').get_data(as_text=True)
+
+    assert 'Supervisor 1 Prueba' in html
+    assert '3 códigos' in html
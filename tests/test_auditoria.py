@@ -0,0 +1,115 @@
+import json
+
+from sqlalchemy import update
+
+from app import auditoria
+from app.models import db, Area, Auditoria, Codigo, Finca, Supervisor
+
+
+def _datos(finca):
+    supervisor = Supervisor(nombre='Ana', apellido='Paz', clave_acceso='SUP-1')
+    areas = [Area(nombre=f'Bloque {i}', finca_id=finca.id) for i in (1, 2)]
+    db.session.add_all([supervisor, *areas])
+    db.session.flush()
+    codigo = Codigo(codigo='001', nombre_persona='Luis', apellido_persona='Paz', finca_id=finca.id,
+                    area_id=areas[0].id)
+    db.session.add(codigo)
+    db.session.commit()
+    return supervisor, areas, codigo
+
+
+def test_reasignaciones_quedan_registradas_con_usuario_y_valores(client, finca, admin, iniciar_sesion):
+    supervisor, areas, codigo = _datos(finca)
+    iniciar_sesion(admin)
+
+    client.post('/codigos/asignar-codigo', data={'codigo_id': codigo.id, 'area_id': areas[1].id})
+    client.post('/supervisores/asignar-area', data={'supervisor_id': supervisor.id, 'area_id': areas[1].id})
+
+    movimiento = Auditoria.query.filter_by(tabla='app_codigo', registro_id=codigo.id, accion='actualizar').one()
+    assert movimiento.usuario_id == admin.id
+    assert json.loads(movimiento.cambios) == {'area_id': [areas[0].id, areas[1].id]}
+    asignacion = Auditoria.query.filter_by(tabla='app_area', registro_id=areas[1].id, accion='actualizar').one()
+    assert json.loads(asignacion.cambios) == {'supervisor_id': [None, supervisor.id]}
+
+    # Las altas guardan los valores iniciales, sin secretos
+    alta = Auditoria.query.filter_by(tabla='app_supervisor', accion='insertar').one()
+    cambios = json.loads(alta.cambios)
+    assert cambios['nombre'] == [None, 'Ana'] and cambios['clave_acceso'] == [None, '***']
+    assert alta.usuario_id is None
+
+
+def test_rollback_y_columnas_ignoradas_no_se_registran(finca):
+    supervisor, areas, codigo = _datos(finca)
+    antes = Auditoria.query.count()
+
+    codigo.nombre_persona = 'Pedro'
+    db.session.flush()
+    db.session.rollback()
+    db.session.execute(update(Supervisor.__table__).where(Supervisor.id == supervisor.id)
+                       .values(fecha_ultimo_acceso=db.func.now()))
+    db.session.commit()
+    assert Auditoria.query.count() == antes
+
+
+def test_escritor_en_segundo_plano_escribe_en_lotes_despues_del_commit(app, finca):
+    supervisor, areas, codigo = _datos(finca)
+    app.config['AUDITORIA_ASINCRONA'] = True
+    antes = Auditoria.query.count()
+
+    codigo.telefono = '555'
+    db.session.execute(update(Codigo.__table__).where(Codigo.finca_id == finca.id).values(activo=False))
+    db.session.commit()
+    auditoria.vaciar()
+
+    nuevos = Auditoria.query.filter(Auditoria.id > antes).order_by(Auditoria.id).all()
+    # El UPDATE masivo provoca el flush del cambio pendiente antes de ejecutarse
+    assert [(fila.accion, fila.registro_id) for fila in nuevos] == [('actualizar', codigo.id), ('actualizar', codigo.id)]
+    assert json.loads(nuevos[0].cambios) == {'telefono': [None, '555']}
+    assert json.loads(nuevos[1].cambios) == {'activo': [True, False]}
+
+
+def test_reasignacion_masiva_deja_historial_por_codigo(client, finca, admin, iniciar_sesion):
+    supervisor, areas, codigo = _datos(finca)
+    otra = Finca(nombre='Otra finca')
+    db.session.add(otra)
+    db.session.flush()
+    otros = [Codigo(codigo=f'00{i}', nombre_persona='Ana', apellido_persona='Paz', finca_id=finca.id)
+             for i in (2, 3)]
+    ajeno = Codigo(codigo='900', nombre_persona='Eva', apellido_persona='Paz', finca_id=otra.id)
+    ya_asignado = Codigo(codigo='004', nombre_persona='Leo', apellido_persona='Paz', finca_id=finca.id,
+                         area_id=areas[1].id)
+    db.session.add_all([*otros, ajeno, ya_asignado])
+    db.session.commit()
+    antes = Auditoria.query.count()
+    iniciar_sesion(admin)
+
+    ids = [codigo.id, *(c.id for c in otros), ajeno.id, ya_asignado.id]
+    client.post('/codigos/asignar-area', data={'area_id': areas[1].id, 'codigos[]': [str(i) for i in ids]})
+
+    # Una fila por código movido, con el área anterior; ni el de otra finca
+    # (el UPDATE lo omite) ni el que ya estaba en el área
+    nuevos = Auditoria.query.filter(Auditoria.id > antes).order_by(Auditoria.registro_id).all()
+    assert [(fila.tabla, fila.registro_id, fila.accion, fila.usuario_id) for fila in nuevos] == \
+        [('app_codigo', c.id, 'actualizar', admin.id) for c in (codigo, *otros)]
+    assert [json.loads(fila.cambios) for fila in nuevos] == [
+        {'area_id': [areas[0].id, areas[1].id]}, {'area_id': [None, areas[1].id]}, {'area_id': [None, areas[1].id]}]
+
+    html = client.get('/sistema/auditoria', query_string={'tabla': 'app_codigo', 'registro_id': codigo.id})
+    texto = html.get_data(as_text=True)
+    # Alta y el movimiento masivo
+    assert texto.count(f'codigo #{codigo.id}') == 2 and '<td>actualizar</td>' in texto
+
+
+def test_vista_filtra_por_entidad_y_usuario(client, finca, admin, iniciar_sesion):
+    supervisor, areas, codigo = _datos(finca)
+    iniciar_sesion(admin)
+    for area in (areas[1], areas[0]):
+        client.post('/codigos/asignar-codigo', data={'codigo_id': codigo.id, 'area_id': area.id})
+
+    html = client.get('/sistema/auditoria', query_string={'tabla': 'app_codigo', 'registro_id': codigo.id})
+    texto = html.get_data(as_text=True)
+    # Alta y los dos movimientos, sin las filas de las áreas
+    assert texto.count(f'codigo #{codigo.id}') == 3 and 'area #' not in texto
+
+    por_usuario = client.get('/sistema/auditoria', query_string={'usuario_id': admin.id}).get_data(as_text=True)
+    assert por_usuario.count('<td>actualizar</td>') == 2 and 'admin' in por_usuario
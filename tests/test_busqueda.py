@@ -0,0 +1,78 @@
+from app.busqueda import buscar_codigos, terminos
+from app.models import db, Codigo, Finca, Usuario
+from app.operaciones_masivas import crear_rango_codigos
+
+
+def _codigos(finca_id, otra_id):
+    db.session.add_all([
+        Codigo(codigo='0101', nombre_persona='José', apellido_persona='Pérez-Luna', telefono='0991234567',
+               finca_id=finca_id),
+        Codigo(codigo='0102', nombre_persona='Josefina', apellido_persona='Andrade', finca_id=finca_id),
+        Codigo(codigo='0103', nombre_persona='María', apellido_persona='Pérez', finca_id=otra_id),
+    ])
+    db.session.commit()
+
+
+def test_terminos_descarta_sintaxis():
+    assert terminos('"jo*" OR pé-rez_%') == ['jo', 'OR', 'pé', 'rez']
+
+
+def test_busqueda_por_prefijo_sin_tildes_y_por_finca(app, finca):
+    otra = Finca(nombre='Otra')
+    db.session.add(otra)
+    db.session.commit()
+    _codigos(finca.id, otra.id)
+
+    assert {r['codigo'] for r in buscar_codigos('jose')} == {'0101', '0102'}
+    assert [r['codigo'] for r in buscar_codigos('jose perez')] == ['0101']
+    assert [r['codigo'] for r in buscar_codigos('luna')] == ['0101']
+    assert [r['codigo'] for r in buscar_codigos('099123')] == ['0101']
+    assert {r['codigo'] for r in buscar_codigos('perez')} == {'0101', '0103'}
+    assert [r['codigo'] for r in buscar_codigos('perez', finca_id=otra.id)] == ['0103']
+    assert buscar_codigos('j') == []
+
+
+def test_indice_sigue_inserciones_masivas_y_cambios(app, finca):
+    finca_id = finca.id
+    crear_rango_codigos(finca_id, 1, 30)
+    db.session.commit()
+    assert len(buscar_codigos('Persona', finca_id=finca_id, limite=100)) == 30
+
+    codigo = Codigo.query.filter_by(codigo='007').one()
+    codigo.apellido_persona = 'Zambrano'
+    db.session.commit()
+    assert [r['codigo'] for r in buscar_codigos('zamb')] == ['007']
+
+    db.session.delete(codigo)
+    db.session.commit()
+    assert buscar_codigos('zamb') == []
+
+
+def test_endpoint_limitado_a_la_finca_del_usuario(client, finca, iniciar_sesion):
+    otra = Finca(nombre='Otra')
+    db.session.add(otra)
+    db.session.commit()
+    _codigos(finca.id, otra.id)
+    usuario = Usuario(username='rrhh', email='rrhh@agricultura.com', rol='rrhh', finca_id=finca.id)
+    usuario.set_password('clave')
+    db.session.add(usuario)
+    db.session.commit()
+    iniciar_sesion(usuario)
+
+    datos = client.get('/codigos/buscar?q=perez&finca_id=%d' % otra.id).get_json()
+
+    assert [r['codigo'] for r in datos['resultados']] == ['0101']
+    assert datos['resultados'][0]['url'] == '/codigos?q=0101'
+
+
+def test_listado_filtra_por_busqueda(client, admin, finca, iniciar_sesion):
+    otra = Finca(nombre='Otra')
+    db.session.add(otra)
+    db.session.commit()
+    _codigos(finca.id, otra.id)
+    iniciar_sesion(admin)
+
+    html = client.get('/codigos?q=jose').get_data(as_text=True)
+
+    assert 'Josefina' in html and 'Pérez-Luna' in html
+    assert 'María' not in html
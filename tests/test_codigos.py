@@ -0,0 +1,54 @@
+from app.models import db, Area, Codigo, Finca
+
+
+def test_crear_rango_omite_existentes(client, admin, finca, iniciar_sesion):
+    finca_id = finca.id
+    db.session.add(Codigo(codigo='003', nombre_persona='Ana', apellido_persona='Pérez', finca_id=finca_id))
+    db.session.commit()
+    iniciar_sesion(admin)
+
+    respuesta = client.post('/codigos/crear', data={'rango_codigos': '001-010', 'finca_id': finca_id, 'area_id': ''},
+                            follow_redirects=True)
+
+    assert '9 códigos creados exitosamente (1 códigos ya existían y fueron omitidos)' in respuesta.get_data(as_text=True)
+    codigos = Codigo.query.filter_by(finca_id=finca_id).order_by(Codigo.codigo).all()
+    assert [c.codigo for c in codigos] == [f'{i:03d}' for i in range(1, 11)]
+    assert codigos[0].nombre_persona == 'Persona 001'
+    assert codigos[0].activo is True and codigos[0].fecha_creacion is not None
+
+
+def test_crear_rango_no_consulta_por_codigo(client, admin, finca, iniciar_sesion, contador_consultas):
+    finca_id = finca.id
+    iniciar_sesion(admin)
+
+    client.post('/codigos/crear', data={'rango_codigos': '001-500', 'finca_id': finca_id, 'area_id': ''})
+
+    assert Codigo.query.filter_by(finca_id=finca_id).count() == 500
+    consultas_codigo = [s for s in contador_consultas if 'app_codigo' in s]
+    assert len(consultas_codigo) <= 3
+
+
+def test_asignar_area_masivo_omite_codigos_de_otra_finca(client, admin, finca, iniciar_sesion, contador_consultas):
+    otra = Finca(nombre='Otra Finca')
+    db.session.add(otra)
+    db.session.flush()
+    area = Area(nombre='Área 1', finca_id=finca.id)
+    db.session.add(area)
+    propios = [Codigo(codigo=f'{i:03d}', nombre_persona='P', apellido_persona='C', finca_id=finca.id) for i in range(5)]
+    ajeno = Codigo(codigo='001', nombre_persona='P', apellido_persona='C', finca_id=otra.id)
+    db.session.add_all(propios + [ajeno])
+    db.session.commit()
+    area_id = area.id
+    ids = [str(c.id) for c in propios + [ajeno]]
+    iniciar_sesion(admin)
+    contador_consultas.clear()
+
+    respuesta = client.post('/codigos/asignar-area', data={'area_id': area_id, 'codigos[]': ids},
+                            follow_redirects=True)
+
+    html = respuesta.get_data(as_text=True)
+    assert '5 códigos asignados al área seleccionada (1 códigos omitidos' in html
+    assert len([s for s in contador_consultas if s.startswith('UPDATE app_codigo')]) == 1
+    db.session.expire_all()
+    assert Codigo.query.filter_by(area_id=area_id).count() == 5
+    assert db.session.get(Codigo, ajeno.id).area_id is None
@@ -0,0 +1,193 @@
+import re
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event, func, insert, select, update
+
+from app import create_app
+from app.config import config
+
+from app.consolidacion import conciliar, consolidar_pendientes, marca_actual, reconstruir
+from app.models import db, Area, Codigo, Finca, Rendimiento, RendimientoDiario, RendimientoSemanal
+
+LUNES = date(2024, 6, 3)
+
+
+def _preparar(finca):
+    areas = [Area(nombre=f'Bloque {i}', finca_id=finca.id) for i in (1, 2)]
+    db.session.add_all(areas)
+    db.session.flush()
+    codigo = Codigo(codigo='001', nombre_persona='P', apellido_persona='C', finca_id=finca.id)
+    db.session.add(codigo)
+    db.session.commit()
+    return codigo.id, [area.id for area in areas]
+
+
+def _registrar(finca_id, codigo_id, area_ids, dias, hace=timedelta(hours=1)):
+    registro = datetime.utcnow() - hace
+    db.session.execute(insert(Rendimiento.__table__), [
+        {'codigo_id': codigo_id, 'area_id': area_id, 'finca_id': finca_id, 'fecha': LUNES + timedelta(days=dia),
+         'cantidad': Decimal('10.25'), 'unidad': 'tallos', 'fecha_registro': registro}
+        for dia in dias for area_id in area_ids])
+    db.session.commit()
+
+
+def _diario():
+    return {(fila.fecha, fila.area_id): (fila.cantidad, fila.registros)
+            for fila in RendimientoDiario.query.all()}
+
+
+def _esperado():
+    consulta = (select(Rendimiento.fecha, Rendimiento.area_id, func.sum(Rendimiento.cantidad), func.count())
+                .group_by(Rendimiento.fecha, Rendimiento.area_id))
+    return {(f, a): (Decimal(str(c)).quantize(Decimal('0.01')), r) for f, a, c, r in db.session.execute(consulta)}
+
+
+def test_consolidacion_incremental_por_marca_de_agua(app, finca):
+    finca_id = finca.id
+    codigo_id, area_ids = _preparar(finca)
+    _registrar(finca_id, codigo_id, area_ids, dias=[0, 1, 8])
+
+    assert consolidar_pendientes(tamano_tramo=4) == 6
+    assert _diario() == _esperado()
+
+    # Solo se suman los registros nuevos, sobre filas existentes y nuevas
+    _registrar(finca_id, codigo_id, area_ids, dias=[1, 2])
+    assert consolidar_pendientes() == 4
+    assert consolidar_pendientes() == 0
+    assert _diario() == _esperado()
+    assert _diario()[(LUNES + timedelta(days=1), area_ids[0])] == (Decimal('20.50'), 2)
+
+    semanas = {(s.semana, s.registros): s.cantidad for s in RendimientoSemanal.query.all()}
+    assert semanas == {(LUNES, 8): Decimal('82.00'), (LUNES + timedelta(days=7), 2): Decimal('20.50')}
+
+
+def test_registros_recientes_esperan_el_margen(app, finca):
+    finca_id = finca.id
+    codigo_id, area_ids = _preparar(finca)
+    _registrar(finca_id, codigo_id, area_ids, dias=[0])
+    _registrar(finca_id, codigo_id, area_ids, dias=[1], hace=timedelta(0))
+
+    assert consolidar_pendientes() == 2
+    assert marca_actual() == 2
+    assert consolidar_pendientes(margen=timedelta(0)) == 2
+
+
+def test_reconstruir_corrige_un_rango(app, finca):
+    finca_id = finca.id
+    codigo_id, area_ids = _preparar(finca)
+    _registrar(finca_id, codigo_id, area_ids, dias=[0, 3, 9])
+    consolidar_pendientes()
+
+    # Corrección manual de un registro ya consolidado
+    db.session.execute(update(Rendimiento.__table__).where(Rendimiento.id == 1).values(cantidad=Decimal('99')))
+    db.session.commit()
+    assert _diario() != _esperado()
+
+    assert reconstruir(LUNES + timedelta(days=2), LUNES + timedelta(days=3)) == (LUNES, LUNES + timedelta(days=6))
+    assert _diario() == _esperado()
+    semanal = db.session.get(RendimientoSemanal, (finca_id, LUNES, 'tallos'))
+    assert semanal.cantidad == Decimal('99') + Decimal('10.25') * 3
+
+
+def test_reporte_lee_solo_consolidados(client, admin, finca, iniciar_sesion, contador_consultas):
+    finca_id = finca.id
+    codigo_id, area_ids = _preparar(finca)
+    _registrar(finca_id, codigo_id, area_ids, dias=[0, 1])
+    consolidar_pendientes()
+    iniciar_sesion(admin)
+    contador_consultas.clear()
+
+    respuesta = client.get(f'/rendimientos/reporte?finca_id={finca_id}&desde={LUNES}&hasta={LUNES + timedelta(days=6)}')
+
+    html = respuesta.get_data(as_text=True)
+    assert respuesta.status_code == 200
+    assert 'Bloque 2' in html and '41.00' in html
+    assert not [s for s in contador_consultas if re.search(r'\bapp_rendimiento\b', s)]
+
+
+def test_conciliar_recupera_registros_confirmados_por_debajo_de_la_marca(app, finca):
+    finca_id = finca.id
+    codigo_id, area_ids = _preparar(finca)
+    _registrar(finca_id, codigo_id, area_ids, dias=[0, 1])
+    db.session.execute(insert(Rendimiento.__table__), [
+        {'id': 20, 'codigo_id': codigo_id, 'area_id': area_ids[0], 'finca_id': finca_id, 'fecha': LUNES,
+         'cantidad': Decimal('1'), 'unidad': 'tallos', 'fecha_registro': datetime.utcnow() - timedelta(hours=1)}])
+    db.session.commit()
+    consolidar_pendientes()
+    # Una ingesta lenta obtuvo el id 10 y confirma después de que la marca lo pasó
+    db.session.execute(insert(Rendimiento.__table__), [
+        {'id': 10, 'codigo_id': codigo_id, 'area_id': area_ids[1], 'finca_id': finca_id,
+         'fecha': LUNES + timedelta(days=8), 'cantidad': Decimal('5'), 'unidad': 'tallos',
+         'fecha_registro': datetime.utcnow() - timedelta(minutes=30)}])
+    db.session.commit()
+
+    assert consolidar_pendientes() == 0
+    assert _diario() != _esperado()
+
+    assert conciliar() == [LUNES + timedelta(days=7)]
+    assert _diario() == _esperado()
+    assert conciliar() == []
+
+
+def test_reconstruir_no_pierde_un_tramo_consolidado_al_mismo_tiempo(monkeypatch, tmp_path):
+    # Dos conexiones reales: SQLite en memoria comparte una sola
+    monkeypatch.setattr(config['default'], 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'consolidacion.db'}")
+    aplicacion = create_app()
+    aplicacion.config['AUDITORIA_ASINCRONA'] = False
+    with aplicacion.app_context():
+        # Sin fsync por commit: la prueba no mide el disco
+        event.listen(db.engine, 'connect', lambda conexion, registro: conexion.execute('PRAGMA synchronous = OFF'))
+        db.create_all()
+        finca = Finca(nombre='Finca')
+        db.session.add(finca)
+        db.session.commit()
+        finca_id = finca.id
+        codigo_id, area_ids = _preparar(finca)
+        _registrar(finca_id, codigo_id, area_ids, dias=[0, 1])
+        consolidar_pendientes()
+        _registrar(finca_id, codigo_id, area_ids, dias=[2])
+        engine = db.engine
+
+    reconstruyendo, seguir = threading.Event(), threading.Event()
+    errores = []
+
+    def antes_del_delete(conn, cursor, statement, parameters, context, executemany):
+        # La reconstrucción se detiene justo antes de borrar los consolidados
+        if statement.startswith('DELETE FROM app_rendimiento_diario') and not reconstruyendo.is_set():
+            reconstruyendo.set()
+            seguir.wait(5)
+
+    def ejecutar(funcion, *argumentos):
+        with aplicacion.app_context():
+            try:
+                funcion(*argumentos)
+            except Exception as e:
+                errores.append(e)
+                db.session.rollback()
+
+    event.listen(engine, 'before_cursor_execute', antes_del_delete)
+    try:
+        reconstruccion = threading.Thread(target=ejecutar, args=(reconstruir, LUNES, LUNES))
+        reconstruccion.start()
+        assert reconstruyendo.wait(5)
+        consolidacion = threading.Thread(target=ejecutar, args=(consolidar_pendientes,))
+        consolidacion.start()
+        consolidacion.join(0.3)
+        # La consolidación espera el bloqueo de la marca que tiene la reconstrucción
+        assert consolidacion.is_alive()
+        seguir.set()
+        reconstruccion.join()
+        consolidacion.join()
+    finally:
+        seguir.set()
+        event.remove(engine, 'before_cursor_execute', antes_del_delete)
+
+    with aplicacion.app_context():
+        assert errores == []
+        assert marca_actual() == 6
+        assert _diario() == _esperado()
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
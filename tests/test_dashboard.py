@@ -0,0 +1,92 @@
+import threading
+import time
+
+from app.cache import CacheTTL
+from app.models import db, Area, Codigo, Supervisor
+from app.resumen import resumen_dashboard
+
+
+def poblar(finca_id):
+    supervisor = Supervisor(nombre='Luis', apellido='Mora', clave_acceso='luis-1')
+    db.session.add_all([
+        Area(nombre='Área 1', finca_id=finca_id, supervisor=supervisor),
+        Area(nombre='Área 2', finca_id=finca_id),
+    ])
+    db.session.flush()
+    area_id = Area.query.filter_by(nombre='Área 1').one().id
+    db.session.add_all([
+        Codigo(codigo='001', nombre_persona='Ana', apellido_persona='Pérez', finca_id=finca_id, area_id=area_id),
+        Codigo(codigo='002', nombre_persona='Juan', apellido_persona='Ruiz', finca_id=finca_id),
+    ])
+    db.session.commit()
+
+
+def test_resumen_en_una_consulta_y_cacheado(client, admin, finca, iniciar_sesion, contador_consultas):
+    poblar(finca.id)
+    iniciar_sesion(admin)
+    client.get('/')
+    contador_consultas.clear()
+
+    html = client.get('/').get_data(as_text=True)
+
+    assert '1 sin área asignada' in html
+    assert '1 con supervisor' in html
+    assert contador_consultas == []
+
+
+def test_escritura_invalida_el_resumen(client, admin, finca, iniciar_sesion):
+    finca_id = finca.id
+    poblar(finca_id)
+    iniciar_sesion(admin)
+    client.get('/')
+
+    client.post('/codigos/crear', data={'rango_codigos': '010-012', 'finca_id': finca_id, 'area_id': ''})
+
+    assert '4 sin área asignada' in client.get('/').get_data(as_text=True)
+
+
+def test_sin_area_cuenta_solo_codigos_activos(finca):
+    poblar(finca.id)
+    db.session.add(Codigo(codigo='003', nombre_persona='Eva', apellido_persona='Gil', finca_id=finca.id,
+                          activo=False))
+    db.session.commit()
+
+    resumen = resumen_dashboard(finca.id)
+
+    assert resumen['codigos'] == 2 and resumen['codigos_sin_area'] == 1
+
+
+def test_calculos_concurrentes_se_comparten():
+    cache = CacheTTL(ttl=60)
+    llamadas = []
+    resultados = []
+    primero_dentro = threading.Event()
+    liberar = threading.Event()
+
+    def calcular():
+        llamadas.append(1)
+        if len(llamadas) == 1:
+            # El primer cálculo no termina hasta que los demás hilos están esperando
+            primero_dentro.set()
+            liberar.wait(5)
+        return {'codigos': len(llamadas)}
+
+    def pedir():
+        resultados.append(cache.obtener_o_calcular('finca', calcular))
+
+    primero = threading.Thread(target=pedir)
+    primero.start()
+    assert primero_dentro.wait(5)
+    otros = [threading.Thread(target=pedir) for _ in range(7)]
+    for hilo in otros:
+        hilo.start()
+    time.sleep(0.1)
+    # Sin single-flight los demás hilos calcularían por su cuenta y ya habrían terminado
+    assert all(hilo.is_alive() for hilo in otros) and len(llamadas) == 1
+
+    liberar.set()
+    for hilo in [primero, *otros]:
+        hilo.join()
+
+    assert len(llamadas) == 1
+    assert resultados == [{'codigos': 1}] * 8
@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine, inspect, text
+
+from actualizar_esquema import actualizar_esquema
+from app.models import db
+
+
+def test_actualizar_esquema_crea_indices_faltantes_una_sola_vez(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'esquema.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text('DROP INDEX "IX_app_codigo_finca_area_activo"'))
+        conn.execute(text('DROP INDEX "IX_app_area_supervisor_id"'))
+
+    assert sorted(actualizar_esquema(engine)) == ['IX_app_area_supervisor_id', 'IX_app_codigo_finca_area_activo']
+    assert actualizar_esquema(engine) == []
+
+    indices = {indice['name']: indice['column_names'] for indice in inspect(engine).get_indexes('app_codigo')}
+    assert indices['IX_app_codigo_finca_area_activo'] == ['finca_id', 'area_id', 'activo', 'codigo']
+    engine.dispose()
+
+
+def test_actualizar_esquema_agrega_y_rellena_columnas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'columnas.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text('DROP INDEX "IX_app_supervisor_modificacion"'))
+        conn.execute(text('ALTER TABLE app_supervisor DROP COLUMN fecha_modificacion'))
+        conn.execute(text("INSERT INTO app_supervisor (nombre, apellido, clave_acceso, activo, fecha_creacion) "
+                          "VALUES ('Ana', 'Paz', 'SUP-1', 1, '2024-01-02 03:04:05')"))
+
+    assert actualizar_esquema(engine) == ['app_supervisor.fecha_modificacion', 'IX_app_supervisor_modificacion']
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT fecha_modificacion FROM app_supervisor')).scalar() == '2024-01-02 03:04:05'
+    engine.dispose()
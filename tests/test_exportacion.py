@@ -0,0 +1,71 @@
+import csv
+import io
+import zipfile
+
+import pytest
+
+from app.models import db, Area, Codigo, Finca, Supervisor, Usuario
+
+
+def filas_csv(respuesta):
+    texto = respuesta.get_data(as_text=True).lstrip('\ufeff')
+    return list(csv.reader(io.StringIO(texto)))
+
+
+@pytest.fixture
+def datos(finca):
+    otra = Finca(nombre='Otra Finca')
+    supervisor = Supervisor(nombre='Luis', apellido='Mora', clave_acceso='secreta-123')
+    area = Area(nombre='Área 1', finca_id=finca.id, supervisor=supervisor)
+    db.session.add_all([otra, area])
+    db.session.flush()
+    db.session.add_all([
+        Codigo(codigo='001', nombre_persona='Ana', apellido_persona='Pérez', finca_id=finca.id, area_id=area.id),
+        Codigo(codigo='002', nombre_persona='Juan', apellido_persona='Ruiz', finca_id=finca.id),
+        Codigo(codigo='001', nombre_persona='Eva', apellido_persona='Luna', finca_id=otra.id),
+    ])
+    db.session.commit()
+    return finca.id
+
+
+def test_exportar_codigos_csv_limitado_a_la_finca(client, datos, iniciar_sesion):
+    jefe = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=datos)
+    jefe.set_password('jefe123')
+    db.session.add(jefe)
+    db.session.commit()
+    iniciar_sesion(jefe)
+
+    filas = filas_csv(client.get('/codigos/exportar?formato=csv'))
+
+    assert filas[0][:3] == ['Código', 'Nombre', 'Apellido']
+    assert [fila[1] for fila in filas[1:]] == ['Ana', 'Juan']
+    assert filas[1][4] == 'Área 1' and filas[1][6] == 'Sí'
+
+
+def test_exportar_codigos_respeta_filtros(client, admin, datos, iniciar_sesion):
+    iniciar_sesion(admin)
+
+    filas = filas_csv(client.get(f'/codigos/exportar?finca_id={datos}&sin_area=1'))
+
+    assert [fila[1] for fila in filas[1:]] == ['Juan']
+
+
+def test_exportar_supervisores_no_incluye_clave(client, admin, datos, iniciar_sesion):
+    iniciar_sesion(admin)
+
+    respuesta = client.get('/supervisores/exportar')
+
+    assert 'Luis' in respuesta.get_data(as_text=True)
+    assert 'secreta-123' not in respuesta.get_data(as_text=True)
+
+
+def test_exportar_areas_xlsx(client, admin, datos, iniciar_sesion):
+    pytest.importorskip('xlsxwriter')
+    iniciar_sesion(admin)
+
+    respuesta = client.get('/areas/exportar?formato=xlsx')
+
+    assert respuesta.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(respuesta.get_data())) as libro:
+        assert 'Área 1' in libro.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    respuesta.close()
@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+
+from flask import template_rendered
+from sqlalchemy import update
+
+from app.cache import CacheLRU
+from app.models import db, Area, Codigo, Supervisor
+
+
+@contextmanager
+def plantillas_renderizadas(app):
+    nombres = []
+
+    def registrar(sender, template, context, **extra):
+        nombres.append(template.name)
+
+    with template_rendered.connected_to(registrar, app):
+        yield nombres
+
+
+def _areas(finca):
+    supervisor = Supervisor(nombre='Ana', apellido='Paz', clave_acceso='SUP-1')
+    db.session.add(supervisor)
+    db.session.flush()
+    areas = [Area(nombre=f'Bloque {i}', finca_id=finca.id, supervisor_id=supervisor.id if i == 1 else None)
+             for i in (1, 2, 3)]
+    db.session.add_all(areas)
+    db.session.flush()
+    db.session.add_all([Codigo(codigo=f'{i:03d}', nombre_persona='P', apellido_persona='C', finca_id=finca.id,
+                               area_id=areas[i % 3].id) for i in range(9)])
+    db.session.commit()
+    return [area.id for area in areas]
+
+
+def test_reasignar_un_codigo_renderiza_solo_sus_tarjetas(app, client, admin, finca, iniciar_sesion):
+    area_ids = _areas(finca)
+    iniciar_sesion(admin)
+    with plantillas_renderizadas(app) as nombres:
+        primera = client.get('/areas/gestionar-asignaciones').get_data(as_text=True)
+    assert nombres.count('areas/_tarjeta.html') == 3
+
+    with plantillas_renderizadas(app) as nombres:
+        assert client.get('/areas/gestionar-asignaciones').get_data(as_text=True) == primera
+    assert nombres.count('areas/_tarjeta.html') == 0
+
+    codigo = Codigo.query.filter_by(area_id=area_ids[0]).first()
+    codigo.area_id = area_ids[1]
+    db.session.commit()
+    with plantillas_renderizadas(app) as nombres:
+        html = client.get('/areas/gestionar-asignaciones').get_data(as_text=True)
+    assert nombres.count('areas/_tarjeta.html') == 2
+    assert '2 códigos' in html and '4 códigos' in html
+
+
+def test_filas_de_codigos_se_reutilizan_hasta_que_cambian(app, client, admin, finca, iniciar_sesion):
+    _areas(finca)
+    iniciar_sesion(admin)
+    client.get('/codigos')
+
+    Codigo.query.filter_by(codigo='004').one().nombre_persona = 'Pedro'
+    db.session.commit()
+    with plantillas_renderizadas(app) as nombres:
+        html = client.get('/codigos').get_data(as_text=True)
+    assert nombres.count('codigos/_fila.html') == 1
+    assert 'Pedro C' in html
+
+    # Un cambio en el área (nombre) invalida las filas de sus códigos
+    Area.query.filter_by(nombre='Bloque 2').one().nombre = 'Bloque Norte'
+    db.session.commit()
+    with plantillas_renderizadas(app) as nombres:
+        html = client.get('/codigos').get_data(as_text=True)
+    assert nombres.count('codigos/_fila.html') == 3
+    assert html.count('Bloque Norte') >= 3
+
+    # Las sentencias masivas descartan todas las filas de la tabla
+    db.session.execute(update(Codigo.__table__).where(Codigo.codigo == '001').values(telefono='555'))
+    db.session.commit()
+    with plantillas_renderizadas(app) as nombres:
+        assert '555' in client.get('/codigos').get_data(as_text=True)
+    assert nombres.count('codigos/_fila.html') == 9
+
+
+def test_cache_lru_descarta_la_menos_usada_y_por_dependencia():
+    cache = CacheLRU(maximo=2)
+    cache.guardar('a', 1, [('t', 1)])
+    cache.guardar('b', 2, [('t', 2)])
+    assert cache.obtener('a') == 1
+    cache.guardar('c', 3, [('t', 1)])
+    assert cache.obtener('b') is None and len(cache) == 2
+
+    assert cache.invalidar_dependencia(('t', 1)) == 2
+    assert len(cache) == 0 and cache.invalidar_dependencia(('t', 1)) == 0
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine, select
+
+from app.models import db, Area, Codigo, Finca, Rendimiento, Supervisor
+from generar_datos import generar
+
+PARAMETROS = dict(fincas=2, areas_por_finca=3, codigos_por_area=20, sin_area=0.2, meses=1, semilla=7)
+# Las fechas de creación dependen del reloj, no de la semilla
+DEL_RELOJ = {'fecha_creacion', 'fecha_modificacion'}
+
+
+def _generar(ruta, **parametros):
+    engine = create_engine(f'sqlite:///{ruta}')
+    db.metadata.create_all(engine)
+    conteo = generar(engine, informar=lambda texto: None, **{**PARAMETROS, **parametros})
+    return engine, conteo
+
+
+def _filas(engine):
+    filas = {}
+    with engine.connect() as conn:
+        for modelo in (Finca, Supervisor, Area, Codigo, Rendimiento):
+            tabla = modelo.__table__
+            columnas = [c for c in tabla.c if c.name not in DEL_RELOJ]
+            filas[tabla.name] = conn.execute(select(*columnas).order_by(tabla.c.id)).all()
+    return filas
+
+
+def test_misma_semilla_genera_los_mismos_datos(tmp_path):
+    primero, conteo = _generar(tmp_path / 'primero.db')
+    segundo, _ = _generar(tmp_path / 'segundo.db')
+    otro, _ = _generar(tmp_path / 'otro.db', semilla=8)
+    try:
+        filas = _filas(primero)
+        assert filas == _filas(segundo)
+        assert filas['app_codigo'] != _filas(otro)['app_codigo']
+
+        assert conteo['app_finca'] == 2 and conteo['app_area'] == 6
+        # 20 códigos asignados por área y la fracción sin_area de cada finca sin área
+        codigos = filas['app_codigo']
+        sin_area = [fila for fila in codigos if fila.area_id is None]
+        assert len(codigos) == conteo['app_codigo'] == 150
+        assert len(sin_area) / len(codigos) == 0.2
+        assert conteo['app_rendimiento'] == len(filas['app_rendimiento']) > 0
+    finally:
+        for engine in (primero, segundo, otro):
+            engine.dispose()
+
+
+def test_base_con_datos_se_rechaza(tmp_path):
+    engine, _ = _generar(tmp_path / 'datos.db', meses=0)
+    try:
+        with pytest.raises(ValueError, match='fincas'):
+            generar(engine, informar=lambda texto: None)
+    finally:
+        engine.dispose()
@@ -0,0 +1,88 @@
+from sqlalchemy import insert
+
+from app.models import db, Area, Codigo, Finca, Usuario
+
+
+def _parametros(columnas, **extra):
+    parametros = {'draw': 3, 'start': 0, 'length': 10}
+    for i, data in enumerate(columnas):
+        parametros[f'columns[{i}][data]'] = data
+    parametros.update(extra)
+    return parametros
+
+
+def _codigos(finca, cantidad=300):
+    otra = Finca(nombre='Otra Finca')
+    area = Area(nombre='Bloque <b>1</b>', finca_id=finca.id)
+    db.session.add_all([otra, area])
+    db.session.flush()
+    db.session.execute(insert(Codigo.__table__), [
+        {'codigo': f'{i:04d}', 'nombre_persona': 'Juan' if i % 50 == 0 else 'Ana', 'apellido_persona': 'Paz',
+         'finca_id': finca.id, 'area_id': area.id if i % 2 else None, 'activo': i % 3 != 0}
+        for i in range(cantidad)])
+    db.session.execute(insert(Codigo.__table__), [
+        {'codigo': '0001', 'nombre_persona': 'Juan', 'apellido_persona': 'X', 'finca_id': otra.id, 'activo': True}])
+    db.session.commit()
+    return area.id
+
+
+def test_grid_de_codigos_pagina_ordena_y_filtra_en_el_servidor(client, finca, iniciar_sesion, contador_consultas):
+    area_id = _codigos(finca)
+    usuario = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=finca.id)
+    usuario.set_password('clave')
+    db.session.add(usuario)
+    db.session.commit()
+    iniciar_sesion(usuario)
+    columnas = ['id', 'codigo', 'nombre_persona', 'area', 'activo']
+    contador_consultas.clear()
+
+    datos = client.get('/grid/codigos/datos', query_string=_parametros(
+        columnas, start=20, **{'order[0][column]': 1, 'order[0][dir]': 'desc'})).get_json()
+
+    assert datos['draw'] == 3 and datos['recordsTotal'] == 300 and datos['recordsFiltered'] == 300
+    assert [fila['codigo'] for fila in datos['data']] == [f'{i:04d}' for i in range(279, 269, -1)]
+    assert datos['data'][0]['area'] == 'Bloque <b>1</b>'
+    # Usuario, total, ids de la página y columnas de la página
+    assert len(contador_consultas) <= 4
+
+    # Búsqueda global (índice de búsqueda) y filtros por columna
+    filtrado = client.get('/grid/codigos/datos', query_string=_parametros(
+        columnas, length=100, **{'search[value]': 'juan', 'columns[4][search][value]': '1'})).get_json()
+    assert filtrado['recordsFiltered'] == 4
+    assert {fila['codigo'] for fila in filtrado['data']} == {'0050', '0100', '0200', '0250'}
+
+    columnas.append('area_id')
+    por_area = client.get('/grid/codigos/datos', query_string=_parametros(
+        columnas, **{'columns[5][search][value]': str(area_id)})).get_json()
+    assert por_area['recordsFiltered'] == 150 and len(por_area['data']) == 10
+
+
+def test_grid_ignora_orden_en_columnas_sin_indice_y_valida_filtros(client, admin, finca, iniciar_sesion):
+    _codigos(finca, cantidad=30)
+    iniciar_sesion(admin)
+    columnas = ['id', 'nombre_persona', 'activo']
+
+    datos = client.post('/grid/codigos/datos', data=_parametros(
+        columnas, length=-1, **{'order[0][column]': 1, 'order[0][dir]': 'desc'})).get_json()
+    assert datos['recordsTotal'] == 31
+    assert [fila['id'] for fila in datos['data']] == list(range(1, 32))
+
+    invalido = client.get('/grid/codigos/datos', query_string=_parametros(
+        columnas, **{'columns[2][search][value]': 'tal vez'})).get_json()
+    assert 'error' in invalido and 'data' not in invalido
+
+
+def test_grid_respeta_permisos(client, finca, iniciar_sesion):
+    usuario = Usuario(username='rrhh', email='rrhh@agricultura.com', rol='rrhh')
+    usuario.set_password('clave')
+    db.session.add(usuario)
+    db.session.commit()
+
+    assert client.get('/grid/codigos/datos').status_code == 401
+    iniciar_sesion(usuario)
+    assert client.get('/grid/usuarios/datos').status_code == 403
+    assert client.get('/grid/otra/datos').status_code == 404
+    # Sin finca asignada no ve códigos
+    assert client.get('/grid/codigos/datos', query_string=_parametros(['id'])).get_json()['recordsTotal'] == 0
+    assert client.get('/grid/supervisores/datos', query_string=_parametros(['id', 'nombre'])).status_code == 200
+    assert client.get('/grid/supervisores').status_code == 200
@@ -0,0 +1,68 @@
+import io
+
+from app.importacion import importar_codigos
+from app.models import db, Area, Codigo, CodigoImportacion, Finca, Usuario
+
+
+def csv_bytes(texto):
+    return io.BytesIO(texto.encode('utf-8'))
+
+
+def test_importar_codigos_con_informe_de_errores(app, finca):
+    finca_id = finca.id
+    otra = Finca(nombre='Otra Finca')
+    area = Area(nombre='Área 1', finca_id=finca_id)
+    db.session.add_all([otra, area])
+    db.session.flush()
+    area_ajena = Area(nombre='Área Ajena', finca_id=otra.id)
+    db.session.add_all([area_ajena,
+                        Codigo(codigo='003', nombre_persona='Ya', apellido_persona='Existe', finca_id=finca_id)])
+    db.session.commit()
+
+    archivo = csv_bytes(
+        'codigo;nombre;apellido;telefono;area_id\n'
+        f'001;Ana;Pérez;0991234567;{area.id}\n'
+        '002;Juan;Ruiz;;\n'
+        '003;Repetido;En Base;;\n'
+        '002;Juan;Duplicado;;\n'
+        f'004;Eva;Luna;;{area_ajena.id}\n'
+        '005;;SinNombre;;\n'
+    )
+
+    resultado = importar_codigos(archivo, finca_id)
+    db.session.commit()
+
+    assert resultado.filas == 6
+    assert resultado.importados == 2
+    assert [(e['fila'], e['codigo']) for e in resultado.errores] == [(4, '003'), (5, '002'), (6, '004'), (7, '005')]
+    ana = Codigo.query.filter_by(finca_id=finca_id, codigo='001').one()
+    assert ana.area_id == area.id and ana.telefono == '0991234567' and ana.activo is True
+    assert CodigoImportacion.query.count() == 0
+
+
+def test_importar_por_lotes_con_pocas_consultas(app, finca, contador_consultas):
+    finca_id = finca.id
+    filas = '\n'.join(f'{i:05d},Persona {i},Cosechador,' for i in range(2500))
+    contador_consultas.clear()
+
+    resultado = importar_codigos(csv_bytes('codigo,nombre_persona,apellido_persona,telefono\n' + filas), finca_id)
+    db.session.commit()
+
+    assert resultado.importados == 2500 and resultado.errores == []
+    assert Codigo.query.filter_by(finca_id=finca_id).count() == 2500
+    # fincas, áreas, existentes, 3 lotes a staging, conflictos, merge, limpieza, conteo
+    assert len(contador_consultas) <= 12
+
+
+def test_importar_desde_formulario(client, finca, iniciar_sesion):
+    jefe = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=finca.id)
+    jefe.set_password('jefe123')
+    db.session.add(jefe)
+    db.session.commit()
+    iniciar_sesion(jefe)
+
+    respuesta = client.post('/codigos/importar', data={
+        'archivo': (csv_bytes('codigo,nombre_persona,apellido_persona\n100,Ana,Pérez\n'), 'codigos.csv'),
+    }, content_type='multipart/form-data')
+
+    assert '1 códigos importados de 1 filas' in respuesta.get_data(as_text=True)
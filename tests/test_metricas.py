@@ -0,0 +1,59 @@
+import re
+
+from app.metricas import Histograma, metricas
+
+
+def _valor(texto, serie, ruta, sufijo='count', metodo='GET', estado='200'):
+    patron = rf'^agricultura_{serie}_{sufijo}\{{ruta="{re.escape(ruta)}",metodo="{metodo}",estado="{estado}"\}} (\S+)$'
+    return float(re.search(patron, texto, re.MULTILINE).group(1))
+
+
+def test_metrics_expone_latencia_sql_y_plantillas_por_ruta(client, admin, finca, iniciar_sesion):
+    metricas.reiniciar()
+    iniciar_sesion(admin)
+    client.get('/codigos')
+    client.get('/codigos')
+    client.get('/no-existe')
+
+    respuesta = client.get('/metrics')
+    assert respuesta.content_type.startswith('text/plain; version=0.0.4')
+    texto = respuesta.get_data(as_text=True)
+    assert '# TYPE agricultura_peticion_segundos histogram' in texto
+    assert _valor(texto, 'peticion_segundos', '/codigos') == 2
+    assert 'agricultura_peticion_segundos_bucket{ruta="/codigos",metodo="GET",estado="200",le="+Inf"} 2' in texto
+    assert _valor(texto, 'sql_sentencias', '/codigos', 'sum') >= 2
+    assert _valor(texto, 'sql_segundos', '/codigos', 'sum') > 0
+    assert _valor(texto, 'plantillas_segundos', '/codigos', 'sum') > 0
+    assert _valor(texto, 'peticion_segundos', 'sin_ruta', estado='404') == 1
+
+    pagina = client.get('/sistema/metricas').get_data(as_text=True)
+    assert '<code>/codigos</code>' in pagina
+
+
+def test_metrics_exige_token_o_admin(app, client, finca, iniciar_sesion):
+    app.config['METRICAS_TOKEN'] = 'secreto'
+    remoto = {'REMOTE_ADDR': '10.0.0.5'}
+
+    assert client.get('/metrics', environ_base=remoto).status_code == 401
+    assert client.get('/metrics', environ_base=remoto, headers={'Authorization': 'Bearer otro'}).status_code == 401
+    assert client.get('/metrics', environ_base=remoto, headers={'Authorization': 'Bearer secreto'}).status_code == 200
+    assert client.get('/sistema/metricas').status_code == 302
+
+
+def test_metrics_sin_token_no_se_abre_a_peticiones_locales(app, client):
+    app.config['METRICAS_TOKEN'] = None
+
+    # Detrás de un proxy en el mismo servidor todas las peticiones son locales
+    for direccion in ('127.0.0.1', '::1'):
+        assert client.get('/metrics', environ_base={'REMOTE_ADDR': direccion}).status_code == 401
+
+
+def test_histograma_acumula_y_estima_percentiles():
+    histograma = Histograma((1, 2, 5))
+    for valor in (0.5, 1, 1.5, 1.5, 4, 9):
+        histograma.observar(valor)
+
+    assert histograma.acumulados() == [(1, 2), (2, 4), (5, 5), (float('inf'), 6)]
+    assert histograma.percentil(50) == 1.5
+    assert histograma.percentil(100) == 5
+    assert Histograma((1,)).percentil(50) is None
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+
+import migrate_sqlite_to_sqlserver as migracion
+from app.models import db, Area, Codigo, Finca, Supervisor
+
+
+@pytest.fixture
+def origen(tmp_path):
+    url = f"sqlite:///{tmp_path / 'origen.db'}"
+    motor = create_engine(url)
+    db.metadata.create_all(motor)
+    with motor.begin() as conn:
+        conn.execute(insert(Finca.__table__), [{'id': i, 'nombre': f'Finca {i}'} for i in (1, 2)])
+        conn.execute(insert(Supervisor.__table__), [
+            {'id': 5, 'nombre': 'Ana', 'apellido': 'Paz', 'clave_acceso': 'SUP5'}])
+        conn.execute(insert(Area.__table__), [
+            {'id': i, 'nombre': f'Área {i}', 'finca_id': 1 + i % 2, 'supervisor_id': 5} for i in range(1, 8)])
+        # Ids con huecos para comprobar que los bloques van por clave y no por posición
+        conn.execute(insert(Codigo.__table__), [
+            {'id': i * 3, 'codigo': f'{i:04d}', 'nombre_persona': 'N', 'apellido_persona': 'A',
+             'finca_id': 1, 'area_id': 1 + i % 7} for i in range(1, 24)])
+    motor.dispose()
+    return url
+
+
+def _contenido(url):
+    motor = create_engine(url)
+    with motor.connect() as conn:
+        datos = {tabla.name: conn.execute(select(tabla).order_by(*tabla.primary_key.columns)).all()
+                 for tabla in db.metadata.sorted_tables}
+    motor.dispose()
+    return datos
+
+
+def test_niveles_respetan_claves_foraneas():
+    tablas = [t for t in db.metadata.sorted_tables if t.name not in migracion.EXCLUIDAS]
+    niveles = [[t.name for t in nivel] for nivel in migracion.niveles_de_tablas(tablas)]
+    posicion = {nombre: n for n, nivel in enumerate(niveles) for nombre in nivel}
+
+    assert posicion['app_finca'] < posicion['app_area'] < posicion['app_codigo']
+    assert posicion['app_supervisor'] < posicion['app_area']
+    assert posicion['app_finca'] == posicion['app_supervisor']
+
+
+def test_migracion_completa(origen, tmp_path):
+    destino = f"sqlite:///{tmp_path / 'destino.db'}"
+
+    total = migracion.migrar(origen, destino, tamano_lote=4, hilos=2,
+                             ruta_checkpoint=tmp_path / 'avance.json')
+
+    assert total == 2 + 1 + 7 + 23
+    assert _contenido(destino) == _contenido(origen)
+    avance = json.loads((tmp_path / 'avance.json').read_text())['tablas']
+    assert avance['app_codigo'] == {'ultimo': [69], 'copiadas': 23, 'completa': True}
+
+
+def test_migracion_reanuda_tras_interrupcion(origen, tmp_path, monkeypatch):
+    destino = f"sqlite:///{tmp_path / 'destino.db'}"
+    ruta = tmp_path / 'avance.json'
+    guardar = migracion.Checkpoint.guardar
+    llamadas = []
+
+    def guardar_y_cortar(self, tabla, ultimo, copiadas, completa=False):
+        # Se corta después de confirmar el tercer bloque de códigos y antes de anotarlo
+        if tabla == 'app_codigo':
+            llamadas.append(ultimo)
+            if len(llamadas) == 3:
+                raise RuntimeError('corte simulado')
+        return guardar(self, tabla, ultimo, copiadas, completa)
+
+    monkeypatch.setattr(migracion.Checkpoint, 'guardar', guardar_y_cortar)
+    with pytest.raises(RuntimeError):
+        migracion.migrar(origen, destino, tamano_lote=4, hilos=2, ruta_checkpoint=ruta)
+    monkeypatch.setattr(migracion.Checkpoint, 'guardar', guardar)
+
+    motor = create_engine(destino)
+    with motor.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(Codigo.__table__)).scalar() == 12
+    motor.dispose()
+
+    copiadas = migracion.migrar(origen, destino, tamano_lote=4, hilos=2, ruta_checkpoint=ruta)
+
+    # Solo se copian los códigos pendientes; el bloque ya confirmado no se duplica
+    assert copiadas == 23 - 12
+    assert _contenido(destino) == _contenido(origen)
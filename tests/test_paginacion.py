@@ -0,0 +1,79 @@
+import base64
+
+import pytest
+from sqlalchemy import insert
+
+from app.models import db, Codigo
+from app.paginacion import codificar_cursor, decodificar_cursor, paginar_keyset
+
+
+@pytest.fixture
+def codigos(finca):
+    # Pocos apellidos repetidos: la primera columna del orden tiene muchos empates
+    db.session.execute(insert(Codigo.__table__), [
+        {'codigo': f'{i:04d}', 'nombre_persona': 'N', 'apellido_persona': f'Apellido {i % 3}',
+         'telefono': '', 'finca_id': finca.id, 'activo': True}
+        for i in range(1, 24)])
+    db.session.commit()
+    return sorted(((c.apellido_persona, c.id) for c in Codigo.query.all()))
+
+
+def _paginas(columnas, descendente=False):
+    paginas, cursor = [], None
+    while True:
+        pagina = paginar_keyset(Codigo.query, columnas, despues=cursor, por_pagina=5, descendente=descendente)
+        paginas.append(pagina)
+        if not pagina.tiene_siguiente:
+            return paginas
+        cursor = pagina.cursor_siguiente
+
+
+@pytest.mark.parametrize('descendente', [False, True])
+def test_avanza_y_retrocede_con_claves_repetidas(codigos, descendente):
+    columnas = [Codigo.apellido_persona, Codigo.id]
+    esperado = sorted(codigos, reverse=descendente)
+
+    paginas = _paginas(columnas, descendente)
+    vistos = [(c.apellido_persona, c.id) for pagina in paginas for c in pagina.items]
+    assert vistos == esperado
+    assert [len(p.items) for p in paginas] == [5, 5, 5, 5, 3]
+    assert not paginas[0].tiene_anterior and paginas[-1].tiene_anterior
+
+    # Hacia atrás desde la última página se recorren las mismas páginas
+    for anterior, pagina in zip(reversed(paginas[:-1]), reversed(paginas[1:])):
+        atras = paginar_keyset(Codigo.query, columnas, antes=pagina.cursor_anterior, por_pagina=5,
+                               descendente=descendente)
+        assert [c.id for c in atras.items] == [c.id for c in anterior.items]
+        assert atras.tiene_siguiente
+        assert atras.tiene_anterior == anterior.tiene_anterior
+
+
+def _token(texto):
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+@pytest.mark.parametrize('token', [
+    'no es base64 ###',
+    _token('no es json'),
+    _token('{"apellido": "x"}'),
+    _token('["Apellido 1"]'),
+    _token('["Apellido 1", 3, 4]'),
+    _token('[{"a": 1}, [2]]'),
+    _token('["Apellido 1", "3"]'),
+    _token('[7, 3]'),
+])
+def test_cursor_mal_formado_o_alterado_vuelve_a_la_primera_pagina(codigos, token):
+    columnas = [Codigo.apellido_persona, Codigo.id]
+    primera = paginar_keyset(Codigo.query, columnas, por_pagina=5)
+
+    for parametro in ('despues', 'antes'):
+        pagina = paginar_keyset(Codigo.query, columnas, por_pagina=5, **{parametro: token})
+        assert [c.id for c in pagina.items] == [c.id for c in primera.items]
+        assert not pagina.tiene_anterior
+
+
+def test_cursor_ida_y_vuelta():
+    valores = ['Pérez', 42]
+    assert decodificar_cursor(codificar_cursor(valores), 2) == valores
+    assert decodificar_cursor(codificar_cursor(valores), 3) is None
+    assert decodificar_cursor('', 2) is None
@@ -0,0 +1,121 @@
+import re
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+from flask import g
+from sqlalchemy import insert
+
+from app import fragmentos, principal, resumen
+from app.models import db, Area, Codigo, Finca, Rendimiento, Supervisor, Trabajo, Usuario
+from benchmarks.rutas import PETICIONES, endpoints_sin_peticion, formatear
+
+# Presupuesto de sentencias SQL por ruta. Cada vista de app/routes/ declara
+# cuántas sentencias puede emitir como máximo; la prueba la ejecuta con pocos
+# y con muchos datos y falla si supera el presupuesto o si repite la misma
+# forma de sentencia (mismo SQL sin importar los valores) más de
+# MAX_REPETICIONES veces, que es la huella de un N+1. Las peticiones y los
+# presupuestos están en benchmarks/rutas.py, la misma tabla que recorre el
+# benchmark de rutas; test_todas_las_rutas_tienen_presupuesto exige que toda
+# ruta nueva se agregue allí.
+
+MAX_REPETICIONES = 2
+
+def forma_sentencia(sql):
+    """SQL sin valores: literales, parámetros y listas IN se reducen a ?"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\(\s*\?(\s*,\s*\?)*\s*\)', '(?)', sql)
+    return ' '.join(sql.split())
+
+
+def _poblar(finca, areas, codigos_por_area, inicio=0, fincas=1):
+    """Áreas con supervisor en `fincas` fincas (la primera, `finca`), códigos y una semana de rendimientos"""
+    hoy = date.today()
+    destinos = [finca] + [Finca(nombre=f'Finca {inicio}-{k}') for k in range(1, fincas)]
+    db.session.add_all(destinos)
+    for i in range(inicio, inicio + areas):
+        supervisor = Supervisor(nombre=f'Supervisor {i}', apellido='Prueba', clave_acceso=f'SUP-{i}')
+        area = Area(nombre=f'Área {i}', finca=destinos[i % fincas], supervisor=supervisor)
+        db.session.add(area)
+        db.session.flush()
+        db.session.execute(insert(Codigo.__table__), [
+            {'codigo': f'{i:03d}{j:03d}', 'nombre_persona': f'Persona {j}', 'apellido_persona': 'Cosechador',
+             'telefono': '', 'area_id': area.id if j else None, 'finca_id': area.finca_id, 'activo': True}
+            for j in range(codigos_por_area)])
+        ids = db.session.query(Codigo.id).filter(Codigo.area_id == area.id).all()
+        db.session.execute(insert(Rendimiento.__table__), [
+            {'codigo_id': codigo_id, 'area_id': area.id, 'finca_id': area.finca_id, 'fecha': hoy - timedelta(days=d),
+             'cantidad': 100, 'unidad': 'tallos'}
+            for (codigo_id,) in ids for d in range(7)])
+    db.session.commit()
+
+
+def _ids(finca, admin):
+    area = Area.query.order_by(Area.id).first()
+    jefe = Usuario.query.filter_by(username='jefe').first()
+    if jefe is None:
+        jefe = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=finca.id)
+        jefe.set_password('clave')
+        db.session.add(jefe)
+    trabajo = Trabajo.query.first()
+    if trabajo is None:
+        trabajo = Trabajo(tipo='crear_rango', usuario_id=admin.id, estado='terminado', resultado='{}')
+        db.session.add(trabajo)
+    db.session.commit()
+    codigo = Codigo.query.filter_by(area_id=area.id).order_by(Codigo.id).first()
+    return {
+        'finca_id': finca.id, 'area_id': area.id, 'supervisor_id': area.supervisor_id,
+        'clave_acceso': area.supervisor.clave_acceso, 'codigo_id': codigo.id, 'codigo': codigo.codigo,
+        'jefe_id': jefe.id, 'trabajo_id': trabajo.id, 'busqueda': 'Pers', 'hoy': date.today().isoformat(),
+    }
+
+
+def _sentencias_de(client, contador, metodo, url, opciones, ids):
+    opciones = formatear(opciones, ids)
+    # Cachés del proceso vacías: se mide el peor caso
+    principal._cache.invalidar()
+    resumen._cache.invalidar()
+    fragmentos._cache.invalidar()
+    # Las pruebas comparten el contexto de aplicación entre peticiones
+    g.pop('principal', None)
+    db.session.expunge_all()
+    contador.clear()
+    respuesta = client.open(formatear(url, ids), method=metodo, **opciones)
+    assert respuesta.status_code < 400, f'{metodo} {url}: {respuesta.status_code}'
+    return list(contador)
+
+
+def _casos():
+    for endpoint, peticiones in PETICIONES.items():
+        for metodo, url, opciones, presupuesto in peticiones:
+            yield pytest.param(metodo, url, opciones, presupuesto, id=f'{metodo} {url}')
+
+
+@pytest.mark.parametrize('metodo, url, opciones, presupuesto', _casos())
+def test_ruta_dentro_de_presupuesto_y_sin_n_mas_1(client, admin, finca, iniciar_sesion, contador_consultas,
+                                                  metodo, url, opciones, presupuesto):
+    # Cada ronda agrega más áreas y más fincas: una consulta por área o por
+    # finca hace crecer el conteo y supera el presupuesto
+    for areas, inicio, fincas in ((2, 0, 2), (10, 2, 5)):
+        _poblar(finca, areas, codigos_por_area=6, inicio=inicio, fincas=fincas)
+        ids = _ids(finca, admin)
+        iniciar_sesion(admin)
+        sentencias = _sentencias_de(client, contador_consultas, metodo, url, opciones, ids)
+
+        assert len(sentencias) <= presupuesto, \
+            f'{metodo} {url} emitió {len(sentencias)} sentencias (presupuesto {presupuesto}):\n' + '\n'.join(sentencias)
+        repetidas = {forma: veces for forma, veces in Counter(map(forma_sentencia, sentencias)).items()
+                     if veces > MAX_REPETICIONES}
+        assert not repetidas, f'{metodo} {url} repite sentencias (N+1): {repetidas}'
+
+
+def test_todas_las_rutas_tienen_presupuesto(app):
+    assert endpoints_sin_peticion(app) == [], 'Rutas sin presupuesto de sentencias'
+    endpoints = {regla.endpoint for regla in app.url_map.iter_rules()}
+    assert set(PETICIONES) - endpoints == set(), 'Presupuestos de rutas que no existen'
+
+
+def test_forma_de_sentencia_ignora_valores():
+    assert forma_sentencia("SELECT * FROM t WHERE id IN (?, ?, ?) AND n = 'x' LIMIT 10") == \
+        forma_sentencia('SELECT * FROM t WHERE id IN (?)  AND n = ? LIMIT 5')
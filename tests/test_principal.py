@@ -0,0 +1,52 @@
+from app.models import db, Finca, Usuario
+
+
+def crear_jefe(finca_id):
+    jefe = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=finca_id)
+    jefe.set_password('jefe123')
+    db.session.add(jefe)
+    db.session.commit()
+    return jefe
+
+
+def consultas_usuario(contador):
+    return [s for s in contador if 'FROM app_usuario' in s]
+
+
+def test_usuario_se_consulta_una_vez_entre_peticiones(client, finca, iniciar_sesion, contador_consultas):
+    iniciar_sesion(crear_jefe(finca.id))
+    contador_consultas.clear()
+
+    client.get('/areas')
+    client.get('/codigos')
+    client.get('/areas/gestionar-asignaciones')
+
+    assert len(consultas_usuario(contador_consultas)) == 1
+
+
+def test_cambio_de_finca_invalida_la_cache(client, admin, finca, iniciar_sesion, contador_consultas):
+    otra = Finca(nombre='Otra Finca')
+    db.session.add(otra)
+    db.session.commit()
+    otra_id = otra.id
+    jefe = crear_jefe(finca.id)
+    jefe_id = jefe.id
+    admin_id = admin.id
+
+    iniciar_sesion(jefe)
+    client.get('/areas')
+    with client.session_transaction() as sesion:
+        sesion.update(user_id=admin_id, rol='admin')
+    client.post(f'/usuarios/{jefe_id}/asignar', data={'finca_id': otra_id})
+    with client.session_transaction() as sesion:
+        sesion.update(user_id=jefe_id, rol='jefe_cultivo')
+    contador_consultas.clear()
+
+    client.get('/areas')
+
+    assert len(consultas_usuario(contador_consultas)) == 1
+    with client.application.test_request_context():
+        from flask import session
+        from app.principal import obtener_principal
+        session['user_id'] = jefe_id
+        assert obtener_principal().finca_id == otra_id
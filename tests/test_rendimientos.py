@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.models import db, Area, Codigo, Finca, Rendimiento, Supervisor, Usuario
+
+
+def _datos(finca):
+    supervisor = Supervisor(nombre='Ana', apellido='Paz', clave_acceso='SUP-1')
+    db.session.add(supervisor)
+    db.session.flush()
+    propia = Area(nombre='Bloque 1', finca_id=finca.id, supervisor_id=supervisor.id)
+    otra = Area(nombre='Bloque 2', finca_id=finca.id)
+    db.session.add_all([propia, otra])
+    db.session.flush()
+    db.session.add_all([Codigo(codigo=f'{i:03d}', nombre_persona='P', apellido_persona='C', finca_id=finca.id,
+                               area_id=propia.id if i <= 5 else otra.id) for i in range(1, 11)])
+    db.session.commit()
+    return supervisor.id, propia.id, otra.id
+
+
+def test_ingesta_por_lotes_con_sesion(client, finca, iniciar_sesion, contador_consultas):
+    _, propia_id, otra_id = _datos(finca)
+    usuario = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=finca.id)
+    usuario.set_password('clave')
+    db.session.add(usuario)
+    db.session.commit()
+    iniciar_sesion(usuario)
+    hoy = date.today().isoformat()
+    registros = [{'codigo': f'{i % 10 + 1:03d}', 'fecha': hoy, 'cantidad': 120 + i} for i in range(3000)]
+    registros += [
+        {'codigo': '999', 'fecha': hoy, 'cantidad': 5},
+        {'codigo': '001', 'fecha': (date.today() + timedelta(days=1)).isoformat(), 'cantidad': 5},
+        {'codigo': '001', 'fecha': hoy, 'cantidad': -1},
+        {'codigo': '001', 'fecha': hoy, 'cantidad': 5, 'unidad': 'litros'},
+        {'codigo': '001', 'fecha': hoy, 'cantidad': '7.5', 'area_id': otra_id, 'unidad': 'kg'},
+    ]
+    contador_consultas.clear()
+
+    respuesta = client.post('/api/rendimientos', json={'registros': registros})
+
+    datos = respuesta.get_json()
+    assert respuesta.status_code == 201
+    assert datos['insertados'] == 3001
+    assert [e['indice'] for e in datos['errores']] == [3000, 3001, 3002, 3003]
+    # Carga de áreas y códigos más un executemany por cada 1000 filas
+    assert len([s for s in contador_consultas if 'app_rendimiento' in s]) <= 4
+    assert Rendimiento.query.count() == 3001
+    manual = Rendimiento.query.filter_by(unidad='kg').one()
+    assert manual.area_id == otra_id and manual.cantidad == Decimal('7.50')
+    assert Rendimiento.query.filter_by(area_id=propia_id).count() == 1500
+
+
+def test_supervisor_solo_registra_sus_areas(client, finca):
+    supervisor_id, propia_id, _ = _datos(finca)
+    hoy = date.today().isoformat()
+
+    respuesta = client.post('/api/rendimientos', headers={'X-Clave-Acceso': 'SUP-1'}, json=[
+        {'codigo': '001', 'fecha': hoy, 'cantidad': 10},
+        {'codigo': '009', 'fecha': hoy, 'cantidad': 10},
+    ])
+
+    datos = respuesta.get_json()
+    assert respuesta.status_code == 201
+    assert datos['insertados'] == 1
+    assert datos['errores'][0]['indice'] == 1
+    registro = Rendimiento.query.one()
+    assert (registro.supervisor_id, registro.area_id) == (supervisor_id, propia_id)
+    assert db.session.get(Supervisor, supervisor_id).fecha_ultimo_acceso is not None
+
+
+def test_autenticacion_y_limites(client, admin, finca, iniciar_sesion):
+    _datos(finca)
+    assert client.post('/api/rendimientos', json=[]).status_code == 401
+    assert client.post('/api/rendimientos', headers={'X-Clave-Acceso': 'NO'}, json=[]).status_code == 401
+
+    iniciar_sesion(admin)
+    assert client.post('/api/rendimientos', json={'registros': []}).status_code == 400
+    respuesta = client.post('/api/rendimientos', json={'finca_id': finca.id, 'registros': [{}] * 10001})
+    assert respuesta.status_code == 400
+    assert 'como máximo' in respuesta.get_json()['error']
@@ -0,0 +1,117 @@
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import sincronizacion
+from app.models import db, Area, Codigo, Finca, Supervisor
+
+CLAVE = {'X-Clave-Acceso': 'SUP-1'}
+
+
+@pytest.fixture
+def sin_margen(monkeypatch):
+    monkeypatch.setattr(sincronizacion, 'MARGEN', timedelta(0))
+
+
+def _datos(finca):
+    supervisor = Supervisor(nombre='Ana', apellido='Paz', clave_acceso='SUP-1', email='ana@finca.com')
+    db.session.add(supervisor)
+    otra_finca = Finca(nombre='Otra Finca')
+    db.session.add(otra_finca)
+    db.session.flush()
+    area = Area(nombre='Bloque 1', finca_id=finca.id, supervisor_id=supervisor.id)
+    ajena = Area(nombre='Bloque 9', finca_id=otra_finca.id)
+    db.session.add_all([area, ajena])
+    db.session.flush()
+    db.session.add_all([Codigo(codigo=f'{i:03d}', nombre_persona='P', apellido_persona='C',
+                               finca_id=finca.id, area_id=area.id, activo=i != 5) for i in range(1, 6)])
+    db.session.add(Codigo(codigo='900', nombre_persona='X', apellido_persona='Y', finca_id=otra_finca.id))
+    db.session.commit()
+    return area.id
+
+
+def _sincronizar(client, version=None, **parametros):
+    if version:
+        parametros['version'] = version
+    respuesta = client.get('/api/sincronizacion', query_string=parametros, headers=CLAVE)
+    assert respuesta.status_code == 200
+    return respuesta.get_json()
+
+
+def test_sincronizacion_incremental_con_bajas(client, finca, sin_margen, contador_consultas):
+    area_id = _datos(finca)
+
+    completa = _sincronizar(client)
+    assert completa['completa'] and not completa['hay_mas']
+    assert [c['codigo'] for c in completa['codigos']] == ['001', '002', '003', '004']
+    assert [a['nombre'] for a in completa['areas']] == ['Bloque 1']
+    assert completa['supervisores'] == [{'id': 1, 'nombre': 'Ana', 'apellido': 'Paz', 'telefono': None}]
+    assert completa['bajas'] == {'areas': [], 'codigos': [], 'supervisores': []}
+
+    # Edición por ORM, desactivación y actualización masiva sin ORM
+    codigo = Codigo.query.filter_by(codigo='001').one()
+    codigo.nombre_persona = 'Pedro'
+    Codigo.query.filter_by(codigo='002').one().activo = False
+    db.session.commit()
+    db.session.execute(update(Codigo.__table__).where(Codigo.codigo == '003').values(area_id=None))
+    db.session.commit()
+    contador_consultas.clear()
+
+    delta = _sincronizar(client, completa['version'])
+    consultas = [s for s in contador_consultas if s.lstrip().upper().startswith('SELECT')]
+    # Supervisor, fincas y una consulta por tabla
+    assert len(consultas) == 5
+    assert not delta['completa']
+    assert [(c['codigo'], c['nombre_persona'], c['area_id']) for c in delta['codigos']] == [
+        ('001', 'Pedro', area_id), ('003', 'P', None)]
+    assert delta['bajas']['codigos'] == [Codigo.query.filter_by(codigo='002').one().id]
+    # El acceso del supervisor no cuenta como cambio
+    assert delta['areas'] == [] and delta['supervisores'] == []
+    assert db.session.get(Supervisor, 1).fecha_ultimo_acceso is not None
+
+    vacia = _sincronizar(client, delta['version'])
+    assert vacia['codigos'] == [] and vacia['bajas']['codigos'] == []
+
+
+def test_sincronizacion_por_paginas_y_comprimida(client, finca, sin_margen):
+    _datos(finca)
+    codigos, version = [], None
+    for _ in range(3):
+        datos = _sincronizar(client, version, limite=3)
+        codigos += [c['codigo'] for c in datos['codigos']]
+        version = datos['version']
+        if not datos['hay_mas']:
+            break
+    assert codigos == ['001', '002', '003', '004']
+    assert not datos['hay_mas']
+
+    respuesta = client.get('/api/sincronizacion', query_string={'version': version},
+                           headers={**CLAVE, 'Accept-Encoding': 'gzip'})
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(respuesta.get_data()))['codigos'] == []
+
+
+def test_cambios_recientes_se_repiten_dentro_del_margen(client, finca):
+    _datos(finca)
+    completa = _sincronizar(client)
+    # Filas modificadas hace menos de MARGEN pueden tener transacciones sin confirmar
+    repetida = _sincronizar(client, completa['version'])
+    assert len(repetida['codigos']) == 4
+
+
+def test_sincronizacion_rechaza_accesos_y_versiones_invalidas(client, finca):
+    _datos(finca)
+    assert client.get('/api/sincronizacion').status_code == 401
+    assert client.get('/api/sincronizacion', headers={'X-Clave-Acceso': 'otra'}).status_code == 401
+    respuesta = client.get('/api/sincronizacion?version=basura', headers=CLAVE)
+    assert respuesta.status_code == 400
+
+    # Si cambian las fincas del supervisor se envía todo de nuevo
+    version = _sincronizar(client)['version']
+    Area.query.filter_by(nombre='Bloque 9').one().supervisor_id = 1
+    db.session.commit()
+    datos = _sincronizar(client, version)
+    assert datos['completa'] and len(datos['codigos']) == 5
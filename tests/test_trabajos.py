@@ -0,0 +1,108 @@
+import io
+import json
+
+from app import trabajos
+from app.models import db, Area, Codigo, Trabajo, Usuario
+
+
+def _usuario(finca):
+    usuario = Usuario(username='jefe', email='jefe@agricultura.com', rol='jefe_cultivo', finca_id=finca.id)
+    usuario.set_password('clave')
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+def test_rango_grande_se_encola_y_se_consulta_su_estado(app, client, finca, iniciar_sesion):
+    app.config.update(TRABAJOS_HILOS=0, TRABAJOS_UMBRAL_CODIGOS=50)
+    usuario = _usuario(finca)
+    iniciar_sesion(usuario)
+
+    respuesta = client.post('/codigos/crear', data={'rango_codigos': '001-120'})
+    trabajo = Trabajo.query.one()
+    assert respuesta.headers['Location'].endswith(f'/trabajos/{trabajo.id}')
+    assert trabajo.tipo == 'crear_rango' and trabajo.usuario_id == usuario.id
+
+    estado = client.get(f'/trabajos/{trabajo.id}/estado').get_json()
+    assert estado['estado'] == 'terminado' and estado['porcentaje'] == 100
+    assert estado['resultado'] == {'creados': 120, 'existentes': 0}
+    assert Codigo.query.filter_by(finca_id=finca.id).count() == 120
+    assert 'terminado' in client.get(f'/trabajos/{trabajo.id}').get_data(as_text=True)
+
+    # Los rangos chicos siguen ejecutándose dentro de la petición
+    client.post('/codigos/crear', data={'rango_codigos': '200-210'})
+    assert Trabajo.query.count() == 1 and Codigo.query.count() == 131
+
+
+def test_reasignacion_en_el_pool_de_hilos(app, client, finca, admin, iniciar_sesion):
+    app.config.update(TRABAJOS_HILOS=1, TRABAJOS_UMBRAL_CODIGOS=10)
+    area = Area(nombre='Bloque 1', finca_id=finca.id)
+    db.session.add(area)
+    db.session.add_all([Codigo(codigo=f'{i:03d}', nombre_persona='P', apellido_persona='C', finca_id=finca.id)
+                        for i in range(30)])
+    db.session.commit()
+    ids = [codigo.id for codigo in Codigo.query.all()]
+    iniciar_sesion(admin)
+
+    respuesta = client.post('/codigos/asignar-area', data={'area_id': area.id, 'codigos[]': ids + [9999]})
+    trabajo_id = int(respuesta.headers['Location'].rsplit('/', 1)[1])
+    trabajos.esperar(trabajo_id, timeout=10)
+
+    db.session.expire_all()
+    estado = client.get(f'/trabajos/{trabajo_id}/estado').get_json()
+    assert estado['estado'] == 'terminado'
+    assert estado['resultado'] == {'actualizados': 30, 'omitidos': 1}
+    assert Codigo.query.filter_by(area_id=area.id).count() == 30
+
+
+def test_importacion_grande_y_fallos_quedan_registrados(app, client, finca, admin, iniciar_sesion):
+    app.config.update(TRABAJOS_HILOS=0, TRABAJOS_UMBRAL_BYTES=10)
+    iniciar_sesion(admin)
+    csv = 'codigo,nombre_persona,apellido_persona\n001,Ana,Paz\n002,Luis,Paz\n002,Otro,Paz\n'
+
+    respuesta = client.post('/codigos/importar', data={
+        'finca_id': finca.id, 'archivo': (io.BytesIO(csv.encode()), 'codigos.csv')})
+    trabajo = Trabajo.query.one()
+    assert respuesta.status_code == 302
+    resultado = trabajos.estado_trabajo(trabajo)['resultado']
+    assert resultado['importados'] == 2 and resultado['total_errores'] == 1
+    assert Codigo.query.count() == 2
+
+    # Un error en la tarea deja el trabajo fallido y revierte sus cambios
+    client.post('/codigos/importar', data={
+        'finca_id': finca.id, 'archivo': (io.BytesIO(b'nombre,apellido\nAna,Paz\n'), 'malo.csv')})
+    fallido = Trabajo.query.order_by(Trabajo.id.desc()).first()
+    assert fallido.estado == 'fallido' and 'Faltan columnas' in fallido.error
+    assert Codigo.query.count() == 2
+
+
+def test_solo_el_autor_o_un_admin_ve_el_trabajo(app, client, finca, admin, iniciar_sesion):
+    otro = _usuario(finca)
+    trabajo = Trabajo(tipo='crear_rango', usuario_id=admin.id)
+    db.session.add(trabajo)
+    db.session.commit()
+
+    assert client.get(f'/trabajos/{trabajo.id}/estado').status_code == 401
+    iniciar_sesion(otro)
+    assert client.get(f'/trabajos/{trabajo.id}/estado').status_code == 404
+    iniciar_sesion(admin)
+    assert client.get(f'/trabajos/{trabajo.id}/estado').get_json()['estado'] == 'pendiente'
+
+
+def test_recuperar_trabajos_despues_de_un_reinicio(app, finca, admin, tmp_path):
+    archivo = tmp_path / 'importacion.csv'
+    archivo.write_text('codigo,nombre_persona,apellido_persona\n001,Ana,Paz\n', encoding='utf-8')
+    interrumpido = Trabajo(tipo='importar', usuario_id=admin.id, estado='en_curso',
+                           parametros=json.dumps({'archivo': str(archivo), 'finca_id': finca.id}))
+    pendiente = Trabajo(tipo='crear_rango', usuario_id=admin.id,
+                        parametros=json.dumps({'finca_id': finca.id, 'inicio': 1, 'fin': 5}))
+    db.session.add_all([interrumpido, pendiente])
+    db.session.commit()
+
+    assert trabajos.recuperar_trabajos(app) == (1, 1)
+
+    db.session.expire_all()
+    assert interrumpido.estado == 'fallido' and interrumpido.error == trabajos.ERROR_INTERRUMPIDO
+    assert not archivo.exists()
+    assert pendiente.estado == 'terminado' and Codigo.query.count() == 5
+    assert trabajos.recuperar_trabajos(app) == (0, 0)
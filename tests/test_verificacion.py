@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, delete, insert, update
+
+import verify_data_sync as verificacion
+from app.models import db, Codigo, Finca, RendimientoDiario
+
+
+def _base(ruta, codigos):
+    url = f'sqlite:///{ruta}'
+    motor = create_engine(url)
+    db.metadata.create_all(motor)
+    with motor.begin() as conn:
+        conn.execute(insert(Finca.__table__), [{'id': 1, 'nombre': 'Finca 1',
+                                                'fecha_creacion': codigos[0]['fecha_creacion'],
+                                                'fecha_modificacion': codigos[0]['fecha_creacion']}])
+        conn.execute(insert(Codigo.__table__), codigos)
+    return url, motor
+
+
+@pytest.fixture
+def bases(tmp_path):
+    creacion = datetime(2024, 5, 1, 8, 30, 15)
+    # (microsegundos en SQLite, fecha que devuelve DATETIME de SQL Server)
+    precisiones = [(0, creacion), (4000, creacion.replace(microsecond=3000)),
+                   (998600, creacion + timedelta(seconds=1))]
+    codigos = [{'id': i, 'codigo': f'{i:05d}', 'nombre_persona': 'N', 'apellido_persona': 'A', 'finca_id': 1,
+                'fecha_creacion': creacion.replace(microsecond=precisiones[i % 3][0]),
+                'fecha_modificacion': creacion} for i in range(1, 1001)]
+    origen, motor_origen = _base(tmp_path / 'origen.db', codigos)
+    # El destino guarda las fechas con otra precisión, como SQL Server
+    for codigo in codigos:
+        codigo['fecha_creacion'] = precisiones[codigo['id'] % 3][1]
+    destino, motor_destino = _base(tmp_path / 'destino.db', codigos)
+    yield origen, destino, motor_destino
+    motor_origen.dispose()
+    motor_destino.dispose()
+
+
+def test_bases_iguales_no_reportan_diferencias(bases):
+    origen, destino, _ = bases
+
+    resultado = verificacion.verificar_checksums(origen, destino, tamano_bloque=100)
+
+    assert resultado['app_codigo'].bloques == 11
+    assert all(diferencias.total == 0 for diferencias in resultado.values())
+
+
+def test_biseccion_encuentra_las_filas_distintas(bases):
+    origen, destino, motor_destino = bases
+    tabla = Codigo.__table__
+    with motor_destino.begin() as conn:
+        conn.execute(update(tabla).where(tabla.c.id.in_([250, 731]))
+                     .values(nombre_persona='Otro', fecha_modificacion=tabla.c.fecha_modificacion))
+        conn.execute(delete(tabla).where(tabla.c.id == 512))
+        conn.execute(insert(tabla), [{'id': 5000, 'codigo': 'EXTRA', 'nombre_persona': 'N',
+                                      'apellido_persona': 'A', 'finca_id': 1}])
+
+    diferencias = verificacion.verificar_checksums(origen, destino, tamano_bloque=100)['app_codigo']
+
+    assert diferencias.distintas == [250, 731]
+    assert diferencias.solo_origen == [512]
+    assert diferencias.solo_destino == [5000]
+    assert diferencias.bloques_distintos == 4
+
+
+def test_clave_compuesta_se_compara_por_bloques_sin_cargar_la_tabla(bases, monkeypatch):
+    origen, destino, motor_destino = bases
+    tabla = RendimientoDiario.__table__
+    filas = [{'finca_id': 1, 'fecha': date(2024, 1, 1) + timedelta(days=d), 'area_id': area, 'unidad': 'tallos',
+              'cantidad': 100, 'registros': 1} for d in range(100) for area in (1, 2, 3)]
+    motor_origen = create_engine(origen)
+    with motor_origen.begin() as conn:
+        conn.execute(insert(tabla), filas)
+    motor_origen.dispose()
+    with motor_destino.begin() as conn:
+        conn.execute(insert(tabla), filas)
+        conn.execute(update(tabla).where(tabla.c.fecha == date(2024, 2, 10), tabla.c.area_id == 2)
+                     .values(cantidad=90))
+        conn.execute(delete(tabla).where(tabla.c.fecha == date(2024, 3, 1), tabla.c.area_id == 3))
+        conn.execute(insert(tabla), [{'finca_id': 1, 'fecha': date(2023, 12, 31), 'area_id': 1, 'unidad': 'tallos',
+                                      'cantidad': 5, 'registros': 1}])
+    comparadas = []
+    agregar = verificacion.Diferencias.agregar
+    monkeypatch.setattr(verificacion.Diferencias, 'agregar', lambda self, filas_origen, filas_destino: (
+        comparadas.append(max(len(filas_origen), len(filas_destino))), agregar(self, filas_origen, filas_destino)))
+
+    diferencias = verificacion.verificar_checksums(origen, destino, tamano_bloque=100)['app_rendimiento_diario']
+
+    assert diferencias.distintas == [(1, date(2024, 2, 10), 2, 'tallos')]
+    assert diferencias.solo_origen == [(1, date(2024, 3, 1), 3, 'tallos')]
+    assert diferencias.solo_destino == [(1, date(2023, 12, 31), 1, 'tallos')]
+    assert (diferencias.bloques, diferencias.bloques_distintos) == (3, 2)
+    # Solo se comparan fila por fila las hojas de la bisección
+    assert comparadas and max(comparadas) <= verificacion.TAMANO_HOJA
+
+
+def test_fechas_se_redondean_a_la_precision_de_datetime():
+    segundo = datetime(2024, 5, 1, 8, 30, 15)
+    normalizar = verificacion._normalizar
+
+    assert normalizar(segundo.replace(microsecond=998600)) == normalizar(segundo + timedelta(seconds=1))
+    assert normalizar(segundo.replace(microsecond=4000)) == normalizar(segundo.replace(microsecond=3000))
+    assert normalizar(segundo.replace(microsecond=1000)) == normalizar(segundo)
+    assert normalizar(segundo.replace(microsecond=5000)) != normalizar(segundo)
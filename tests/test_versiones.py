@@ -0,0 +1,79 @@
+from sqlalchemy import update
+
+from app.models import db, Area, Codigo, Finca, Supervisor
+
+
+def _codigos(finca):
+    area = Area(nombre='Bloque 1', finca_id=finca.id)
+    db.session.add(area)
+    db.session.flush()
+    db.session.add_all([Codigo(codigo=f'{i:03d}', nombre_persona='P', apellido_persona='C',
+                               finca_id=finca.id, area_id=area.id) for i in range(1, 4)])
+    db.session.commit()
+
+
+def test_listado_sin_cambios_responde_304_sin_consulta_principal(client, admin, finca, iniciar_sesion,
+                                                                  contador_consultas):
+    _codigos(finca)
+    iniciar_sesion(admin)
+    primera = client.get('/codigos')
+    etag = primera.headers['ETag']
+    assert primera.status_code == 200 and primera.headers['Cache-Control'] == 'private, no-cache'
+    contador_consultas.clear()
+
+    repetida = client.get('/codigos', headers={'If-None-Match': etag})
+
+    assert repetida.status_code == 304 and repetida.get_data() == b''
+    # Solo la consulta de versión (y la del usuario)
+    assert not [s for s in contador_consultas if 'JOIN' in s.upper()]
+    assert len(contador_consultas) <= 2
+
+    # Otra URL (filtros) u otra versión de los datos cambian el ETag
+    assert client.get('/codigos?activo=1', headers={'If-None-Match': etag}).status_code == 200
+    db.session.execute(update(Codigo.__table__).where(Codigo.codigo == '002').values(telefono='555'))
+    db.session.commit()
+    cambiada = client.get('/codigos', headers={'If-None-Match': etag})
+    assert cambiada.status_code == 200 and cambiada.headers['ETag'] != etag
+
+
+def test_cambio_en_tabla_relacionada_invalida_el_listado(client, admin, finca, iniciar_sesion):
+    db.session.add(Supervisor(nombre='Ana', apellido='Paz', clave_acceso='SUP-1'))
+    _codigos(finca)
+    iniciar_sesion(admin)
+    etag = client.get('/areas').headers['ETag']
+    assert client.get('/areas', headers={'If-None-Match': etag}).status_code == 304
+
+    Area.query.one().supervisor_id = 1
+    db.session.commit()
+    assert client.get('/areas', headers={'If-None-Match': etag}).status_code == 200
+
+    # El último acceso no es modificación, pero se muestra en el listado de supervisores
+    etag = client.get('/supervisores').headers['ETag']
+    client.get('/api/sincronizacion', headers={'X-Clave-Acceso': 'SUP-1'})
+    assert client.get('/supervisores', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_mensajes_pendientes_evitan_el_304(client, admin, finca, iniciar_sesion):
+    iniciar_sesion(admin)
+    etag = client.get('/fincas').headers['ETag']
+    with client.session_transaction() as sesion:
+        sesion['_flashes'] = [('success', 'Finca creada exitosamente')]
+
+    respuesta = client.get('/fincas', headers={'If-None-Match': etag})
+
+    assert respuesta.status_code == 200 and 'ETag' not in respuesta.headers
+    assert 'Finca creada exitosamente' in respuesta.get_data(as_text=True)
+    assert client.get('/fincas', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_otra_finca_invalida_el_selector_del_admin_filtrado(client, admin, finca, iniciar_sesion):
+    _codigos(finca)
+    iniciar_sesion(admin)
+    url = f'/codigos?finca_id={finca.id}'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    db.session.add(Finca(nombre='Finca Nueva'))
+    db.session.commit()
+    respuesta = client.get(url, headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200 and 'Finca Nueva' in respuesta.get_data(as_text=True)
@@ -1,11 +1,242 @@
 #!/usr/bin/env python3
 """
 Script para verificar que los datos se están guardando en SQL Server
+
+Con --checksums compara dos bases (por defecto la SQLite local contra SQL
+Server) sin cargar objetos del ORM: cada tabla se lee una vez por lado en
+orden de clave primaria y las filas se resumen en huellas por bloques de
+ids (o de filas consecutivas, en las tablas con clave compuesta). Los
+bloques que no coinciden se parten a la mitad, por la clave primaria
+completa, hasta llegar a las filas distintas.
+
+Uso:
+    python verify_data_sync.py
+    python verify_data_sync.py --checksums [--origen URL] [--destino URL] [--bloque 10000]
 """
 
+import argparse
+import hashlib
 import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from pathlib import Path
 
+from sqlalchemy import Integer, create_engine, not_, select
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.paginacion import filtro_keyset
+
+# Tablas de trabajo que no se comparan
+EXCLUIDAS = {'app_codigo_staging'}
+
+TAMANO_BLOQUE = 10000   # ids (o filas, sin id entero) por bloque de huellas
+TAMANO_HOJA = 64        # con hasta estas filas por lado se comparan fila por fila
+FILAS_POR_LECTURA = 5000
+MODULO = 2 ** 64
+
+
+def _normalizar(valor):
+    # Los motores no devuelven los mismos tipos ni la misma precisión
+    if isinstance(valor, bool):
+        return int(valor)
+    if isinstance(valor, datetime):
+        # DATETIME de SQL Server guarda 1/300 s y redondea: .9986 pasa al segundo siguiente
+        tics = (valor.microsecond * 300 + 500000) // 1000000
+        segundos = valor.replace(microsecond=0) + timedelta(seconds=tics // 300)
+        return f"{segundos.isoformat(' ')}+{tics % 300}/300"
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, (float, Decimal)):
+        return repr(float(valor))
+    return valor
+
+
+def hash_fila(fila):
+    """Hash de 64 bits de los valores normalizados de una fila"""
+    datos = repr(tuple(_normalizar(valor) for valor in fila)).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), 'big')
+
+
+class Diferencias:
+    """Claves primarias que difieren entre origen y destino para una tabla"""
+
+    def __init__(self):
+        self.solo_origen = []
+        self.solo_destino = []
+        self.distintas = []
+        self.bloques = 0
+        self.bloques_distintos = 0
+
+    @property
+    def total(self):
+        return len(self.solo_origen) + len(self.solo_destino) + len(self.distintas)
+
+    def agregar(self, filas_origen, filas_destino):
+        for clave in sorted(filas_origen.keys() | filas_destino.keys()):
+            if clave not in filas_destino:
+                self.solo_origen.append(clave)
+            elif clave not in filas_origen:
+                self.solo_destino.append(clave)
+            elif filas_origen[clave] != filas_destino[clave]:
+                self.distintas.append(clave)
+
+
+def _clave(tabla):
+    return list(tabla.primary_key.columns)
+
+
+def _entre(tabla, desde=None, hasta=None):
+    """Condiciones desde <= clave < hasta sobre la clave primaria completa
+
+    `desde` y `hasta` son tuplas con un valor por columna de la clave; None
+    deja el rango abierto por ese lado.
+    """
+    clave = _clave(tabla)
+    condiciones = []
+    if desde is not None:
+        condiciones.append(not_(filtro_keyset(clave, desde, mayor=False)))
+    if hasta is not None:
+        condiciones.append(filtro_keyset(clave, hasta, mayor=False))
+    return condiciones
+
+
+def _filas(conn, tabla, desde=None, hasta=None):
+    """(clave, hash) de cada fila, leídas en orden de clave primaria"""
+    clave = _clave(tabla)
+    posiciones = [list(tabla.columns).index(columna) for columna in clave]
+    consulta = select(tabla).where(*_entre(tabla, desde, hasta)).order_by(*clave)
+    resultado = conn.execution_options(yield_per=FILAS_POR_LECTURA).execute(consulta)
+    for fila in resultado:
+        valor = fila[posiciones[0]] if len(posiciones) == 1 else tuple(fila[i] for i in posiciones)
+        yield valor, hash_fila(fila)
+
+
+def _huellas(conn, tabla, tamano_bloque):
+    """{bloque: (filas, suma de hashes)} por rango de ids; la suma no depende del orden"""
+    huellas = {}
+    for valor, huella in _filas(conn, tabla):
+        bloque = valor // tamano_bloque
+        cantidad, suma = huellas.get(bloque, (0, 0))
+        huellas[bloque] = (cantidad + 1, (suma + huella) % MODULO)
+    return huellas
+
+
+def _huellas_por_clave(conn, tabla, tamano_bloque):
+    """Bloques de `tamano_bloque` filas consecutivas: (primera clave de cada bloque, huellas)"""
+    limites, huellas = [], []
+    for indice, (valor, huella) in enumerate(_filas(conn, tabla)):
+        if indice % tamano_bloque == 0:
+            limites.append(valor if isinstance(valor, tuple) else (valor,))
+            huellas.append((0, 0))
+        cantidad, suma = huellas[-1]
+        huellas[-1] = (cantidad + 1, (suma + huella) % MODULO)
+    return limites, huellas
+
+
+def _huella_rango(conn, tabla, desde, hasta):
+    cantidad = suma = 0
+    for _, huella in _filas(conn, tabla, desde, hasta):
+        cantidad += 1
+        suma = (suma + huella) % MODULO
+    return cantidad, suma
+
+
+def _por_rango(tabla):
+    # Los bloques por rango de ids requieren una clave primaria entera
+    clave = _clave(tabla)
+    return len(clave) == 1 and isinstance(clave[0].type, Integer)
+
+
+def _biseccion(origen, destino, tabla, desde, hasta, huellas, diferencias):
+    """Parte el rango de claves [desde, hasta) hasta aislar las filas distintas
+
+    `huellas` son las (filas, suma) del rango en origen y destino. El rango se
+    parte en la clave del medio del lado con más filas, así cada mitad tiene
+    menos filas sea cual sea la forma de la clave.
+    """
+    (filas_origen, _), (filas_destino, _) = huellas
+    if max(filas_origen, filas_destino) <= TAMANO_HOJA:
+        diferencias.agregar(dict(_filas(origen, tabla, desde, hasta)),
+                            dict(_filas(destino, tabla, desde, hasta)))
+        return
+    conn, filas = (origen, filas_origen) if filas_origen >= filas_destino else (destino, filas_destino)
+    clave = _clave(tabla)
+    medio = tuple(conn.execute(select(*clave).where(*_entre(tabla, desde, hasta)).order_by(*clave)
+                               .offset(filas // 2).limit(1)).one())
+    for inicio, fin in ((desde, medio), (medio, hasta)):
+        mitad = (_huella_rango(origen, tabla, inicio, fin), _huella_rango(destino, tabla, inicio, fin))
+        if mitad[0] != mitad[1]:
+            _biseccion(origen, destino, tabla, inicio, fin, mitad, diferencias)
+
+
+def comparar_tabla(origen, destino, tabla, tamano_bloque=TAMANO_BLOQUE):
+    """Compara una tabla entre dos conexiones y devuelve sus Diferencias"""
+    diferencias = Diferencias()
+    if _por_rango(tabla):
+        huellas_origen = _huellas(origen, tabla, tamano_bloque)
+        huellas_destino = _huellas(destino, tabla, tamano_bloque)
+        rangos = {bloque: ((bloque * tamano_bloque,), ((bloque + 1) * tamano_bloque,))
+                  for bloque in huellas_origen.keys() | huellas_destino.keys()}
+    else:
+        # Sin id entero (consolidados, app_consolidacion): los bloques son filas
+        # consecutivas del origen delimitadas por la clave completa, y el destino
+        # se resume con esos mismos rangos. El primero y el último quedan
+        # abiertos para incluir las claves que solo existen en el destino.
+        limites, huellas = _huellas_por_clave(origen, tabla, tamano_bloque)
+        huellas_origen = dict(enumerate(huellas))
+        rangos = {indice: (limites[indice] if indice else None,
+                           limites[indice + 1] if indice + 1 < len(limites) else None)
+                  for indice in range(max(len(limites), 1))}
+        huellas_destino = {indice: _huella_rango(destino, tabla, desde, hasta)
+                           for indice, (desde, hasta) in rangos.items()}
+    diferencias.bloques = len(rangos)
+
+    for bloque in sorted(rangos):
+        huellas = (huellas_origen.get(bloque, (0, 0)), huellas_destino.get(bloque, (0, 0)))
+        if huellas[0] == huellas[1]:
+            continue
+        diferencias.bloques_distintos += 1
+        _biseccion(origen, destino, tabla, *rangos[bloque], huellas, diferencias)
+    return diferencias
+
+
+def _mostrar_ids(etiqueta, ids, limite=20):
+    if ids:
+        resto = f' ... y {len(ids) - limite} más' if len(ids) > limite else ''
+        print(f"      {etiqueta} ({len(ids)}): {', '.join(str(i) for i in ids[:limite])}{resto}")
+
+
+def verificar_checksums(origen_url, destino_url, tamano_bloque=TAMANO_BLOQUE):
+    """Compara todas las tablas del modelo; devuelve {tabla: Diferencias}"""
+    from app.models import db
+
+    print("🔍 Comparando huellas por bloques...")
+    print("=" * 60)
+    motor_origen = create_engine(origen_url)
+    motor_destino = create_engine(destino_url)
+    resultado = {}
+    try:
+        with motor_origen.connect() as origen, motor_destino.connect() as destino:
+            for tabla in db.metadata.sorted_tables:
+                if tabla.name in EXCLUIDAS:
+                    continue
+                diferencias = comparar_tabla(origen, destino, tabla, tamano_bloque)
+                resultado[tabla.name] = diferencias
+                if not diferencias.total:
+                    print(f"   ✅ {tabla.name}: {diferencias.bloques} bloques iguales")
+                    continue
+                print(f"   ❌ {tabla.name}: {diferencias.bloques_distintos} de "
+                      f"{diferencias.bloques} bloques distintos")
+                _mostrar_ids('Solo en origen', diferencias.solo_origen)
+                _mostrar_ids('Solo en destino', diferencias.solo_destino)
+                _mostrar_ids('Con valores distintos', diferencias.distintas)
+    finally:
+        motor_origen.dispose()
+        motor_destino.dispose()
+    return resultado
+
+
 def verify_data_sync():
     """Verifica que los datos se están guardando en SQL Server"""
     
@@ -127,7 +358,29 @@ def test_data_creation():
 
 def main():
     """Función principal"""
-    
+    parser = argparse.ArgumentParser(description='Verifica los datos guardados en SQL Server')
+    parser.add_argument('--checksums', action='store_true',
+                        help='compara origen y destino por huellas en lugar de listar filas')
+    parser.add_argument('--origen', default=f"sqlite:///{Path(__file__).parent / 'instance' / 'agricultura.db'}",
+                        help='URL de la base de origen')
+    parser.add_argument('--destino', help='URL de la base de destino (por defecto la de config_sqlserver.py)')
+    parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE, help='ids por bloque de huellas')
+    args = parser.parse_args()
+
+    if args.checksums:
+        if args.destino:
+            destino = args.destino
+        else:
+            from app.config_sqlserver import Config
+            destino = Config.SQLALCHEMY_DATABASE_URI
+        resultado = verificar_checksums(args.origen, destino, args.bloque)
+        distintas = sum(diferencias.total for diferencias in resultado.values())
+        if distintas:
+            print(f"\n❌ {distintas} filas distintas entre origen y destino")
+            sys.exit(1)
+        print("\n✅ Origen y destino coinciden")
+        return
+
     print("🚀 Script de verificación de sincronización de datos")
     print("=" * 70)
     